@@ -1,24 +1,58 @@
 from flask import Flask
 from .extensions import db, migrate, jwt
-from .config import Config
+from .config import get_config
 from app.api.routes.user_routes import user_blueprint
 from app.api.routes.subscription_routes import subscription_blueprint
 from app.api.routes.plan_routes import plan_blueprint
+from app.api.routes.entitlement_routes import entitlement_blueprint
+from app.api.routes.event_routes import event_blueprint
+from app.services.entitlement_cache import entitlement_cache
+from app.services.plan_catalog import plan_catalog
+from app.services.revocation_filter import revocation_filter
+from app.services.subscription_stream import subscription_stream
+from app.services.user_cache import user_cache
+from app.services.expiry_service import ExpiryScheduler
+from app.utils import auth  # noqa: F401  registers the JWT loaders
+from app.utils.db import init_sqlite_pragmas
+from app.utils.replicas import replica_router
+from app.utils.compression import response_compression
+from app.utils.metrics import metrics
+from app.utils.passwords import password_hasher
+from app.utils.slow_queries import slow_query_log
 
 API_VERSION = "v1"
 
 
-def create_app(config_class=Config):
+def create_app(config_class=None):
     app = Flask(__name__)
-    app.config.from_object(config_class)
+    app.config.from_object(config_class or get_config())
 
     db.init_app(app)
+    init_sqlite_pragmas(app)
+    replica_router.init_app(app)
+    slow_query_log.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    revocation_filter.init_app(app)
+    user_cache.init_app(app)
+    password_hasher.init_app(app)
+    plan_catalog.init_app(app)
+    entitlement_cache.init_app(app)
+    subscription_stream.init_app(app)
+    metrics.init_app(app)
+    # after metrics: after_request hooks run in reverse, so sizes are on-wire
+    response_compression.init_app(app)
 
     app.register_blueprint(user_blueprint, url_prefix=f"/api/{API_VERSION}/users")
     app.register_blueprint(
         subscription_blueprint, url_prefix=f"/api/{API_VERSION}/subscriptions"
     )
     app.register_blueprint(plan_blueprint, url_prefix=f"/api/{API_VERSION}/plans")
+    app.register_blueprint(
+        entitlement_blueprint, url_prefix=f"/api/{API_VERSION}/entitlements"
+    )
+    app.register_blueprint(event_blueprint, url_prefix=f"/api/{API_VERSION}/events")
+
+    if app.config.get("EXPIRY_SCHEDULER_ENABLED"):
+        app.extensions["expiry_scheduler"] = ExpiryScheduler(app).start()
     return app
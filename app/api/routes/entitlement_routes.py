@@ -0,0 +1,75 @@
+from flask import request, Blueprint
+from flask_jwt_extended import current_user, jwt_required
+from app.services.entitlement_cache import entitlement_cache
+from app.services.entitlement_service import EntitlementService
+from app.services.exceptions import InvalidPlanError
+from app.utils.auth import is_service_token
+from app.utils.response import error_response, success_response
+
+entitlement_blueprint = Blueprint("entitlement", __name__)
+
+MAX_BATCH_USERS = 1000
+
+
+@entitlement_blueprint.route("/<int:user_id>", methods=["GET"])
+@jwt_required()
+def get_entitlement(user_id):
+    """
+    A user's current plan and tier; with `?plan_id=`, also whether that
+    plan or a better one is covered. Only the caller's own, unless the
+    token is a service token.
+    """
+    if user_id != current_user.id and not is_service_token():
+        return error_response("Cannot read another user's entitlements", 403)
+    plan_id = request.args.get("plan_id", type=int)
+    entitlement = entitlement_cache.get_many([user_id])[user_id]
+    data = {
+        "user_id": user_id,
+        "plan_id": entitlement.plan_id if entitlement else None,
+        "tier": entitlement.tier if entitlement else None,
+    }
+    if plan_id is not None:
+        try:
+            data["entitled"] = EntitlementService.check([user_id], plan_id)[user_id]
+        except InvalidPlanError as err:
+            return error_response(str(err), 400)
+    return success_response(data, 200)
+
+
+@entitlement_blueprint.route("/check", methods=["POST"])
+@jwt_required()
+def check_entitlements():
+    """
+    Whether each of up to MAX_BATCH_USERS users has a plan or a better one.
+    Service tokens may check any users; other callers only themselves.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return error_response("Invalid request", 400)
+    plan_id, user_ids = data.get("plan_id"), data.get("user_ids")
+    if not isinstance(plan_id, int):
+        return error_response("Plan ID is required", 400)
+    if (
+        not isinstance(user_ids, list)
+        or not user_ids
+        or not all(isinstance(user_id, int) for user_id in user_ids)
+    ):
+        return error_response("user_ids must be a non-empty list of integers", 400)
+    if len(user_ids) > MAX_BATCH_USERS:
+        return error_response(f"At most {MAX_BATCH_USERS} users per request", 400)
+    if not is_service_token() and any(
+        user_id != current_user.id for user_id in user_ids
+    ):
+        return error_response("Cannot read another user's entitlements", 403)
+
+    try:
+        entitled = EntitlementService.check(list(dict.fromkeys(user_ids)), plan_id)
+    except InvalidPlanError as err:
+        return error_response(str(err), 400)
+    return success_response(
+        {
+            "plan_id": plan_id,
+            "entitled": {str(user_id): entitled[user_id] for user_id in user_ids},
+        },
+        200,
+    )
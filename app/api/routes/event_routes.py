@@ -0,0 +1,63 @@
+import json
+from flask import current_app, request, Blueprint
+from flask_jwt_extended import current_user, jwt_required
+from app.services.event_service import EventService
+from app.services.exceptions import EventsCompactedError
+from app.utils.auth import is_service_token
+from app.utils.response import error_response, raw_json_response
+
+event_blueprint = Blueprint("event", __name__)
+
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 10000
+
+
+@event_blueprint.route("", methods=["GET"])
+@jwt_required()
+def get_events():
+    """
+    The caller's subscription events after the `after` cursor, oldest
+    first; every user's with a service token. Resume from `next_after`;
+    `has_more` means the next page is ready now. `after=0` starts from the
+    oldest event kept, and a 410 gives the `compacted_through` cursor to
+    restart from after resynchronizing.
+    """
+    after = request.args.get("after", 0, type=int)
+    limit = request.args.get("limit", DEFAULT_PAGE_SIZE, type=int)
+    if after < 0:
+        return error_response("after must be a non-negative event id", 400)
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return error_response(f"limit must be between 1 and {MAX_PAGE_SIZE}", 400)
+
+    try:
+        events, has_more = EventService.get_events(
+            after,
+            limit,
+            settle_seconds=current_app.config.get("EVENT_FEED_SETTLE_SECONDS", 1),
+            user_id=None if is_service_token() else current_user.id,
+        )
+    except EventsCompactedError as err:
+        return error_response(
+            str(err), 410, data={"compacted_through": err.compacted_through}
+        )
+    next_after = events[-1].id if events else after
+    return raw_json_response(_render_page(events, next_after, has_more))
+
+
+def _render_page(events, next_after, has_more):
+    """The page's success envelope, splicing in the pre-rendered payloads"""
+    items = b",".join(
+        b'{"created_at":%s,"data":%s,"id":%d,"type":%s}'
+        % (
+            json.dumps(event.created_at.isoformat()).encode(),
+            event.payload.encode(),
+            event.id,
+            json.dumps(event.event_type).encode(),
+        )
+        for event in events
+    )
+    envelope = (
+        b'{"data":{"events":[%s],"has_more":%s,"next_after":%d},'
+        b'"message":"success","status":"success"}'
+    )
+    return envelope % (items, b"true" if has_more else b"false", next_after)
@@ -1,9 +1,16 @@
 from loguru import logger
 from flask import Blueprint, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import current_user, jwt_required
+from app.services.plan_catalog import plan_catalog
 from app.services.plan_service import PlanService
-from app.utils.response import error_response, success_response
-from app.schemas import plan_list_schema, plan_schema
+from app.utils.response import (
+    error_response,
+    make_etag,
+    not_modified,
+    raw_json_response,
+    success_response,
+)
+from app.schemas import plan_schema
 from marshmallow import ValidationError
 
 
@@ -14,8 +21,13 @@ plan_blueprint = Blueprint("plan", __name__)
 def get_all_active_plans():
     """Get all active Plans"""
     try:
-        plans = PlanService.get_all_active_plans()
-        return success_response({"plans": plan_list_schema.dump(plans)})
+        # served from the cached snapshot: a 304 touches neither DB nor JSON
+        snapshot = plan_catalog.snapshot()
+        return raw_json_response(
+            snapshot.list_body,
+            etag=snapshot.list_etag,
+            last_modified=snapshot.last_modified,
+        )
     except Exception as ex:
         logger.exception(f"Failed to get all active plans on error: {ex}")
         return error_response("Internal server error", 500)
@@ -25,10 +37,26 @@ def get_all_active_plans():
 def get_plan(plan_id):
     """Get a plan by ID"""
     try:
+        snapshot = plan_catalog.snapshot()
+        body = snapshot.plan_bodies.get(plan_id)
+        if body is not None:
+            return raw_json_response(
+                body,
+                etag=snapshot.plan_etags[plan_id],
+                last_modified=snapshot.by_id[plan_id].updated_at,
+            )
+
+        # inactive plans are not part of the catalog
         plan = PlanService.get_plan_by_id(plan_id)
         if not plan:
             return error_response("Plan not found", 404)
-        return success_response({"plan": plan_schema.dump(plan)})
+        etag = make_etag("plan", plan.id, plan.updated_at)
+        cached = not_modified(etag, plan.updated_at)
+        if cached is not None:
+            return cached
+        return success_response(
+            {"plan": plan_schema.dump(plan)}, etag=etag, last_modified=plan.updated_at
+        )
     except Exception as ex:
         logger.exception(f"Failed to get plan with ID {plan_id} on error: {ex}")
         return error_response("Internal server error", 500)
@@ -39,7 +67,7 @@ def get_plan(plan_id):
 def create_plan():
     """Create a plan"""
     try:
-        user_id = get_jwt_identity()
+        user_id = current_user.id
 
         data = request.get_json()
         if not data:
@@ -55,6 +83,7 @@ def create_plan():
             description=validated_data.get("description"),
             price=validated_data["price"],
             duration_in_days=validated_data["duration_in_days"],
+            tier=validated_data["tier"],
         )
         return success_response(plan_schema.dump(plan), 201)
     except ValidationError as err:
@@ -1,12 +1,22 @@
 from loguru import logger
-from app.schemas import subscription_list_schema, subscription_schema
+from app.schemas import subscription_schema
 from app.utils.response import success_response, error_response
-from flask import Blueprint, request
+from flask import Blueprint, Response, current_app, request, stream_with_context
+from app.services.exceptions import (
+    InvalidPlanError,
+    SubscriptionNotFoundError,
+    SubscriptionNotOwnedError,
+)
+from app.services.subscription_queries import LISTING_CURSOR_FIELDS
 from app.services.subscription_service import SubscriptionService
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from app.services.subscription_stream import subscription_stream
+from app.utils.export import gzip_chunks, ndjson_chunks
+from flask_jwt_extended import current_user, get_jwt, jwt_required
 
 subscription_blueprint = Blueprint("subscription", __name__)
 
+BULK_CREATE_LIMIT = 10000
+
 
 @subscription_blueprint.route("/", methods=["POST"])
 @jwt_required()
@@ -15,7 +25,7 @@ def create_subscription():
     data = request.get_json()
     plan_id = data.get("plan_id")
     auto_renew = data.get("auto_renew", True)
-    user_id = get_jwt_identity()
+    user_id = current_user.id
 
     if not plan_id:
         return error_response("Plan ID is required", 400)
@@ -27,28 +37,62 @@ def create_subscription():
             {"subscription": subscription},
             201,
         )
+    except InvalidPlanError as err:
+        return error_response(str(err), 400)
     except Exception as ex:
         logger.error(f"Error creating subscription: {ex}")
         return error_response("Failed to create subscription", 500)
 
 
+@subscription_blueprint.route("/bulk", methods=["POST"])
+@jwt_required()
+def create_subscriptions_bulk():
+    """Create many of the caller's subscriptions in one transaction"""
+    data = request.get_json(silent=True) or {}
+    items = data.get("subscriptions")
+    atomic = data.get("atomic", True)
+
+    if not isinstance(items, list) or not items:
+        return error_response("A list of subscriptions is required", 400)
+    if len(items) > BULK_CREATE_LIMIT:
+        return error_response(
+            f"At most {BULK_CREATE_LIMIT} subscriptions can be created at once", 400
+        )
+    if not isinstance(atomic, bool):
+        return error_response("atomic must be a boolean", 400)
+
+    try:
+        result = SubscriptionService.create_subscriptions_bulk(
+            items, atomic=atomic, user_id=current_user.id
+        )
+    except Exception as ex:
+        logger.error(f"Error creating subscriptions in bulk: {ex}")
+        return error_response("Failed to create subscriptions", 500)
+
+    if atomic and result["failed"]:
+        errors = [item for item in result["results"] if item]
+        return error_response("No subscriptions were created", 400, errors=errors)
+    return success_response(result, 201 if not result["failed"] else 207)
+
+
 @subscription_blueprint.route("/active", methods=["GET"])
 @jwt_required()
 def get_active_subscriptions():
     """Get active subscriptions"""
-    user_id = get_jwt_identity()
+    user_id = current_user.id
     cursor = request.args.get("cursor")
     limit = min(int(request.args.get("limit", 10)), 100)
     try:
         result = SubscriptionService.get_active_subscriptions(user_id, cursor, limit)
-        subscriptions = subscription_list_schema.dump(result["data"], many=True)
         return success_response(
             {
-                "subscriptions": subscriptions,
+                "subscriptions": result["data"],
                 "pagination": result["pagination"],
             },
             200,
         )
+    except ValueError as err:
+        return error_response(str(err), 400)
     except Exception as ex:
         logger.error(f"Error fetching active subscriptions: {ex}")
         return error_response("Failed to fetch active subscriptions", 500)
@@ -58,48 +102,147 @@ def get_active_subscriptions():
 @jwt_required()
 def get_subscription_history():
     """Get subscription history"""
-    user_id = get_jwt_identity()
+    user_id = current_user.id
     cursor = request.args.get("cursor")
     limit = min(int(request.args.get("limit", 10)), 100)
     try:
         result = SubscriptionService.get_subscription_history(user_id, cursor, limit)
-        subscriptions = subscription_list_schema.dump(result["data"], many=True)
         return success_response(
             {
-                "subscriptions": subscriptions,
+                "subscriptions": result["data"],
                 "pagination": result["pagination"],
             },
             200,
         )
+    except ValueError as err:
+        return error_response(str(err), 400)
     except Exception as ex:
         logger.error(f"Error fetching subscription history: {ex}")
         return error_response("Failed to fetch subscription history", 500)
 
 
+@subscription_blueprint.route("/changes", methods=["GET"])
+@jwt_required()
+def get_subscription_changes():
+    """
+    Subscriptions changed since the `since` sync token, with tombstones for
+    cancelled and expired ones. Resume from `next_since`.
+    """
+    user_id = current_user.id
+    since = request.args.get("since")
+    limit = min(int(request.args.get("limit", 100)), 1000)
+    try:
+        result = SubscriptionService.get_subscription_changes(
+            user_id,
+            since,
+            limit,
+            settle_seconds=current_app.config.get(
+                "SUBSCRIPTION_SYNC_SETTLE_SECONDS", 2
+            ),
+        )
+        return success_response(result, 200)
+    except ValueError as err:
+        return error_response(str(err), 400)
+    except Exception as ex:
+        logger.error(f"Error fetching subscription changes: {ex}")
+        return error_response("Failed to fetch subscription changes", 500)
+
+
+@subscription_blueprint.route("/export", methods=["GET"])
+@jwt_required()
+def export_subscriptions():
+    """Stream the full subscription history as newline-delimited JSON"""
+    user_id = current_user.id
+    cursor_field = request.args.get("order_by", "created_at")
+    direction = request.args.get("direction", "desc").upper()
+    if cursor_field not in LISTING_CURSOR_FIELDS or direction not in ("ASC", "DESC"):
+        return error_response("Invalid export ordering", 400)
+
+    chunks = ndjson_chunks(
+        SubscriptionService.iter_subscription_batches(
+            user_id=user_id,
+            cursor_field=cursor_field,
+            active_only=_flag("active_only"),
+            future_only=_flag("future_only"),
+            order_by=direction,
+        )
+    )
+    headers = {"Content-Disposition": "attachment; filename=subscriptions.ndjson"}
+    if _flag("gzip"):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+
+    return Response(
+        stream_with_context(chunks),
+        mimetype="application/x-ndjson",
+        headers=headers,
+    )
+
+
+@subscription_blueprint.route("/stream", methods=["GET"])
+@jwt_required()
+def stream_subscription_events():
+    """
+    Push the caller's subscription events as Server-Sent Events, resuming
+    after `Last-Event-ID` (or `?last_event_id=`) when given
+    """
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get(
+        "last_event_id"
+    )
+    if last_event_id is not None:
+        if not last_event_id.isdigit():
+            return error_response("Last-Event-ID must be an event id", 400)
+        last_event_id = int(last_event_id)
+
+    stream = subscription_stream.open(current_user.id)
+    if stream is None:
+        return error_response("Too many open streams, retry shortly", 503)
+    # ends when the token expires; the client reconnects with a fresh one
+    messages = subscription_stream.messages(
+        stream, last_event_id, until=get_jwt().get("exp")
+    )
+    response = Response(
+        stream_with_context(messages),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    # unregisters the stream even if the body was never started
+    response.call_on_close(lambda: subscription_stream.close(stream))
+    return response
+
+
+def _flag(name):
+    return request.args.get(name, "false").lower() in ("1", "true", "yes")
+
+
 @subscription_blueprint.route("/<int:subscription_id>/upgrade", methods=["GET"])
 @jwt_required()
 def upgrade_subscription(subscription_id):
     """Upgrade a subscription"""
     data = request.get_json()
     new_plan_id = data.get("new_plan_id")
-    user_id = get_jwt_identity()
+    user_id = current_user.id
     if not new_plan_id:
         return error_response("New plan ID is required", 400)
 
     try:
         subscription = SubscriptionService.upgrade_subscription(
-            subscription_id, new_plan_id
+            subscription_id, new_plan_id, user_id
         )
-        if not subscription:
-            return error_response("Subscription not found", 404)
         return success_response(
             {
                 "subscription_id": subscription.id,
                 "plan_id": subscription.plan_id,
-                "end_date": subscription.end_date,
+                "end_date": subscription.end_date.isoformat(),
             },
             200,
         )
+    except SubscriptionNotFoundError as err:
+        return error_response(str(err), 404)
+    except SubscriptionNotOwnedError as err:
+        return error_response(str(err), 403)
+    except InvalidPlanError as err:
+        return error_response(str(err), 400)
     except Exception as ex:
         logger.error(f"Error upgrading subscription: {ex}")
         return error_response("Failed to upgrade subscription", 500)
@@ -109,17 +252,19 @@ def upgrade_subscription(subscription_id):
 @jwt_required()
 def cancel_subscription(subscription_id):
     """Cancel a subscription"""
-    user_id = get_jwt_identity()
+    user_id = current_user.id
     try:
-        subscription = SubscriptionService.cancel_subscription(subscription_id)
-        if not subscription:
-            return error_response("Subscription not found", 404)
+        SubscriptionService.cancel_subscription(subscription_id, user_id)
         return success_response(
             {
                 "message": "Subscription cancelled successfully",
             },
             200,
         )
+    except SubscriptionNotFoundError as err:
+        return error_response(str(err), 404)
+    except SubscriptionNotOwnedError as err:
+        return error_response(str(err), 403)
     except Exception as ex:
         logger.error(f"Error cancelling subscription: {ex}")
         return error_response("Failed to cancel subscription", 500)
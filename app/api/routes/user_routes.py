@@ -1,8 +1,21 @@
 from flask import request, Blueprint
 from app.schemas import user_schema
+from app.services.exceptions import PasswordHashingBusyError
+from app.services.token_service import TokenService
+from app.services.user_cache import user_cache
 from app.services.user_service import UserService
-from app.utils.response import error_response, success_response
-from flask_jwt_extended import create_access_token
+from app.utils.response import (
+    error_response,
+    make_etag,
+    not_modified,
+    success_response,
+)
+from flask_jwt_extended import (
+    create_access_token,
+    current_user,
+    get_jwt,
+    jwt_required,
+)
 
 
 user_blueprint = Blueprint("user", __name__)
@@ -32,7 +45,10 @@ def create_account():
             return error_response("Email already exists", 409)
 
     # create a new user
-    user = UserService.create_user(username, email, password)
+    try:
+        user = UserService.create_user(username, email, password)
+    except PasswordHashingBusyError as err:
+        return _busy_response(err)
     if not user:
         return error_response("Failed to create user", 500)
 
@@ -42,10 +58,17 @@ def create_account():
 @user_blueprint.route("/<int:user_id>", methods=["GET"])
 def get_user(user_id):
     """Get user details by ID"""
-    user = UserService.get_user_details_by_id(user_id)
-    if not user:
+    user = user_cache.get(user_id)
+    if not user or not user.is_active:
         return error_response("User not found", 404)
-    return success_response(user_schema.dump(user), 200)
+    # validators come from the row, so a revalidation skips serialization
+    etag = make_etag("user", user.id, user.updated_at)
+    cached = not_modified(etag, user.updated_at)
+    if cached is not None:
+        return cached
+    return success_response(
+        user_schema.dump(user), 200, etag=etag, last_modified=user.updated_at
+    )
 
 
 @user_blueprint.route("/login", methods=["POST"])
@@ -59,9 +82,35 @@ def login():
         return error_response("Username and password is required to login", 400)
 
     # authenticate the user if details are valid
-    user = UserService.authenticate_user(username, password)
+    try:
+        user = UserService.authenticate_user(username, password)
+    except PasswordHashingBusyError as err:
+        return _busy_response(err)
     if not user:
         return error_response("Invalid username or password", 401)
 
     access_token = create_access_token(identity=str(user.id))
     return success_response({"access_token": access_token, "user_id": user.id}, 200)
+
+
+@user_blueprint.route("/logout", methods=["POST"])
+@jwt_required()
+def logout():
+    """Revoke the access token used for this request"""
+    TokenService.revoke_token(get_jwt())
+    return success_response(None, 200, "Logged out")
+
+
+@user_blueprint.route("/logout-all", methods=["POST"])
+@jwt_required()
+def logout_all():
+    """Revoke every access token issued to the caller so far"""
+    TokenService.revoke_all_for_user(current_user.id)
+    return success_response(None, 200, "Logged out of all sessions")
+
+
+def _busy_response(err):
+    """503 telling the client to back off while the hashing pool drains"""
+    response, status = error_response(str(err), 503)
+    response.headers["Retry-After"] = "1"
+    return response, status
@@ -7,10 +7,155 @@ load_dotenv()
 class Config:
     """Base config class"""
 
+    DEBUG = False
     SECRET_KEY = os.getenv("SECRET_KEY", "your_secret_key")
     SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL", "sqlite:///subscription.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ENGINE_OPTIONS = {}
+    # read replicas for @read_only service methods (see app.utils.replicas)
+    SQLALCHEMY_REPLICA_URIS = [
+        url for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url
+    ]
+    REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", 5))
+    # PRAGMAs run on every new SQLite connection, in order (see app.utils.db)
+    SQLITE_PRAGMAS = {}
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your_jwt_secret_key")
     JWT_ACCESS_TOKEN_EXPIRES = int(
         os.getenv("JWT_ACCESS_TOKEN_EXPIRES", 3600)
     )  # expires in an hour
+    EXPIRY_SCHEDULER_ENABLED = os.getenv("EXPIRY_SCHEDULER_ENABLED", "false") == "true"
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true") == "true"
+    SLOW_QUERY_LOG_ENABLED = os.getenv("SLOW_QUERY_LOG_ENABLED", "false") == "true"
+    SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 100))
+    SLOW_QUERY_REPEAT_SECONDS = int(os.getenv("SLOW_QUERY_REPEAT_SECONDS", 300))
+    SLOW_QUERY_MAX_PER_MINUTE = int(os.getenv("SLOW_QUERY_MAX_PER_MINUTE", 30))
+    SLOW_QUERY_EXPLAIN = os.getenv("SLOW_QUERY_EXPLAIN", "true") == "true"
+    # password hashing pool (see app.utils.passwords); workers default to
+    # the CPU count, hashes made with another method are upgraded on login
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 0)) or None
+    PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", 32))
+    # revoked token blocklist (see app.services.revocation_filter); other
+    # processes' revocations take effect within REFRESH_SECONDS
+    TOKEN_BLOCKLIST_CAPACITY = int(os.getenv("TOKEN_BLOCKLIST_CAPACITY", 100000))
+    TOKEN_BLOCKLIST_ERROR_RATE = float(os.getenv("TOKEN_BLOCKLIST_ERROR_RATE", 0.001))
+    TOKEN_BLOCKLIST_REFRESH_SECONDS = float(
+        os.getenv("TOKEN_BLOCKLIST_REFRESH_SECONDS", 1)
+    )
+    TOKEN_BLOCKLIST_REBUILD_SECONDS = float(
+        os.getenv("TOKEN_BLOCKLIST_REBUILD_SECONDS", 3600)
+    )
+    # plan catalog (see app.services.plan_catalog); other processes' plan
+    # writes are seen within the TTL
+    PLAN_CATALOG_TTL_SECONDS = float(os.getenv("PLAN_CATALOG_TTL_SECONDS", 10))
+    # identity cache behind `current_user` (see app.services.user_cache)
+    USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", 10000))
+    USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 30))
+    # entitlement checks (see app.services.entitlement_cache); other
+    # processes' subscription writes are seen within the TTL
+    ENTITLEMENT_CACHE_MAX_ENTRIES = int(
+        os.getenv("ENTITLEMENT_CACHE_MAX_ENTRIES", 100000)
+    )
+    ENTITLEMENT_CACHE_TTL_SECONDS = float(os.getenv("ENTITLEMENT_CACHE_TTL_SECONDS", 5))
+    # subscription event feed (see app.services.event_service); events are
+    # served once SETTLE_SECONDS old and compacted after RETENTION_DAYS
+    EVENT_FEED_SETTLE_SECONDS = float(os.getenv("EVENT_FEED_SETTLE_SECONDS", 1))
+    EVENT_RETENTION_DAYS = float(os.getenv("EVENT_RETENTION_DAYS", 7))
+    # delta sync serves rows updated at least this long ago (2 at minimum)
+    SUBSCRIPTION_SYNC_SETTLE_SECONDS = float(
+        os.getenv("SUBSCRIPTION_SYNC_SETTLE_SECONDS", 2)
+    )
+    # Server-Sent Events streams (see app.services.subscription_stream);
+    # other processes' writes are picked up every POLL_SECONDS
+    SUBSCRIPTION_STREAM_MAX_CONNECTIONS = int(
+        os.getenv("SUBSCRIPTION_STREAM_MAX_CONNECTIONS", 1000)
+    )
+    SUBSCRIPTION_STREAM_MAX_QUEUED = int(
+        os.getenv("SUBSCRIPTION_STREAM_MAX_QUEUED", 100)
+    )
+    SUBSCRIPTION_STREAM_HEARTBEAT_SECONDS = float(
+        os.getenv("SUBSCRIPTION_STREAM_HEARTBEAT_SECONDS", 15)
+    )
+    SUBSCRIPTION_STREAM_POLL_SECONDS = float(
+        os.getenv("SUBSCRIPTION_STREAM_POLL_SECONDS", 1)
+    )
+    # Accept-Encoding negotiated compression (see app.utils.compression);
+    # br and zstd are used only when brotli/zstandard are installed
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "true") == "true"
+    COMPRESSION_ENCODINGS = tuple(
+        os.getenv("COMPRESSION_ENCODINGS", "br,zstd,gzip").split(",")
+    )
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+    COMPRESSION_LEVELS = {
+        "gzip": int(os.getenv("COMPRESSION_GZIP_LEVEL", 6)),
+        "br": int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4)),
+        "zstd": int(os.getenv("COMPRESSION_ZSTD_LEVEL", 3)),
+    }
+
+
+class DevelopmentConfig(Config):
+    """Local development: WAL so the dev server and CLI jobs don't block"""
+
+    DEBUG = True
+    SQLITE_PRAGMAS = {
+        "busy_timeout": 5000,
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+    }
+
+
+class TestingConfig(Config):
+    """In-memory database, no background jobs"""
+
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_REPLICA_URIS = []
+    EXPIRY_SCHEDULER_ENABLED = False
+    SLOW_QUERY_LOG_ENABLED = False
+    SUBSCRIPTION_STREAM_POLL_SECONDS = 0
+
+
+class ProductionConfig(Config):
+    """
+    Tuned for concurrent readers alongside a writer.
+
+    WAL lets readers proceed while a commit is in flight, synchronous=NORMAL
+    only fsyncs at checkpoints (still durable against application crashes),
+    and the page cache, mmap and in-memory temp tables keep hot reads off the
+    disk. The pool holds one connection per worker thread so PRAGMAs are not
+    re-applied on every request.
+    """
+
+    SQLITE_PRAGMAS = {
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", 5000)),
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -int(os.getenv("SQLITE_CACHE_SIZE_KB", 64000)),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 268435456)),
+        "temp_store": "MEMORY",
+    }
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 10)),
+        "pool_timeout": int(os.getenv("DB_POOL_TIMEOUT", 30)),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", 1800)),
+    }
+
+
+CONFIG_PROFILES = {
+    "development": DevelopmentConfig,
+    "testing": TestingConfig,
+    "production": ProductionConfig,
+}
+
+
+def get_config(name=None):
+    """
+    Config class for a profile name, defaulting to `APP_CONFIG`, then to
+    production; debug mode is only on when development is chosen explicitly
+    """
+    name = name or os.getenv("APP_CONFIG", "production")
+    try:
+        return CONFIG_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"Unknown config profile: {name}")
@@ -0,0 +1,22 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer
+from app.extensions import db
+
+
+class Entitlement(db.Model):
+    """
+    A user's current entitlement: their best active subscription, by plan
+    tier. Denormalized from `subscriptions` and rewritten in the same
+    transaction as every write that can change it; users without an active
+    subscription have no row.
+    """
+
+    __tablename__ = "entitlements"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    plan_id = Column(Integer, ForeignKey("plans.id"), nullable=False)
+    tier = Column(Integer, nullable=False)
+    subscription_id = Column(Integer, ForeignKey("subscriptions.id"), nullable=False)
+    updated_at = Column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<Entitlement {self.user_id} - {self.plan_id}>"
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Integer
+from app.extensions import db
+
+
+class EventWatermark(db.Model):
+    """
+    Id of a user's newest compacted event. Their feed cursors before it
+    can't be resumed; users without a row have lost no events.
+    """
+
+    __tablename__ = "event_watermarks"
+
+    user_id = Column(Integer, primary_key=True, autoincrement=False)
+    compacted_through = Column(Integer, nullable=False)
+
+    def __repr__(self):
+        return f"<EventWatermark {self.user_id} - {self.compacted_through}>"
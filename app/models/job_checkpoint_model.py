@@ -0,0 +1,17 @@
+from sqlalchemy import Column, String, Text, DateTime
+from app.extensions import db
+
+
+class JobCheckpoint(db.Model):
+    """Last committed position of a resumable batch job"""
+
+    __tablename__ = "job_checkpoints"
+
+    name = Column(String(50), primary_key=True)
+    position = Column(Text, nullable=False)
+    updated_at = Column(
+        DateTime, nullable=False, server_default=db.func.now(), onupdate=db.func.now()
+    )
+
+    def __repr__(self):
+        return f"<JobCheckpoint {self.name}>"
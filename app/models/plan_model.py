@@ -12,6 +12,9 @@ class Plan(db.Model):
     description = Column(String(200), nullable=False)
     price = Column(Integer, nullable=False)
     duration_in_days = Column(Integer, nullable=False)
+    # rank for entitlement checks: a plan entitles to every plan of its tier
+    # or below, whatever the billing period
+    tier = Column(Integer, nullable=False, default=0, server_default="0")
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, server_default=db.func.now(), nullable=False)
     updated_at = Column(
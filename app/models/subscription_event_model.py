@@ -0,0 +1,29 @@
+from sqlalchemy import Column, DateTime, Index, Integer, String, Text
+from app.extensions import db
+
+
+class SubscriptionEvent(db.Model):
+    """
+    Outbox of subscription lifecycle events, written in the same transaction
+    as the change they describe. `id` is the change feed cursor; `payload`
+    is the event's data, rendered to JSON once when it is written.
+    """
+
+    __tablename__ = "subscription_events"
+
+    id = Column(Integer, primary_key=True)
+    event_type = Column(String(32), nullable=False)
+    subscription_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, nullable=False)
+    payload = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("idx_subscription_events_created", "created_at"),
+        Index("idx_subscription_events_user", "user_id", "id"),
+        # never reuse the ids of compacted events, or cursors would go back
+        {"sqlite_autoincrement": True},
+    )
+
+    def __repr__(self):
+        return f"<SubscriptionEvent {self.id} {self.event_type}>"
@@ -22,9 +22,13 @@ class Subscription(db.Model):
 
     __table_args__ = (
         Index("idx_subscription_user_plan", "user_id", "plan_id"),
-        Index("idx_subscription_active", "is_active"),
+        Index("idx_subscription_lapse", "is_active", "auto_renew", "end_date"),
         Index("idx_subscription_end_date", "end_date"),
-        Index("idx_subscription_user_created", "user_id", "created_at"),
+        Index("idx_subscription_user_created", "user_id", "created_at", "id"),
+        Index("idx_subscription_user_updated", "user_id", "updated_at", "id"),
+        Index(
+            "idx_subscription_user_active_end", "user_id", "is_active", "end_date", "id"
+        ),
     )
 
     def __init__(self, **kwargs):
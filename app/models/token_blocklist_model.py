@@ -0,0 +1,27 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String
+from app.extensions import db
+
+
+class RevokedToken(db.Model):
+    """
+    A revoked access token by `jti`, or, with no `jti`, every token of the
+    user issued up to `revoked_at`. Rows can be purged after `expires_at`,
+    when the tokens they cover have expired anyway.
+    """
+
+    __tablename__ = "token_blocklist"
+
+    id = Column(Integer, primary_key=True)
+    jti = Column(String(36), unique=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    revoked_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index("idx_token_blocklist_user_revoked", "user_id", "revoked_at"),
+        Index("idx_token_blocklist_revoked", "revoked_at"),
+        Index("idx_token_blocklist_expires", "expires_at"),
+    )
+
+    def __repr__(self):
+        return f"<RevokedToken {self.jti or f'user {self.user_id}'}>"
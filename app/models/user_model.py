@@ -1,5 +1,4 @@
 from sqlalchemy import Boolean, Column, Index, Integer, String, DateTime
-from werkzeug.security import generate_password_hash, check_password_hash
 from app.extensions import db
 
 
@@ -19,12 +18,6 @@ class User(db.Model):
     )
     subscriptions = db.relationship("Subscription", backref="user", lazy="dynamic")
 
-    def set_password(self, passwrd):
-        self.pass_hash = generate_password_hash(passwrd)
-
-    def check_password(self, passwrd):
-        return check_password_hash(self.pass_hash, passwrd)
-
     __table_args__ = (
         Index("ix_users_email", "email"),
         Index("ix_users_username", "username"),
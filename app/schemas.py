@@ -7,6 +7,7 @@ class PlanSchema(Schema):
     description = fields.Str()
     price = fields.Float(required=True, validate=validate.Range(min=0))
     duration_in_days = fields.Int(required=True, validate=validate.Range(min=1))
+    tier = fields.Int(load_default=0, validate=validate.Range(min=0))
 
 
 class UserSchema(Schema):
@@ -43,3 +44,34 @@ user_schema = UserSchema()
 
 subscription_schema = SubscriptionSchema()
 subscription_list_schema = SubscriptionSchema(many=True)
+
+
+def dump_subscription_rows(rows):
+    """
+    Fast path for `subscription_list_schema.dump` on listing query rows.
+
+    Rows must carry typed datetime columns and the joined `plan_*` columns.
+    The output is identical to dumping the equivalent nested dicts through
+    the schema, but is built in a single pass without marshmallow.
+    """
+    return [
+        {
+            "id": row.id,
+            "user_id": row.user_id,
+            "plan_id": row.plan_id,
+            "start_date": row.start_date.isoformat(),
+            "end_date": row.end_date.isoformat(),
+            "is_active": bool(row.is_active),
+            "auto_renew": bool(row.auto_renew),
+            "created_at": row.created_at.isoformat(),
+            "plan": {
+                "id": row.plan_id,
+                "name": row.plan_name,
+                "description": row.plan_description,
+                "price": float(row.plan_price),
+                "duration_in_days": row.plan_duration_in_days,
+                "tier": row.plan_tier,
+            },
+        }
+        for row in rows
+    ]
@@ -0,0 +1,93 @@
+"""
+In-process cache of per-user entitlements.
+
+Entitlement checks read `(plan_id, tier)` from here, falling back to one
+query against `entitlements` for all the users missing from the cache. Users
+without an active subscription are cached too. The cache holds at most
+`ENTITLEMENT_CACHE_MAX_ENTRIES` users for `ENTITLEMENT_CACHE_TTL_SECONDS`
+each.
+
+`EntitlementService.refresh` marks the users it rewrites on the session and
+their entries are dropped once the transaction commits. Other processes see
+the change when their entry expires.
+"""
+
+import sys
+from collections import namedtuple
+
+from flask import current_app
+
+from app.utils.commit_hooks import defer, on_commit
+from app.utils.lru import TTLCache
+
+EntitlementSnapshot = namedtuple("EntitlementSnapshot", ["plan_id", "tier"])
+
+# the OrderedDict slot and link, the key, the entry tuple and the snapshot;
+# plan ids and tiers are small ints, shared by the interpreter
+_ENTRY_SIZE = (
+    100
+    + sys.getsizeof(0)
+    + sys.getsizeof((None, None, None))
+    + sys.getsizeof(EntitlementSnapshot(0, 0))
+)
+
+
+def _entry_size(snapshot):
+    return _ENTRY_SIZE
+
+
+class EntitlementCache:
+    """Bounded TTL/LRU cache of entitlement snapshots"""
+
+    def init_app(self, app):
+        # values are snapshots, or None for users with no active subscription
+        app.extensions["entitlement_cache"] = TTLCache(
+            max_entries=app.config.get("ENTITLEMENT_CACHE_MAX_ENTRIES", 100000),
+            ttl_seconds=app.config.get("ENTITLEMENT_CACHE_TTL_SECONDS", 5),
+            sizeof=_entry_size,
+        )
+
+    @staticmethod
+    def _state():
+        return current_app.extensions["entitlement_cache"]
+
+    def get_many(self, user_ids):
+        """{user_id: snapshot or None} for every id in `user_ids`"""
+        cache = self._state()
+        found, generation = cache.lookup(user_ids)
+        missing = [user_id for user_id in user_ids if user_id not in found]
+        if missing:
+            loaded = dict.fromkeys(missing)
+            loaded.update(self._load(missing))
+            cache.store(loaded, generation)
+            found.update(loaded)
+        return found
+
+    def mark_dirty(self, session, user_ids):
+        """Drop the users' entries once `session` commits"""
+        defer(session, "entitlement_cache", user_ids)
+
+    def invalidate(self, *user_ids):
+        """Drop the given users' entries, or every entry if none are given"""
+        self._state().invalidate(list(user_ids) or None)
+
+    def stats(self):
+        return self._state().stats()
+
+    @staticmethod
+    def _load(user_ids):
+        from app.services.entitlement_service import EntitlementService
+
+        return {
+            row.user_id: EntitlementSnapshot(row.plan_id, row.tier)
+            for row in EntitlementService.get_entitlements(user_ids)
+        }
+
+
+entitlement_cache = EntitlementCache()
+
+
+@on_commit("entitlement_cache", extension="entitlement_cache")
+def _invalidate_on_commit(user_ids):
+    if user_ids:
+        entitlement_cache.invalidate(*set(user_ids))
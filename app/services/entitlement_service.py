@@ -0,0 +1,72 @@
+from app.extensions import db
+from app.services import subscription_queries as queries
+from app.services.entitlement_cache import entitlement_cache
+from app.services.exceptions import InvalidPlanError
+from app.services.plan_catalog import plan_catalog
+from app.utils.clock import utcnow
+
+
+class EntitlementService:
+    """Service maintains and answers per-user plan entitlements"""
+
+    @staticmethod
+    def refresh(user_ids, now=None):
+        """
+        Rewrite the users' entitlement rows from their active subscriptions.
+
+        Runs in the caller's transaction, so the rows change atomically with
+        the subscription write that prompted the refresh; the caller commits.
+        The users are row-locked first so concurrent refreshes of the same
+        user serialize instead of racing on the primary key.
+        """
+        user_ids = sorted({int(user_id) for user_id in user_ids})
+        if not user_ids:
+            return
+        db.session.flush()
+        db.session.execute(queries.lock_users_select(user_ids))
+        db.session.execute(queries.entitlement_delete(user_ids))
+        db.session.execute(queries.entitlement_insert(now or utcnow(), user_ids))
+        entitlement_cache.mark_dirty(db.session, user_ids)
+
+    @staticmethod
+    def rebuild(batch_size=1000, now=None):
+        """
+        Recompute every user's entitlement, one page of users per
+        transaction, returning the number of rows written.
+        """
+        now = now or utcnow()
+        written, after = 0, 0
+        while True:
+            user_ids = (
+                db.session.execute(queries.user_ids_page_select(after, batch_size))
+                .scalars()
+                .all()
+            )
+            if not user_ids:
+                break
+            db.session.execute(queries.entitlement_delete(user_ids))
+            result = db.session.execute(queries.entitlement_insert(now, user_ids))
+            db.session.commit()
+            written += result.rowcount
+            after = user_ids[-1]
+        entitlement_cache.invalidate()
+        return written
+
+    @staticmethod
+    def get_entitlements(user_ids):
+        """(user_id, plan_id, tier) for those of the users with an entitlement"""
+        # read from the primary: this loads the entitlement cache, which must
+        # not cache a lagging replica's view after a subscription write
+        return db.session.execute(queries.entitlements_select(user_ids)).all()
+
+    @staticmethod
+    def check(user_ids, plan_id):
+        """{user_id: whether the user has `plan_id` or a plan of a higher tier}"""
+        plan = plan_catalog.get_plan(plan_id)
+        if plan is None:
+            raise InvalidPlanError()
+        current = entitlement_cache.get_many(user_ids)
+        return {
+            user_id: entitlement is not None and entitlement.tier >= plan.tier
+            for user_id, entitlement in current.items()
+        }
@@ -0,0 +1,217 @@
+import json
+from datetime import datetime, timedelta, timezone
+from itertools import takewhile
+from sqlalchemy import delete, func, insert, select
+from app.extensions import db
+from app.models.event_watermark_model import EventWatermark
+from app.models.job_checkpoint_model import JobCheckpoint
+from app.models.subscription_event_model import SubscriptionEvent
+from app.services.exceptions import EventsCompactedError
+from app.services.subscription_stream import subscription_stream
+from app.utils.clock import utcnow
+
+SUBSCRIPTION_CREATED = "subscription.created"
+SUBSCRIPTION_CANCELLED = "subscription.cancelled"
+SUBSCRIPTION_UPGRADED = "subscription.upgraded"
+SUBSCRIPTION_RENEWED = "subscription.renewed"
+SUBSCRIPTION_EXPIRED = "subscription.expired"
+
+# id of the newest compacted event; cursors of the full feed before it can't
+# be resumed (each user's feed has its own watermark in `event_watermarks`)
+COMPACTION_CHECKPOINT = "subscription_events_compacted"
+
+
+class EventService:
+    """Service records subscription lifecycle events and serves them as a feed"""
+
+    @staticmethod
+    def record(event_type, subscriptions, now=None):
+        """
+        Append an `event_type` event per subscription to the outbox.
+
+        `subscriptions` are dicts with at least `subscription_id` and
+        `user_id`; each becomes an event's data. The events are written in
+        the caller's transaction, which commits them with the change they
+        describe, so they should be recorded just before that commit. Open
+        streams of the users get the events once the transaction commits.
+        """
+        now = now or utcnow()
+        rows = [
+            {
+                "event_type": event_type,
+                "subscription_id": data["subscription_id"],
+                "user_id": data["user_id"],
+                "payload": json.dumps(data, default=_json_default),
+                "created_at": now,
+            }
+            for data in subscriptions
+        ]
+        if not rows:
+            return
+        recorded = db.session.execute(
+            insert(SubscriptionEvent).returning(
+                SubscriptionEvent.id,
+                SubscriptionEvent.user_id,
+                SubscriptionEvent.event_type,
+                SubscriptionEvent.payload,
+            ),
+            rows,
+        ).all()
+        subscription_stream.publish_on_commit(db.session, recorded)
+
+    @staticmethod
+    def get_events(after=0, limit=1000, settle_seconds=0, now=None, user_id=None):
+        """
+        Up to `limit` events after the cursor `after`, oldest first, and
+        whether more are ready. Only the user's events when `user_id` is
+        given.
+
+        Ids are allocated before commit, so with concurrent writers an event
+        can become visible after one with a higher id. Only events at least
+        `settle_seconds` old are served and a page stops at the first newer
+        one, so readers don't move past an event that is about to commit.
+
+        Raises EventsCompactedError once events of the feed after `after`
+        were compacted. `after=0` starts from the oldest event still kept.
+        """
+        cutoff = (now or utcnow()) - timedelta(seconds=settle_seconds)
+        query = (
+            select(
+                SubscriptionEvent.id,
+                SubscriptionEvent.user_id,
+                SubscriptionEvent.event_type,
+                SubscriptionEvent.payload,
+                SubscriptionEvent.created_at,
+            )
+            .where(SubscriptionEvent.id > after)
+            .order_by(SubscriptionEvent.id)
+            .limit(limit + 1)
+        )
+        if user_id is not None:
+            query = query.where(SubscriptionEvent.user_id == user_id)
+        rows = db.session.execute(query).all()
+        # checked after reading, so a compaction in between is not missed
+        EventService._check_compaction(after, user_id)
+        ready = list(takewhile(lambda row: row.created_at <= cutoff, rows))
+        return ready[:limit], len(ready) > limit
+
+    @staticmethod
+    def get_user_events(user_id, after, limit=100):
+        """
+        Up to `limit` of the user's events after the cursor `after`, oldest
+        first. Raises EventsCompactedError once the user's events after
+        `after` were compacted.
+        """
+        query = (
+            select(
+                SubscriptionEvent.id,
+                SubscriptionEvent.user_id,
+                SubscriptionEvent.event_type,
+                SubscriptionEvent.payload,
+            )
+            .where(SubscriptionEvent.user_id == user_id, SubscriptionEvent.id > after)
+            .order_by(SubscriptionEvent.id)
+            .limit(limit)
+        )
+        rows = db.session.execute(query).all()
+        EventService._check_compaction(after, user_id)
+        return rows
+
+    @staticmethod
+    def latest_event_id():
+        """The newest event id, where a reader starting now would resume from"""
+        latest = db.session.execute(select(func.max(SubscriptionEvent.id))).scalar()
+        return latest if latest is not None else EventService._compacted_through()
+
+    @staticmethod
+    def compact(retention, batch_size=5000, now=None):
+        """
+        Delete the events older than `retention`, oldest first, one batch
+        per transaction, returning how many were deleted.
+
+        Every event up to the id of the newest expired one is deleted, so a
+        cursor is either fully readable or rejected with EventsCompactedError.
+        Each batch also moves the watermarks of the users whose events it
+        deletes, so a user's feed only rejects cursors that lost their events.
+        """
+        cutoff = (now or utcnow()) - retention
+        through = db.session.execute(
+            select(SubscriptionEvent.id)
+            .where(SubscriptionEvent.created_at < cutoff)
+            .order_by(SubscriptionEvent.created_at.desc(), SubscriptionEvent.id.desc())
+            .limit(1)
+        ).scalar()
+        deleted = 0
+        while through is not None:
+            ids = (
+                db.session.execute(
+                    select(SubscriptionEvent.id)
+                    .where(SubscriptionEvent.id <= through)
+                    .order_by(SubscriptionEvent.id)
+                    .limit(batch_size)
+                )
+                .scalars()
+                .all()
+            )
+            if not ids:
+                break
+            EventService._advance_watermarks(ids[-1])
+            result = db.session.execute(
+                delete(SubscriptionEvent).where(SubscriptionEvent.id <= ids[-1])
+            )
+            db.session.merge(
+                JobCheckpoint(name=COMPACTION_CHECKPOINT, position=str(ids[-1]))
+            )
+            db.session.commit()
+            deleted += result.rowcount
+        return deleted
+
+    @staticmethod
+    def _check_compaction(after, user_id=None):
+        """Raise EventsCompactedError if the feed lost events after `after`"""
+        compacted_through = EventService._compacted_through(user_id)
+        if 0 < after < compacted_through:
+            raise EventsCompactedError(compacted_through)
+
+    @staticmethod
+    def _compacted_through(user_id=None):
+        """The newest compacted event id, of every user or only of `user_id`"""
+        if user_id is not None:
+            return (
+                db.session.execute(
+                    select(EventWatermark.compacted_through).where(
+                        EventWatermark.user_id == user_id
+                    )
+                ).scalar()
+                or 0
+            )
+        checkpoint = db.session.get(JobCheckpoint, COMPACTION_CHECKPOINT)
+        return int(checkpoint.position) if checkpoint else 0
+
+    @staticmethod
+    def _advance_watermarks(through):
+        """Move the watermarks of users with events up to `through` onto them"""
+        compacted = SubscriptionEvent.id <= through
+        db.session.execute(
+            delete(EventWatermark).where(
+                EventWatermark.user_id.in_(
+                    select(SubscriptionEvent.user_id).where(compacted)
+                )
+            )
+        )
+        db.session.execute(
+            insert(EventWatermark).from_select(
+                ["user_id", "compacted_through"],
+                select(SubscriptionEvent.user_id, func.max(SubscriptionEvent.id))
+                .where(compacted)
+                .group_by(SubscriptionEvent.user_id),
+            )
+        )
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
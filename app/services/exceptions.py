@@ -0,0 +1,37 @@
+class SubscriptionNotFoundError(ValueError):
+    """The subscription does not exist"""
+
+    def __init__(self, message="Subscription not found"):
+        super().__init__(message)
+
+
+class SubscriptionNotOwnedError(ValueError):
+    """The subscription belongs to another user"""
+
+    def __init__(self, message="Subscription does not belong to this user"):
+        super().__init__(message)
+
+
+class InvalidPlanError(ValueError):
+    """The plan does not exist or is no longer active"""
+
+    def __init__(self, message="Invalid or inactive subscription plan"):
+        super().__init__(message)
+
+
+class PasswordHashingBusyError(RuntimeError):
+    """Too many password hashes are already queued"""
+
+    def __init__(self, message="Too many logins in progress, retry shortly"):
+        super().__init__(message)
+
+
+class EventsCompactedError(LookupError):
+    """Events after the requested cursor have been deleted by compaction"""
+
+    def __init__(self, compacted_through):
+        self.compacted_through = compacted_through
+        super().__init__(
+            f"Events up to {compacted_through} have been compacted, "
+            "resynchronize and resume from a newer cursor"
+        )
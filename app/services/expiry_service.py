@@ -0,0 +1,156 @@
+import heapq
+import threading
+from datetime import timedelta
+from loguru import logger
+from app.extensions import db
+from app.services import subscription_queries as queries
+from app.services.entitlement_service import EntitlementService
+from app.services.event_service import SUBSCRIPTION_EXPIRED, EventService
+from app.utils.clock import utcnow
+
+
+class ExpiryService:
+    """Service deactivates non-renewing subscriptions once they lapse"""
+
+    @staticmethod
+    def expire_lapsed_subscriptions(now=None, since=None, batch_size=500):
+        """
+        Deactivate every lapsed subscription that won't be renewed, in chunks:
+        non-renewing ones, and auto-renewing ones whose plan was deactivated.
+
+        Walks `idx_subscription_lapse` in (end_date, id) order. Non-renewing
+        rows can start from `since` so periodic sweeps skip long-expired
+        history. Auto-renewing rows are always scanned in full: a plan can be
+        deactivated long after its subscriptions lapsed, and renewal keeps
+        the rest of that range short.
+        """
+        now = now or utcnow()
+        expired = 0
+        for lapsed in (
+            lambda position: queries.lapsed_select(
+                now, auto_renew=False, position=position, since=since
+            ),
+            lambda position: queries.unrenewable_select(now, position=position),
+        ):
+            position = None
+            while True:
+                rows = db.session.execute(lapsed(position).limit(batch_size)).fetchall()
+                if not rows:
+                    break
+
+                expired += ExpiryService.deactivate([row.id for row in rows], now)
+                db.session.commit()
+                position = (rows[-1].end_date, rows[-1].id)
+        return expired
+
+    @staticmethod
+    def upcoming_expiries(after, until):
+        """Non-renewing active subscriptions lapsing in (after, until]"""
+        return db.session.execute(queries.upcoming_expiries_select(after, until)).all()
+
+    @staticmethod
+    def deactivate(subscription_ids, now):
+        """
+        Flip is_active off for the given subscriptions if they have lapsed,
+        refreshing their owners' entitlements and recording expiry events in
+        the same transaction.
+        """
+        rows = db.session.execute(
+            queries.deactivate_statement(subscription_ids, now)
+        ).all()
+        if rows:
+            EntitlementService.refresh({row.user_id for row in rows}, now)
+            EventService.record(
+                SUBSCRIPTION_EXPIRED,
+                [dict(row._mapping, is_active=False) for row in rows],
+            )
+        return len(rows)
+
+
+class ExpiryScheduler:
+    """
+    Background scheduler that deactivates subscriptions as they lapse.
+
+    Upcoming end_dates are loaded from the index one `horizon` window at a
+    time into a min-heap, so memory is bounded by the number of expiries in
+    the window. Due entries are deactivated in small batches every `interval`
+    seconds, and a sweep every `sweep_interval` seconds catches rows whose
+    end_date moved after they were loaded.
+    """
+
+    def __init__(
+        self,
+        app,
+        horizon=timedelta(minutes=10),
+        interval=1.0,
+        sweep_interval=timedelta(minutes=5),
+        batch_size=500,
+    ):
+        self.app = app
+        self.horizon = horizon
+        self.interval = interval
+        self.sweep_interval = sweep_interval
+        self.batch_size = batch_size
+        self.expired = 0
+        self._heap = []
+        self._loaded_until = None
+        self._swept_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self.run_forever, name="expiry-scheduler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def run_forever(self):
+        logger.info("Subscription expiry scheduler started")
+        while not self._stop.is_set():
+            try:
+                with self.app.app_context():
+                    self.tick()
+            except Exception as ex:
+                logger.exception(f"Subscription expiry tick failed on error: {ex}")
+            self._stop.wait(self.interval)
+
+    def tick(self, now=None):
+        """Run one scheduling step, returning how many subscriptions expired"""
+        now = now or utcnow()
+        expired = 0
+        if self._swept_at is None or now - self._swept_at >= self.sweep_interval:
+            # the first sweep covers everything that lapsed while we were down
+            since = self._swept_at - self.sweep_interval if self._swept_at else None
+            expired += ExpiryService.expire_lapsed_subscriptions(
+                now, since=since, batch_size=self.batch_size
+            )
+            self._swept_at = now
+            if self._loaded_until is None:
+                self._loaded_until = now
+
+        if self._loaded_until < now + self.horizon:
+            until = now + self.horizon
+            for entry in ExpiryService.upcoming_expiries(self._loaded_until, until):
+                heapq.heappush(self._heap, (entry.end_date, entry.id))
+            self._loaded_until = until
+
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            due.append(heapq.heappop(self._heap)[1])
+        for start in range(0, len(due), self.batch_size):
+            expired += ExpiryService.deactivate(
+                due[start : start + self.batch_size], now
+            )
+            db.session.commit()
+
+        self.expired += expired
+        return expired
+
+    def pending(self):
+        return len(self._heap)
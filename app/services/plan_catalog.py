@@ -0,0 +1,185 @@
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+from app.models.plan_model import Plan
+from app.schemas import plan_list_schema
+from app.utils.commit_hooks import defer, on_commit
+from app.utils.response import make_etag, render_success_body
+
+PlanSnapshot = namedtuple(
+    "PlanSnapshot",
+    [
+        "id",
+        "name",
+        "description",
+        "price",
+        "duration_in_days",
+        "tier",
+        "is_active",
+        "updated_at",
+    ],
+)
+
+# `list_etag`/`plan_etags` hash the pre-rendered bodies, so they are stable
+# across processes and restarts; `last_modified` is the latest plan write
+CatalogSnapshot = namedtuple(
+    "CatalogSnapshot",
+    [
+        "version",
+        "plans",
+        "by_id",
+        "list_body",
+        "plan_bodies",
+        "list_etag",
+        "plan_etags",
+        "last_modified",
+    ],
+)
+
+
+class _CatalogState:
+    """The loaded catalog, its version and when it expires"""
+
+    def __init__(self, ttl_seconds):
+        self.lock = threading.Lock()
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self.snapshot = None
+        self.expires_at = 0
+        self.hits = 0
+        self.misses = 0
+
+
+class PlanCatalog:
+    """
+    In-process cache of the active plan catalog.
+
+    Holds immutable plan snapshots together with the pre-rendered response
+    bodies for the plan endpoints. Any committed insert, update or delete of a
+    `Plan` through the ORM in this process bumps the catalog version; writes
+    that bypass the ORM must call `invalidate()` themselves. Writes by other
+    processes are picked up when the catalog expires, at most
+    `PLAN_CATALOG_TTL_SECONDS` after it was loaded.
+    """
+
+    def init_app(self, app):
+        app.extensions["plan_catalog"] = _CatalogState(
+            ttl_seconds=app.config.get("PLAN_CATALOG_TTL_SECONDS", 10)
+        )
+
+    @staticmethod
+    def _state():
+        return current_app.extensions["plan_catalog"]
+
+    def snapshot(self):
+        """Return the current catalog, loading it from the database on a miss"""
+        state = self._state()
+        with state.lock:
+            snapshot = state.snapshot
+            if snapshot is not None and time.monotonic() < state.expires_at:
+                state.hits += 1
+                return snapshot
+            state.misses += 1
+            version = state.version
+
+        expires_at = time.monotonic() + state.ttl_seconds
+        snapshot = self._load(version)
+        with state.lock:
+            # a write may have landed while we were loading, only keep the
+            # snapshot if it still describes the current version
+            if state.version == version:
+                state.snapshot = snapshot
+                state.expires_at = expires_at
+        return snapshot
+
+    def invalidate(self):
+        """Drop the cached catalog and bump its version"""
+        state = self._state()
+        with state.lock:
+            state.version += 1
+            state.snapshot = None
+
+    def get_plan(self, plan_id):
+        """Return the active plan snapshot for `plan_id`, or None"""
+        return self.snapshot().by_id.get(plan_id)
+
+    def list_body(self):
+        """Pre-rendered body for the active plan listing"""
+        return self.snapshot().list_body
+
+    def plan_body(self, plan_id):
+        """Pre-rendered body for a single active plan, or None"""
+        return self.snapshot().plan_bodies.get(plan_id)
+
+    def version(self):
+        return self._state().version
+
+    def stats(self):
+        state = self._state()
+        with state.lock:
+            snapshot = state.snapshot
+            return {
+                "version": state.version,
+                "hits": state.hits,
+                "misses": state.misses,
+                "plans": len(snapshot.plans) if snapshot else 0,
+            }
+
+    @staticmethod
+    def _load(version):
+        from app.services.plan_service import PlanService
+
+        plans = tuple(
+            PlanSnapshot(
+                id=plan.id,
+                name=plan.name,
+                description=plan.description,
+                price=plan.price,
+                duration_in_days=plan.duration_in_days,
+                tier=plan.tier,
+                is_active=plan.is_active,
+                updated_at=plan.updated_at,
+            )
+            for plan in PlanService.get_all_active_plans()
+        )
+        dumped = plan_list_schema.dump(plans)
+        list_body = render_success_body({"plans": dumped})
+        plan_bodies = {
+            plan.id: render_success_body({"plan": data})
+            for plan, data in zip(plans, dumped)
+        }
+        return CatalogSnapshot(
+            version=version,
+            plans=plans,
+            by_id={plan.id: plan for plan in plans},
+            list_body=list_body,
+            plan_bodies=plan_bodies,
+            list_etag=make_etag(list_body),
+            plan_etags={
+                plan_id: make_etag(body) for plan_id, body in plan_bodies.items()
+            },
+            # over every plan, so deactivating one still moves it forward
+            last_modified=PlanService.get_last_modified(),
+        )
+
+
+plan_catalog = PlanCatalog()
+
+
+@event.listens_for(Plan, "after_insert")
+@event.listens_for(Plan, "after_update")
+@event.listens_for(Plan, "after_delete")
+def _mark_catalog_dirty(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        defer(session, "plan_catalog")
+
+
+@on_commit("plan_catalog", extension="plan_catalog")
+def _invalidate_on_commit(items):
+    plan_catalog.invalidate()
@@ -1,16 +1,25 @@
+from sqlalchemy import func
 from app.extensions import db
 from app.models.plan_model import Plan
+from app.utils.replicas import read_only
 
 
 class PlanService:
     @staticmethod
-    def create_plan(name: str, description: str, price: float, duration_in_days: int):
+    def create_plan(
+        name: str,
+        description: str,
+        price: float,
+        duration_in_days: int,
+        tier: int = 0,
+    ):
         """Add plan to the db"""
         plan = Plan(
             name=name,
             description=description,
             price=price,
             duration_in_days=duration_in_days,
+            tier=tier,
         )
         db.session.add(plan)
         db.session.commit()
@@ -19,10 +28,18 @@ class PlanService:
     @staticmethod
     def get_all_active_plans():
         """Fetch all active plans from the database"""
+        # read from the primary: this loads the plan catalog, which must not
+        # cache a lagging replica's view after a plan write
         plans = Plan.query.filter_by(is_active=True).all()
         return plans
 
     @staticmethod
+    def get_last_modified():
+        """Latest `updated_at` across all plans, active or not"""
+        return db.session.query(func.max(Plan.updated_at)).scalar()
+
+    @staticmethod
+    @read_only
     def get_plan_by_id(plan_id: int):
         """Fetch a plan by its ID"""
         plan = Plan.query.get(plan_id)
@@ -0,0 +1,103 @@
+import json
+import time
+from loguru import logger
+from app.extensions import db
+from app.models.job_checkpoint_model import JobCheckpoint
+from app.services import subscription_queries as queries
+from app.services.event_service import SUBSCRIPTION_RENEWED, EventService
+from app.utils.clock import utcnow
+
+RENEWAL_CHECKPOINT = "subscription_renewal"
+
+
+class RenewalService:
+    """Service renews lapsed auto-renewing subscriptions in set-based batches"""
+
+    @staticmethod
+    def renew_expired_subscriptions(
+        now=None, batch_size=1000, dry_run=False, resume=True
+    ):
+        """
+        Extend every active, auto-renewing subscription whose end_date has passed.
+
+        Candidates are walked in (end_date, id) order through
+        `idx_subscription_lapse`, one chunk per transaction. Each chunk is
+        extended by whole plan periods until it ends after `now`, so missed
+        runs are caught up in a single pass. The position of the last committed
+        chunk is checkpointed, and an interrupted run picks up from there.
+        """
+        now = now or utcnow()
+        position = RenewalService._load_checkpoint() if resume else None
+        if position:
+            logger.info(f"Resuming subscription renewal after {position}")
+
+        renewed = batches = 0
+        started = time.perf_counter()
+        while True:
+            rows = RenewalService._next_batch(now, position, batch_size)
+            if not rows:
+                break
+
+            ids = [row.id for row in rows]
+            position = (rows[-1].end_date, rows[-1].id)
+            if not dry_run:
+                RenewalService._extend(ids, now)
+                RenewalService._save_checkpoint(position)
+                db.session.commit()
+
+            renewed += len(ids)
+            batches += 1
+            elapsed = time.perf_counter() - started
+            logger.info(
+                f"Renewal batch {batches}: {len(ids)} rows "
+                f"({renewed / elapsed:.0f} rows/sec)"
+            )
+
+        if not dry_run:
+            RenewalService._clear_checkpoint()
+            db.session.commit()
+
+        elapsed = time.perf_counter() - started
+        return {
+            "renewed": renewed,
+            "batches": batches,
+            "dry_run": dry_run,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(renewed / elapsed, 1) if elapsed else 0.0,
+        }
+
+    @staticmethod
+    def _next_batch(now, position, batch_size):
+        """Fetch the next chunk of renewal candidates after `position`"""
+        query = queries.renewable_select(now, position).limit(batch_size)
+        return db.session.execute(query).fetchall()
+
+    @staticmethod
+    def _extend(ids, now):
+        """Push a chunk of subscriptions forward by whole plan periods past `now`"""
+        rows = db.session.execute(queries.renew_statement(ids, now)).all()
+        EventService.record(SUBSCRIPTION_RENEWED, [dict(row._mapping) for row in rows])
+
+    @staticmethod
+    def _load_checkpoint():
+        checkpoint = db.session.get(JobCheckpoint, RENEWAL_CHECKPOINT)
+        if not checkpoint:
+            return None
+        end_date, row_id = json.loads(checkpoint.position)
+        return end_date, row_id
+
+    @staticmethod
+    def _save_checkpoint(position):
+        end_date, row_id = position
+        db.session.merge(
+            JobCheckpoint(
+                name=RENEWAL_CHECKPOINT,
+                position=json.dumps([str(end_date), row_id]),
+            )
+        )
+
+    @staticmethod
+    def _clear_checkpoint():
+        checkpoint = db.session.get(JobCheckpoint, RENEWAL_CHECKPOINT)
+        if checkpoint:
+            db.session.delete(checkpoint)
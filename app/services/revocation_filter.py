@@ -0,0 +1,161 @@
+"""
+In-memory pre-filter for the token blocklist.
+
+A Bloom filter holds the `jti` of every revoked, unexpired token and the id
+of every user with a revoke-all in force. A token whose `jti` and user are
+both absent is not revoked, and that is decided without a query; only
+filter hits are confirmed against `token_blocklist`.
+
+The filter is refreshed at most every `TOKEN_BLOCKLIST_REFRESH_SECONDS`
+with the rows revoked since the last refresh (re-reading a short overlap,
+so rows committed late are not missed), and rebuilt from the unexpired rows
+every `TOKEN_BLOCKLIST_REBUILD_SECONDS` or once it outgrows its capacity,
+which drops expired entries. Revocations made by this process are added at
+once; those made by other processes are seen after the next refresh.
+"""
+
+import threading
+import time
+from datetime import timedelta
+
+from flask import current_app
+
+from app.utils.bloom import BloomFilter
+from app.utils.clock import utcnow
+
+REFRESH_OVERLAP = timedelta(seconds=10)
+
+
+def jti_key(jti):
+    return f"jti:{jti}"
+
+
+def user_key(user_id):
+    return f"user:{user_id}"
+
+
+class _FilterState:
+    """The Bloom filter of revoked tokens and when it was last refreshed"""
+
+    def __init__(self, capacity, error_rate, refresh_seconds, rebuild_seconds):
+        self.lock = threading.Lock()
+        self.stats_lock = threading.Lock()
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self.bloom = None
+        self.loaded_until = None
+        self.refreshed_at = 0.0
+        self.built_at = 0.0
+        self.checks = 0
+        self.filtered = 0
+        self.false_positives = 0
+
+
+class RevocationFilter:
+    """Answers "might this token be revoked?" from memory"""
+
+    def init_app(self, app):
+        app.extensions["revocation_filter"] = _FilterState(
+            capacity=app.config.get("TOKEN_BLOCKLIST_CAPACITY", 100000),
+            error_rate=app.config.get("TOKEN_BLOCKLIST_ERROR_RATE", 0.001),
+            refresh_seconds=app.config.get("TOKEN_BLOCKLIST_REFRESH_SECONDS", 1.0),
+            rebuild_seconds=app.config.get("TOKEN_BLOCKLIST_REBUILD_SECONDS", 3600),
+        )
+
+    @staticmethod
+    def _state():
+        return current_app.extensions["revocation_filter"]
+
+    def might_be_revoked(self, jti, user_id):
+        """(jti may be revoked, user may have a revoke-all) for a token"""
+        state = self._state()
+        if time.monotonic() - state.refreshed_at >= state.refresh_seconds:
+            # only the first load makes everyone wait; later refreshes are
+            # done by one thread while the others use the current filter
+            self._refresh(state, blocking=state.bloom is None)
+        bloom = state.bloom
+        hits = jti_key(jti) in bloom, user_key(user_id) in bloom
+        with state.stats_lock:
+            state.checks += 1
+            if not any(hits):
+                state.filtered += 1
+        return hits
+
+    def add(self, jti=None, user_id=None):
+        """Add a revocation committed by this process"""
+        state = self._state()
+        with state.lock:
+            if state.bloom is None:
+                return
+            if jti is not None:
+                _add_new(state.bloom, jti_key(jti))
+            if user_id is not None:
+                _add_new(state.bloom, user_key(user_id))
+
+    def record_false_positive(self):
+        state = self._state()
+        with state.stats_lock:
+            state.false_positives += 1
+
+    def rebuild(self):
+        """Reload the filter from the unexpired blocklist rows now"""
+        state = self._state()
+        with state.lock:
+            self._load(state, rebuild=True)
+
+    def stats(self):
+        state = self._state()
+        bloom = state.bloom
+        return {
+            "checks": state.checks,
+            "filtered": state.filtered,
+            "false_positives": state.false_positives,
+            "keys": bloom.count if bloom else 0,
+            "bytes": len(bloom.bits) if bloom else 0,
+        }
+
+    def _refresh(self, state, blocking):
+        if not state.lock.acquire(blocking=blocking):
+            return
+        try:
+            # another thread may have refreshed while we waited
+            if time.monotonic() - state.refreshed_at < state.refresh_seconds:
+                return
+            rebuild = (
+                state.bloom is None
+                or state.bloom.count > state.bloom.capacity
+                or time.monotonic() - state.built_at >= state.rebuild_seconds
+            )
+            self._load(state, rebuild)
+        finally:
+            state.lock.release()
+
+    @staticmethod
+    def _load(state, rebuild):
+        from app.services.token_service import TokenService
+
+        now = utcnow()
+        if rebuild:
+            rows = TokenService.active_revocations(now)
+            bloom = BloomFilter(max(state.capacity, 2 * len(rows)), state.error_rate)
+            state.built_at = time.monotonic()
+        else:
+            rows = TokenService.revocations_since(state.loaded_until - REFRESH_OVERLAP)
+            bloom = state.bloom
+        for jti, user_id in rows:
+            _add_new(bloom, jti_key(jti) if jti is not None else user_key(user_id))
+        state.bloom = bloom
+        state.loaded_until = now
+        state.refreshed_at = time.monotonic()
+
+
+def _add_new(bloom, key):
+    # the refresh overlap re-reads rows; skipping keys already present keeps
+    # `count` near the number of distinct keys
+    if key not in bloom:
+        bloom.add(key)
+
+
+revocation_filter = RevocationFilter()
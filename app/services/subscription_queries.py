@@ -0,0 +1,366 @@
+"""
+SQLAlchemy Core statements for subscription reads and writes.
+
+Statements are built from the model tables and the dialect-aware expressions
+in `app.utils.sql`, so the same service code runs on SQLite and PostgreSQL.
+"""
+
+from sqlalchemy import (
+    delete,
+    false,
+    func,
+    insert,
+    literal,
+    or_,
+    select,
+    true,
+    update,
+)
+from app.models.entitlement_model import Entitlement
+from app.models.plan_model import Plan
+from app.models.subscription_model import Subscription
+from app.models.user_model import User
+from app.utils.pagination import FORWARD, Cursor, keyset_filter, raw_value
+from app.utils.sql import add_days, days_between, seconds_ago, truncate_int
+
+subscriptions = Subscription.__table__
+plans = Plan.__table__
+users = User.__table__
+entitlements = Entitlement.__table__
+
+LISTING_CURSOR_FIELDS = ("created_at", "end_date", "updated_at")
+
+
+def listing_select(
+    user_id=None,
+    cursor_field="created_at",
+    cursor=None,
+    active_only=False,
+    future_only=False,
+    descending=True,
+):
+    """
+    Subscription rows joined with their plan, in keyset order.
+
+    `user_id=None` selects every user. The raw `cursor_field` value is
+    included as `cursor_value` for building the next page cursor.
+    """
+    if cursor_field not in LISTING_CURSOR_FIELDS:
+        raise ValueError(f"Cannot order subscriptions by {cursor_field}")
+    sort_column = subscriptions.c[cursor_field]
+
+    query = select(
+        subscriptions.c.id,
+        subscriptions.c.user_id,
+        subscriptions.c.plan_id,
+        subscriptions.c.start_date,
+        subscriptions.c.end_date,
+        subscriptions.c.is_active,
+        subscriptions.c.auto_renew,
+        subscriptions.c.created_at,
+        plans.c.name.label("plan_name"),
+        plans.c.price.label("plan_price"),
+        plans.c.description.label("plan_description"),
+        plans.c.duration_in_days.label("plan_duration_in_days"),
+        plans.c.tier.label("plan_tier"),
+        raw_value(sort_column).label("cursor_value"),
+    ).join_from(subscriptions, plans, subscriptions.c.plan_id == plans.c.id)
+
+    if user_id is not None:
+        query = query.where(subscriptions.c.user_id == user_id)
+    if active_only:
+        query = query.where(subscriptions.c.is_active == true())
+    if future_only:
+        query = query.where(subscriptions.c.end_date > func.current_timestamp())
+
+    keyset_clause, order_by = keyset_filter(
+        sort_column, subscriptions.c.id, cursor, descending=descending
+    )
+    if keyset_clause is not None:
+        query = query.where(keyset_clause)
+    return query.order_by(*order_by)
+
+
+def changes_select(user_id, cursor=None, settle_seconds=0):
+    """
+    The user's subscriptions in (updated_at, id) order after `cursor`,
+    leaving out rows updated within the last `settle_seconds`. The bound is
+    strict: with whole-second timestamps, rows of the cutoff second may
+    still be committing.
+    """
+    return listing_select(
+        user_id=user_id, cursor_field="updated_at", cursor=cursor, descending=False
+    ).where(subscriptions.c.updated_at < seconds_ago(settle_seconds))
+
+
+def active_user_ids_select(user_ids):
+    return select(users.c.id).where(
+        users.c.id.in_(user_ids), users.c.is_active == true()
+    )
+
+
+def upgrade_statement(subscription_id, new_plan_id, user_id):
+    """
+    Move a subscription to a new plan if the user owns it and the plan is
+    active. Both guards are in the WHERE clause, so a miss touches no row
+    and returns nothing; `write_miss_select` tells which guard failed.
+    """
+    duration = (
+        select(plans.c.duration_in_days)
+        .where(plans.c.id == new_plan_id, plans.c.is_active == true())
+        .scalar_subquery()
+    )
+    return (
+        update(subscriptions)
+        .where(
+            subscriptions.c.id == subscription_id,
+            subscriptions.c.user_id == user_id,
+            _plan_active(new_plan_id),
+        )
+        .values(
+            plan_id=new_plan_id,
+            end_date=add_days(subscriptions.c.end_date, duration),
+            updated_at=func.current_timestamp(),
+        )
+        .returning(
+            subscriptions.c.id,
+            subscriptions.c.plan_id,
+            subscriptions.c.end_date,
+        )
+    )
+
+
+def cancel_statement(subscription_id, user_id):
+    """Cancel a subscription if the user owns it; a miss returns nothing"""
+    return (
+        update(subscriptions)
+        .where(
+            subscriptions.c.id == subscription_id,
+            subscriptions.c.user_id == user_id,
+        )
+        .values(
+            is_active=false(),
+            auto_renew=false(),
+            updated_at=func.current_timestamp(),
+        )
+        .returning(
+            subscriptions.c.id,
+            subscriptions.c.plan_id,
+            subscriptions.c.end_date,
+            subscriptions.c.is_active,
+            subscriptions.c.auto_renew,
+        )
+    )
+
+
+def write_miss_select(subscription_id, user_id, new_plan_id=None):
+    """
+    Why a guarded upgrade or cancel matched no row: the subscription's row,
+    if any, with whether `user_id` owns it and, for upgrades, whether
+    `new_plan_id` is active.
+    """
+    columns = [(subscriptions.c.user_id == user_id).label("owned")]
+    if new_plan_id is not None:
+        columns.append(_plan_active(new_plan_id).label("plan_valid"))
+    return select(*columns).where(subscriptions.c.id == subscription_id)
+
+
+def lapsed_select(now, auto_renew, position=None, since=None):
+    """
+    Active subscriptions with the given auto_renew flag that ended by `now`.
+
+    Ordered by (end_date, id) so the scan is a range over
+    `idx_subscription_lapse`; `position` resumes after a raw (end_date, id)
+    pair and `since` bounds the scan from below.
+    """
+    query = (
+        select(
+            subscriptions.c.id,
+            raw_value(subscriptions.c.end_date).label("end_date"),
+        )
+        .where(
+            subscriptions.c.is_active == true(),
+            subscriptions.c.auto_renew == (true() if auto_renew else false()),
+            subscriptions.c.end_date <= now,
+        )
+        .order_by(subscriptions.c.end_date, subscriptions.c.id)
+    )
+    if since is not None:
+        query = query.where(subscriptions.c.end_date > since)
+    if position is not None:
+        clause, _ = keyset_filter(
+            subscriptions.c.end_date,
+            subscriptions.c.id,
+            _forward_cursor(position),
+            descending=False,
+        )
+        query = query.where(clause)
+    return query
+
+
+def renewable_select(now, position=None):
+    """Lapsed auto-renewing subscriptions whose plan is still active"""
+    return lapsed_select(now, auto_renew=True, position=position).where(_plan_active())
+
+
+def unrenewable_select(now, position=None):
+    """
+    Lapsed auto-renewing subscriptions whose plan was deactivated; renewal
+    skips them, so they expire like non-renewing ones
+    """
+    return lapsed_select(now, auto_renew=True, position=position).where(~_plan_active())
+
+
+def _plan_active(plan_id=None):
+    """Whether `plan_id`, or else the subscription's own plan, is active"""
+    return (
+        select(plans.c.id)
+        .where(
+            plans.c.id == (subscriptions.c.plan_id if plan_id is None else plan_id),
+            plans.c.is_active == true(),
+        )
+        .exists()
+    )
+
+
+def renew_statement(subscription_ids, now):
+    """Extend subscriptions by as many whole plan periods as needed to pass `now`"""
+    duration = (
+        select(plans.c.duration_in_days)
+        .where(plans.c.id == subscriptions.c.plan_id)
+        .scalar_subquery()
+    )
+    periods = truncate_int(days_between(subscriptions.c.end_date, now) / duration) + 1
+    return (
+        update(subscriptions)
+        .where(subscriptions.c.id.in_(subscription_ids))
+        .values(
+            end_date=add_days(subscriptions.c.end_date, periods * duration),
+            updated_at=func.current_timestamp(),
+        )
+        .returning(*_event_columns())
+    )
+
+
+def upcoming_expiries_select(after, until):
+    """Non-renewing active subscriptions lapsing in (after, until]"""
+    return (
+        select(subscriptions.c.end_date, subscriptions.c.id)
+        .where(
+            subscriptions.c.is_active == true(),
+            subscriptions.c.auto_renew == false(),
+            subscriptions.c.end_date > after,
+            subscriptions.c.end_date <= until,
+        )
+        .order_by(subscriptions.c.end_date, subscriptions.c.id)
+    )
+
+
+def deactivate_statement(subscription_ids, now):
+    """
+    Flip is_active off for lapsed subscriptions that won't be renewed: not
+    auto-renewing, or on a deactivated plan.
+
+    The lapse conditions are re-checked so rows renewed or upgraded since
+    they were scheduled are left alone.
+    """
+    return (
+        update(subscriptions)
+        .where(
+            subscriptions.c.id.in_(subscription_ids),
+            subscriptions.c.is_active == true(),
+            or_(subscriptions.c.auto_renew == false(), ~_plan_active()),
+            subscriptions.c.end_date <= now,
+        )
+        .values(is_active=false(), updated_at=func.current_timestamp())
+        .returning(*_event_columns())
+    )
+
+
+def _event_columns():
+    """The columns a lifecycle event reports, as RETURNING clauses"""
+    return (
+        subscriptions.c.id.label("subscription_id"),
+        subscriptions.c.user_id,
+        subscriptions.c.plan_id,
+        subscriptions.c.end_date,
+    )
+
+
+def best_active_select(user_ids=None):
+    """
+    Each user's best active subscription: highest plan tier, then latest
+    end_date. Limited to `user_ids`, or every user when None.
+    """
+    rank = func.row_number().over(
+        partition_by=subscriptions.c.user_id,
+        order_by=(
+            plans.c.tier.desc(),
+            subscriptions.c.end_date.desc(),
+            subscriptions.c.id.desc(),
+        ),
+    )
+    ranked = (
+        select(
+            subscriptions.c.user_id,
+            subscriptions.c.plan_id,
+            plans.c.tier,
+            subscriptions.c.id.label("subscription_id"),
+            rank.label("rank"),
+        )
+        .join_from(subscriptions, plans, subscriptions.c.plan_id == plans.c.id)
+        .where(
+            _users_clause(subscriptions.c.user_id, user_ids),
+            subscriptions.c.is_active == true(),
+        )
+        .subquery()
+    )
+    return select(
+        ranked.c.user_id, ranked.c.plan_id, ranked.c.tier, ranked.c.subscription_id
+    ).where(ranked.c.rank == 1)
+
+
+def user_ids_page_select(after, limit):
+    """The next `limit` user ids after `after`, in id order"""
+    return (
+        select(users.c.id).where(users.c.id > after).order_by(users.c.id).limit(limit)
+    )
+
+
+def lock_users_select(user_ids):
+    """Row-lock users in id order (a no-op on SQLite, which locks the database)"""
+    return (
+        select(users.c.id)
+        .where(users.c.id.in_(user_ids))
+        .order_by(users.c.id)
+        .with_for_update()
+    )
+
+
+def entitlements_select(user_ids):
+    return select(
+        entitlements.c.user_id, entitlements.c.plan_id, entitlements.c.tier
+    ).where(entitlements.c.user_id.in_(user_ids))
+
+
+def entitlement_delete(user_ids):
+    return delete(entitlements).where(entitlements.c.user_id.in_(user_ids))
+
+
+def entitlement_insert(now, user_ids=None):
+    """INSERT ... SELECT of the users' current entitlements (everyone's if None)"""
+    best = best_active_select(user_ids).add_columns(
+        literal(now, entitlements.c.updated_at.type).label("updated_at")
+    )
+    return insert(entitlements).from_select(
+        ["user_id", "plan_id", "tier", "subscription_id", "updated_at"], best
+    )
+
+
+def _users_clause(column, user_ids):
+    return true() if user_ids is None else column.in_(user_ids)
+
+
+def _forward_cursor(position):
+    end_date, row_id = position
+    return Cursor(FORWARD, end_date, row_id)
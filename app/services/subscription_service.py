@@ -2,30 +2,52 @@ from datetime import datetime, timedelta, timezone
 from app.extensions import db
 from app.models.subscription_model import Subscription
 from app.models.plan_model import Plan
-from sqlalchemy import text
-from dateutil.parser import parse as parse_datetime
+from app.services.exceptions import (
+    InvalidPlanError,
+    SubscriptionNotFoundError,
+    SubscriptionNotOwnedError,
+)
+from app.services.entitlement_service import EntitlementService
+from app.services.event_service import (
+    SUBSCRIPTION_CANCELLED,
+    SUBSCRIPTION_CREATED,
+    SUBSCRIPTION_UPGRADED,
+    EventService,
+)
+from app.services.plan_catalog import plan_catalog
+from app.services import subscription_queries as queries
+from app.schemas import dump_subscription_rows
+from app.utils.pagination import FORWARD, decode_cursor, encode_cursor, paginate_rows
+from app.utils.replicas import read_only, replica_router
+
+
+# updated_at has whole-second resolution on SQLite, so a change is only
+# synced once its second has passed by at least this much
+MIN_SYNC_SETTLE_SECONDS = 2
 
 
 class SubscriptionService:
     """Service handles subscrition database operations"""
 
     @staticmethod
+    @read_only
     def get_active_subscriptions(user_id: str, cursor=None, limit=10):
+        # is_active is cleared by the expiry scheduler as subscriptions lapse,
+        # so there is no end_date check here
         return SubscriptionService._fetch_subscriptions(
             user_id=user_id,
             cursor=cursor,
             limit=limit,
             cursor_field="end_date",
             active_only=True,
-            future_only=True,
         )
 
     @staticmethod
     def create_subscription(user_id: str, plan_id: int, auto_renew: bool = True):
         """Add subscription to the db"""
-        plan = Plan.query.get(plan_id)
+        plan = plan_catalog.get_plan(plan_id) or Plan.query.get(plan_id)
         if not plan or not plan.is_active:
-            raise ValueError("Invalid or inactive subscription plan")
+            raise InvalidPlanError()
         start_date = datetime.now(timezone.utc)
         end_date = start_date + timedelta(days=plan.duration_in_days)
 
@@ -38,35 +60,175 @@ class SubscriptionService:
             is_active=True,
         )
         db.session.add(subscription)
+        EntitlementService.refresh([user_id])
+        db.session.flush()
+        EventService.record(
+            SUBSCRIPTION_CREATED,
+            [
+                {
+                    "subscription_id": subscription.id,
+                    "user_id": subscription.user_id,
+                    "plan_id": plan_id,
+                    "start_date": start_date,
+                    "end_date": end_date,
+                    "auto_renew": auto_renew,
+                    "is_active": True,
+                }
+            ],
+        )
         db.session.commit()
+        replica_router.mark_write(user_id)
         return subscription
 
     @staticmethod
-    def upgrade_subscription(subscription_id: int, new_plan_id: int):
-        """Upgrade a user subscription to a new plan"""
-        sql_query = text(
-            """
-            WITH plan_info AS (
-                SELECT duration_in_days FROM plans WHERE id = :new_plan_id
+    def create_subscriptions_bulk(items, atomic=True, batch_size=500, user_id=None):
+        """
+        Create many subscriptions in a single transaction.
+
+        Plans are resolved once from the catalog and users with one query per
+        batch, end dates are computed in memory and rows are inserted with
+        multi-row INSERT ... RETURNING batches. Returns one result per item.
+        With `atomic=True` any invalid item aborts the whole request and
+        nothing is inserted; otherwise valid items are created and invalid
+        ones reported. With `user_id`, items default to that user and items
+        for anyone else are refused.
+        """
+        catalog = plan_catalog.snapshot().by_id
+        start_date = datetime.now(timezone.utc)
+        results = [None] * len(items)
+        rows, row_indexes = [], []
+        if user_id is not None:
+            items = [
+                {"user_id": user_id, **item} if isinstance(item, dict) else item
+                for item in items
+            ]
+
+        for start in range(0, len(items), batch_size):
+            batch = list(enumerate(items[start : start + batch_size], start))
+            user_ids = {
+                item.get("user_id")
+                for _, item in batch
+                if isinstance(item, dict) and _is_id(item.get("user_id"))
+            }
+            active_users = SubscriptionService._active_user_ids(user_ids)
+
+            for index, item in batch:
+                error = SubscriptionService._bulk_item_error(
+                    item, catalog, active_users, user_id
+                )
+                if error:
+                    results[index] = {"index": index, "status": "error", "error": error}
+                    continue
+
+                plan = catalog[item["plan_id"]]
+                rows.append(
+                    {
+                        "user_id": item["user_id"],
+                        "plan_id": plan.id,
+                        "auto_renew": item.get("auto_renew", True),
+                        "start_date": start_date,
+                        "end_date": start_date + timedelta(days=plan.duration_in_days),
+                        "is_active": True,
+                    }
+                )
+                row_indexes.append(index)
+
+        failed = len(items) - len(rows)
+        if atomic and failed:
+            return {"created": 0, "failed": failed, "results": results}
+
+        # RETURNING rows of a multi-row insert come back in parameter order
+        table = Subscription.__table__
+        insert_query = table.insert().returning(
+            table.c.id, sort_by_parameter_order=True
+        )
+        try:
+            for start in range(0, len(rows), batch_size):
+                batch_rows = rows[start : start + batch_size]
+                inserted = db.session.execute(insert_query, batch_rows)
+                for index, row in zip(row_indexes[start:], inserted):
+                    results[index] = {
+                        "index": index,
+                        "status": "created",
+                        "subscription_id": row.id,
+                    }
+            EntitlementService.refresh({row["user_id"] for row in rows})
+            EventService.record(
+                SUBSCRIPTION_CREATED,
+                [
+                    dict(row, subscription_id=results[index]["subscription_id"])
+                    for index, row in zip(row_indexes, rows)
+                ],
             )
-            UPDATE subscriptions
-            SET plan_id = :new_plan_id,
-                end_date = DATE(end_date, '+' || (SELECT duration_in_days FROM plan_info) || ' days')
-            WHERE id = :subscription_id
-            RETURNING *
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        replica_router.mark_write(*{row["user_id"] for row in rows})
+
+        return {"created": len(rows), "failed": failed, "results": results}
+
+    @staticmethod
+    def _bulk_item_error(item, catalog, active_users, user_id=None):
+        """Validate one bulk creation item, returning an error message or None"""
+        if not isinstance(item, dict):
+            return "Item must be an object"
+        if not _is_id(item.get("user_id")):
+            return "User ID is required"
+        if user_id is not None and item["user_id"] != user_id:
+            return "Cannot create subscriptions for another user"
+        if not _is_id(item.get("plan_id")):
+            return "Plan ID is required"
+        if not isinstance(item.get("auto_renew", True), bool):
+            return "auto_renew must be a boolean"
+        if item["plan_id"] not in catalog:
+            return "Invalid or inactive subscription plan"
+        if item["user_id"] not in active_users:
+            return "User not found"
+        return None
+
+    @staticmethod
+    def _active_user_ids(user_ids):
+        if not user_ids:
+            return set()
+        query = queries.active_user_ids_select(list(user_ids))
+        return set(db.session.execute(query).scalars())
+
+    @staticmethod
+    def upgrade_subscription(subscription_id: int, new_plan_id: int, user_id: str):
         """
+        Upgrade a user subscription to a new plan in a single statement.
+
+        Ownership and plan validity are checked in the UPDATE's WHERE clause,
+        so a successful upgrade costs one round trip and a miss leaves the
+        row untouched; one more select then tells which check failed.
+        """
+        statement = queries.upgrade_statement(
+            subscription_id, new_plan_id, int(user_id)
         )
-        result = db.session.execute(
-            sql_query,
-            {
-                "subscription_id": subscription_id,
-                "new_plan_id": new_plan_id,
-            },
+        row = db.session.execute(statement).fetchone()
+        if row is None:
+            SubscriptionService._raise_for_miss(
+                queries.write_miss_select(subscription_id, int(user_id), new_plan_id)
+            )
+        EntitlementService.refresh([user_id])
+        EventService.record(
+            SUBSCRIPTION_UPGRADED,
+            [
+                {
+                    "subscription_id": row.id,
+                    "user_id": int(user_id),
+                    "plan_id": row.plan_id,
+                    "end_date": row.end_date,
+                }
+            ],
         )
         db.session.commit()
-        return result.fetchone()
+        replica_router.mark_write(user_id)
+        return row
 
     @staticmethod
+    @read_only
     def get_subscription_history(user_id: str, cursor=None, limit=10):
         return SubscriptionService._fetch_subscriptions(
             user_id=user_id,
@@ -77,15 +239,83 @@ class SubscriptionService:
         )
 
     @staticmethod
-    def cancel_subscription(subscription_id: int):
-        """Cancle a users subscription"""
-        subscription = Subscription.query.get(subscription_id)
-        if not subscription:
-            raise ValueError("Subscription not found")
-        subscription.is_active = False
-        subscription.auto_renew = False
+    def get_subscription_changes(
+        user_id: str, since=None, limit=100, settle_seconds=MIN_SYNC_SETTLE_SECONDS
+    ):
+        """
+        The user's subscriptions changed after the sync token `since` (all of
+        them when None), oldest change first.
+
+        Still active subscriptions are returned in full; cancelled and expired
+        ones as tombstone ids. Resume from `next_since`.
+
+        `updated_at` is stamped when a transaction starts writing, not when it
+        commits, so a row can appear late with a timestamp the token has
+        already passed. Only rows updated strictly before the last
+        `settle_seconds` (at least MIN_SYNC_SETTLE_SECONDS) are served, which
+        is safe for transactions that commit within that delay. Reads the
+        primary: a lagging replica could expose a change late the same way.
+        """
+        settle_seconds = max(settle_seconds, MIN_SYNC_SETTLE_SECONDS)
+        limit = min(max(1, limit), 1000)
+        cursor = decode_cursor(since) if since else None
+        if cursor is not None and cursor.direction != FORWARD:
+            raise ValueError("Invalid sync token.")
+
+        query = queries.changes_select(user_id, cursor, settle_seconds)
+        rows = db.session.execute(query.limit(limit + 1)).fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if rows:
+            since = encode_cursor(rows[-1].cursor_value, rows[-1].id)
+
+        return {
+            "subscriptions": dump_subscription_rows(
+                row for row in rows if row.is_active
+            ),
+            "tombstones": [row.id for row in rows if not row.is_active],
+            "next_since": since,
+            "has_more": has_more,
+        }
+
+    @staticmethod
+    def cancel_subscription(subscription_id: int, user_id: str):
+        """Cancel a user subscription in a single ownership-checked statement"""
+        statement = queries.cancel_statement(subscription_id, int(user_id))
+        row = db.session.execute(statement).fetchone()
+        if row is None:
+            SubscriptionService._raise_for_miss(
+                queries.write_miss_select(subscription_id, int(user_id))
+            )
+        EntitlementService.refresh([user_id])
+        EventService.record(
+            SUBSCRIPTION_CANCELLED,
+            [
+                {
+                    "subscription_id": row.id,
+                    "user_id": int(user_id),
+                    "plan_id": row.plan_id,
+                    "end_date": row.end_date,
+                    "is_active": row.is_active,
+                    "auto_renew": row.auto_renew,
+                }
+            ],
+        )
         db.session.commit()
-        return subscription
+        replica_router.mark_write(user_id)
+        return row
+
+    @staticmethod
+    def _raise_for_miss(query):
+        """Raise for the guard a conditional write failed, read by `query`"""
+        miss = db.session.execute(query).fetchone()
+        db.session.rollback()
+        if miss is not None and not miss.owned:
+            raise SubscriptionNotOwnedError()
+        if miss is not None and not getattr(miss, "plan_valid", True):
+            raise InvalidPlanError()
+        # gone, or changed between the write and this read
+        raise SubscriptionNotFoundError()
 
     @staticmethod
     def _fetch_subscriptions(
@@ -99,82 +329,60 @@ class SubscriptionService:
     ):
         """Internal method to fetch subscriptions based on filters"""
         limit = min(max(1, limit), 100)
-        cursor_date = None
-        if cursor:
-            try:
-                cursor_date = datetime.fromisoformat(cursor)
-            except ValueError:
-                raise ValueError("Invalid cursor format.")
-
-        filters = ["s.user_id = :user_id"]
-        if active_only:
-            filters.append("s.is_active = TRUE")
-        if future_only:
-            filters.append("s.end_date > CURRENT_TIMESTAMP")
-        if cursor_date:
-            filters.append(f"s.{cursor_field} < :cursor_date")
-
-        filter_clause = " AND ".join(filters)
-        sql_query = text(
-            f"""
-            SELECT 
-                s.id,
-                s.user_id,
-                s.plan_id,
-                s.start_date,
-                s.end_date,
-                s.is_active,
-                s.auto_renew,
-                s.created_at,
-                p.name as plan_name,
-                p.price as plan_price,
-                p.description as plan_description,
-                p.duration_in_days as plan_duration_in_days,
-                strftime('%Y-%m-%dT%H:%M:%S', s.{cursor_field}) as cursor_value
-            FROM subscriptions s
-            JOIN plans p ON s.plan_id = p.id
-            WHERE {filter_clause}
-            ORDER BY s.{cursor_field} {order_by}
-            LIMIT :limit
-        """
+        page_cursor = decode_cursor(cursor) if cursor else None
+
+        query = queries.listing_select(
+            user_id=user_id,
+            cursor_field=cursor_field,
+            cursor=page_cursor,
+            active_only=active_only,
+            future_only=future_only,
+            descending=order_by == "DESC",
         )
 
-        params = {"user_id": user_id, "limit": limit}
-        if cursor_date:
-            params["cursor_date"] = cursor_date
+        # fetch one extra row so has_more is known without another round trip
+        result = db.session.execute(query.limit(limit + 1))
+        rows, pagination = paginate_rows(
+            result.fetchall(),
+            limit,
+            page_cursor,
+            key=lambda row: (row.cursor_value, row.id),
+        )
 
-        result = db.session.execute(sql_query, params)
-        rows = result.fetchall()
+        return {"data": dump_subscription_rows(rows), "pagination": pagination}
 
-        data = []
-        next_cursor = None
-        if rows:
-            for row in rows:
-                subscription = {
-                    "id": row.id,
-                    "user_id": row.user_id,
-                    "plan_id": row.plan_id,
-                    "start_date": parse_datetime(row.start_date),
-                    "end_date": parse_datetime(row.end_date),
-                    "is_active": bool(row.is_active),
-                    "auto_renew": bool(row.auto_renew),
-                    "created_at": parse_datetime(row.created_at),
-                    "plan": {
-                        "id": row.plan_id,
-                        "name": row.plan_name,
-                        "price": float(row.plan_price),
-                        "description": row.plan_description,
-                        "duration_in_days": row.plan_duration_in_days,
-                    },
-                }
-                data.append(subscription)
-            last_item = rows[-1]
-            next_cursor = last_item.cursor_value
+    @staticmethod
+    def iter_subscription_batches(
+        user_id=None,
+        cursor_field="created_at",
+        active_only=False,
+        future_only=False,
+        order_by="DESC",
+        batch_size=1000,
+    ):
+        """
+        Stream every matching subscription as batches of serialized rows.
 
-        return {
-            "data": data,
-            "pagination": {
-                "next_cursor": next_cursor,
-                "has_more": len(data) == limit,
-            },
-        }
+        Rows are pulled through a server-side cursor `batch_size` at a time,
+        so memory stays flat however many rows match. `user_id=None` exports
+        all users.
+        """
+        query = queries.listing_select(
+            user_id=user_id,
+            cursor_field=cursor_field,
+            active_only=active_only,
+            future_only=future_only,
+            descending=order_by == "DESC",
+        ).execution_options(yield_per=batch_size)
+
+        result = db.session.execute(query)
+        try:
+            for rows in result.partitions():
+                yield dump_subscription_rows(rows)
+        finally:
+            result.close()
+
+
+def _is_id(value):
+    # JSON true/false decode to bools, which are ints in Python
+    return isinstance(value, int) and not isinstance(value, bool)
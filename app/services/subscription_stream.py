@@ -0,0 +1,322 @@
+"""
+In-process fanout of subscription events to Server-Sent Events streams.
+
+Events recorded by `EventService` are pushed to their user's open streams
+once the transaction commits; rolled back events are dropped. Events
+committed by other processes (other workers, the renewal job, the expiry
+scheduler) are picked up by a tailer thread that reads the outbox feed every
+`SUBSCRIPTION_STREAM_POLL_SECONDS` while this process has open streams, one
+query per process however many clients are connected.
+
+Each stream buffers at most `SUBSCRIPTION_STREAM_MAX_QUEUED` events. A
+stream that falls further behind drops its buffer and catches up from the
+outbox instead, so memory per connection is bounded and no event is lost.
+At most `SUBSCRIPTION_STREAM_MAX_CONNECTIONS` streams are open per process;
+each holds a worker thread while it is open.
+"""
+
+import threading
+import time
+from collections import defaultdict, deque
+
+from flask import current_app
+from loguru import logger
+
+from app.extensions import db
+from app.services.exceptions import EventsCompactedError
+from app.utils.commit_hooks import defer, on_commit
+from app.utils.sse import sse_comment, sse_event, sse_retry
+
+RESYNC_EVENT = "resync"
+# how long clients wait before reconnecting, and outbox rows read per query
+# when a stream catches up
+RETRY_MS = 3000
+REPLAY_BATCH_SIZE = 100
+
+
+class _Stream:
+    """An open connection's bounded buffer of events"""
+
+    def __init__(self, user_id, max_queued):
+        self.user_id = user_id
+        self.max_queued = max_queued
+        self.ready = threading.Condition()
+        self.events = deque()
+        self.overflowed = False
+
+    def put(self, event):
+        """Buffer an event, returning False if the buffer just overflowed"""
+        with self.ready:
+            if self.overflowed:
+                return True
+            if len(self.events) >= self.max_queued:
+                # the reader will catch up from the outbox instead
+                self.events.clear()
+                self.overflowed = True
+            else:
+                self.events.append(event)
+            self.ready.notify()
+            return not self.overflowed
+
+    def take(self, timeout):
+        """(buffered events, whether some were dropped), waiting up to `timeout`"""
+        with self.ready:
+            if not self.events and not self.overflowed:
+                self.ready.wait(timeout)
+            events, self.events = list(self.events), deque()
+            overflowed, self.overflowed = self.overflowed, False
+            return events, overflowed
+
+
+class _StreamState:
+    """Open streams by user, the outbox tailer and delivery counters"""
+
+    def __init__(
+        self,
+        app,
+        max_connections,
+        max_queued,
+        heartbeat_seconds,
+        poll_seconds,
+        settle_seconds,
+    ):
+        self.app = app
+        self.lock = threading.Lock()
+        self.max_connections = max_connections
+        self.max_queued = max_queued
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self.settle_seconds = settle_seconds
+        # user id -> open streams
+        self.streams = defaultdict(set)
+        self.connections = 0
+        self.tailer = None
+        self.tailed_through = 0
+        # ids pushed on local commit that the tailer has yet to pass
+        self.published = set()
+        self.opened = 0
+        self.rejected = 0
+        self.pushed = 0
+        self.overflows = 0
+
+
+class SubscriptionStream:
+    """Pushes users' subscription events to their open streams"""
+
+    def init_app(self, app):
+        app.extensions["subscription_stream"] = _StreamState(
+            app,
+            max_connections=app.config.get("SUBSCRIPTION_STREAM_MAX_CONNECTIONS", 1000),
+            max_queued=app.config.get("SUBSCRIPTION_STREAM_MAX_QUEUED", 100),
+            heartbeat_seconds=app.config.get(
+                "SUBSCRIPTION_STREAM_HEARTBEAT_SECONDS", 15
+            ),
+            poll_seconds=app.config.get("SUBSCRIPTION_STREAM_POLL_SECONDS", 1),
+            settle_seconds=app.config.get("EVENT_FEED_SETTLE_SECONDS", 1),
+        )
+
+    @staticmethod
+    def _state():
+        return current_app.extensions["subscription_stream"]
+
+    def open(self, user_id):
+        """Register a stream for the user, or None when at capacity"""
+        state = self._state()
+        with state.lock:
+            if state.connections >= state.max_connections:
+                state.rejected += 1
+                return None
+            stream = _Stream(user_id, state.max_queued)
+            state.streams[user_id].add(stream)
+            state.connections += 1
+            state.opened += 1
+            start_tailer = state.tailer is None and state.poll_seconds > 0
+            if start_tailer:
+                state.tailer = threading.Thread(
+                    target=self._tail,
+                    args=(state,),
+                    name="subscription-stream-tailer",
+                    daemon=True,
+                )
+        if start_tailer:
+            state.tailed_through = self._latest_event_id()
+            state.tailer.start()
+        return stream
+
+    def close(self, stream):
+        state = self._state()
+        with state.lock:
+            streams = state.streams.get(stream.user_id)
+            if streams is None or stream not in streams:
+                return
+            streams.discard(stream)
+            if not streams:
+                del state.streams[stream.user_id]
+            state.connections -= 1
+
+    def messages(self, stream, last_event_id=None, until=None):
+        """
+        The stream as Server-Sent Events chunks: the user's events after
+        `last_event_id` from the outbox, then live events, with a heartbeat
+        comment after every idle `SUBSCRIPTION_STREAM_HEARTBEAT_SECONDS`.
+        Ends at `until` (Unix time), when the client's token expires; the
+        stream is closed however it ends.
+        """
+        state = self._state()
+        try:
+            # a new client starts from now
+            sent_through = (
+                self._latest_event_id() if last_event_id is None else last_event_id
+            )
+            yield sse_retry(RETRY_MS)
+            # queued events up to here were already sent by a replay
+            replayed_through = 0
+            if last_event_id is not None:
+                for chunk, sent_through in self._replay(stream, last_event_id):
+                    yield chunk
+                replayed_through = sent_through
+
+            while until is None or time.time() < until:
+                timeout = state.heartbeat_seconds
+                if until is not None:
+                    timeout = max(0, min(timeout, until - time.time()))
+                events, overflowed = stream.take(timeout)
+                if overflowed:
+                    for chunk, sent_through in self._replay(stream, sent_through):
+                        yield chunk
+                    replayed_through = sent_through
+                events = [event for event in events if event.id > replayed_through]
+                if events:
+                    sent_through = max(sent_through, events[-1].id)
+                    yield b"".join(
+                        sse_event(event.id, event.event_type, event.payload)
+                        for event in events
+                    )
+                elif not overflowed:
+                    yield sse_comment("heartbeat")
+        finally:
+            self.close(stream)
+
+    def publish(self, events):
+        """Push committed events (id, user_id, event_type, payload) to streams"""
+        state = self._state()
+        with state.lock:
+            if state.tailer is not None:
+                state.published.update(event.id for event in events)
+        self._fanout(state, events)
+
+    def publish_on_commit(self, session, events):
+        """Publish `events` once `session` commits, or drop them on rollback"""
+        defer(session, "subscription_stream", events)
+
+    def poll(self):
+        """Push events committed by other processes since the last poll"""
+        state = self._state()
+        while True:
+            from app.services.event_service import EventService
+
+            try:
+                events, has_more = EventService.get_events(
+                    state.tailed_through,
+                    limit=1000,
+                    settle_seconds=state.settle_seconds,
+                )
+            except EventsCompactedError as err:
+                state.tailed_through = err.compacted_through
+                continue
+            finally:
+                db.session.remove()
+            if events:
+                with state.lock:
+                    state.tailed_through = events[-1].id
+                    fresh = [e for e in events if e.id not in state.published]
+                    state.published = {
+                        event_id
+                        for event_id in state.published
+                        if event_id > state.tailed_through
+                    }
+                self._fanout(state, fresh)
+            if not has_more:
+                return
+
+    def stats(self):
+        state = self._state()
+        with state.lock:
+            return {
+                "connections": state.connections,
+                "opened": state.opened,
+                "rejected": state.rejected,
+                "pushed": state.pushed,
+                "overflows": state.overflows,
+            }
+
+    def _fanout(self, state, events):
+        with state.lock:
+            targets = [
+                (stream, event)
+                for event in events
+                for stream in state.streams.get(event.user_id, ())
+            ]
+        overflows = sum(not stream.put(event) for stream, event in targets)
+        with state.lock:
+            state.pushed += len(targets)
+            state.overflows += overflows
+
+    def _replay(self, stream, after):
+        """(chunk, last id sent) for each page of the user's events after `after`"""
+        from app.services.event_service import EventService
+
+        try:
+            while True:
+                try:
+                    rows = EventService.get_user_events(
+                        stream.user_id, after, REPLAY_BATCH_SIZE
+                    )
+                except EventsCompactedError:
+                    # events the client missed are gone; it must reload its state
+                    after = EventService.latest_event_id()
+                    yield sse_event(after, RESYNC_EVENT, "{}"), after
+                    return
+                if not rows:
+                    return
+                after = rows[-1].id
+                yield b"".join(
+                    sse_event(row.id, row.event_type, row.payload) for row in rows
+                ), after
+                if len(rows) < REPLAY_BATCH_SIZE:
+                    return
+        finally:
+            # don't hold a pooled connection while the stream waits
+            db.session.remove()
+
+    def _tail(self, state):
+        while True:
+            with state.lock:
+                if not state.connections:
+                    state.tailer = None
+                    state.published.clear()
+                    return
+            try:
+                with state.app.app_context():
+                    self.poll()
+            except Exception as ex:
+                logger.exception(f"Subscription stream poll failed on error: {ex}")
+            time.sleep(state.poll_seconds)
+
+    @staticmethod
+    def _latest_event_id():
+        from app.services.event_service import EventService
+
+        try:
+            return EventService.latest_event_id()
+        finally:
+            db.session.remove()
+
+
+subscription_stream = SubscriptionStream()
+
+
+@on_commit("subscription_stream", extension="subscription_stream")
+def _publish_on_commit(events):
+    if events:
+        subscription_stream.publish(events)
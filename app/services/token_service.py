@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from sqlalchemy import delete, select
+from app.extensions import db
+from app.models.token_blocklist_model import RevokedToken
+from app.services.revocation_filter import revocation_filter
+from app.utils.clock import utcnow
+
+
+class TokenService:
+    """Service handles access token revocation"""
+
+    @staticmethod
+    def revoke_token(jwt_payload):
+        """Revoke a single token until it expires"""
+        db.session.add(
+            RevokedToken(
+                jti=jwt_payload["jti"],
+                user_id=int(jwt_payload["sub"]),
+                revoked_at=utcnow(),
+                expires_at=_from_timestamp(jwt_payload["exp"]),
+            )
+        )
+        db.session.commit()
+        revocation_filter.add(jti=jwt_payload["jti"])
+
+    @staticmethod
+    def revoke_all_for_user(user_id, commit=True):
+        """
+        Revoke every token issued to the user up to now.
+
+        Token issue times have whole-second resolution, so a token issued
+        later within the same second is revoked too.
+        """
+        now = utcnow()
+        db.session.add(
+            RevokedToken(
+                user_id=int(user_id),
+                revoked_at=now,
+                expires_at=now + _token_lifetime(),
+            )
+        )
+        if commit:
+            db.session.commit()
+            revocation_filter.add(user_id=user_id)
+
+    @staticmethod
+    def is_revoked(jwt_payload):
+        """
+        Whether a decoded token has been revoked.
+
+        The in-memory filter settles the common, not revoked case without a
+        query; filter hits are confirmed against the blocklist.
+        """
+        jti, user_id = jwt_payload["jti"], jwt_payload["sub"]
+        jti_hit, user_hit = revocation_filter.might_be_revoked(jti, user_id)
+        if not (jti_hit or user_hit):
+            return False
+        revoked = (jti_hit and TokenService._jti_revoked(jti)) or (
+            user_hit and TokenService._revoked_for_user(user_id, jwt_payload["iat"])
+        )
+        if not revoked:
+            revocation_filter.record_false_positive()
+        return revoked
+
+    @staticmethod
+    def _jti_revoked(jti):
+        query = select(RevokedToken.id).where(RevokedToken.jti == jti)
+        return db.session.execute(query.limit(1)).first() is not None
+
+    @staticmethod
+    def _revoked_for_user(user_id, issued_at):
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return False
+        query = select(RevokedToken.id).where(
+            RevokedToken.user_id == user_id,
+            RevokedToken.jti.is_(None),
+            RevokedToken.revoked_at >= _from_timestamp(issued_at),
+        )
+        return db.session.execute(query.limit(1)).first() is not None
+
+    @staticmethod
+    def revocations_since(since):
+        """(jti, user_id) of the rows revoked at or after `since`"""
+        query = select(RevokedToken.jti, RevokedToken.user_id).where(
+            RevokedToken.revoked_at >= since
+        )
+        return db.session.execute(query).all()
+
+    @staticmethod
+    def active_revocations(now):
+        """(jti, user_id) of the rows still covering unexpired tokens"""
+        query = select(RevokedToken.jti, RevokedToken.user_id).where(
+            RevokedToken.expires_at > now
+        )
+        return db.session.execute(query).all()
+
+    @staticmethod
+    def purge_expired(now=None):
+        """Delete rows whose tokens have all expired, returning how many"""
+        result = db.session.execute(
+            delete(RevokedToken).where(RevokedToken.expires_at <= (now or utcnow()))
+        )
+        db.session.commit()
+        return result.rowcount
+
+
+def _from_timestamp(value):
+    return datetime.fromtimestamp(value, timezone.utc).replace(tzinfo=None)
+
+
+def _token_lifetime():
+    expires = current_app.config["JWT_ACCESS_TOKEN_EXPIRES"]
+    if isinstance(expires, timedelta):
+        return expires
+    # False means tokens never expire; keep the cutoff for a long time
+    return timedelta(seconds=expires) if expires else timedelta(days=3650)
@@ -0,0 +1,113 @@
+"""
+In-process cache of user snapshots for identity resolution.
+
+JWT-protected requests resolve the token's `sub` to a `UserSnapshot` here
+instead of loading the user row. Snapshots are cached for deactivated users
+too, so their tokens are rejected without a query. The cache holds at most
+`USER_CACHE_MAX_ENTRIES` users, evicting the least recently used, and each
+entry lives for `USER_CACHE_TTL_SECONDS`.
+
+Any committed insert, update or delete of a `User` through the ORM drops that
+user's entry; writes that bypass the ORM must call `invalidate()` themselves.
+Other processes see such writes once their entry expires.
+"""
+
+import sys
+from collections import namedtuple
+
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+from app.models.user_model import User
+from app.utils.commit_hooks import defer, on_commit
+from app.utils.lru import TTLCache
+
+UserSnapshot = namedtuple(
+    "UserSnapshot",
+    ["id", "username", "email", "is_active", "created_at", "updated_at"],
+)
+
+# entry overhead: the OrderedDict slot and link, the key and the entry tuple
+_ENTRY_OVERHEAD = 100 + sys.getsizeof(0) + sys.getsizeof((None, None, None))
+
+
+def _snapshot_size(snapshot):
+    if snapshot is None:
+        return _ENTRY_OVERHEAD
+    return (
+        _ENTRY_OVERHEAD
+        + sys.getsizeof(snapshot)
+        + sum(sys.getsizeof(value) for value in snapshot)
+    )
+
+
+class UserCache:
+    """Bounded TTL/LRU cache of immutable user snapshots"""
+
+    def init_app(self, app):
+        # values are snapshots, or None for no such user
+        app.extensions["user_cache"] = TTLCache(
+            max_entries=app.config.get("USER_CACHE_MAX_ENTRIES", 10000),
+            ttl_seconds=app.config.get("USER_CACHE_TTL_SECONDS", 30),
+            sizeof=_snapshot_size,
+        )
+
+    @staticmethod
+    def _state():
+        return current_app.extensions["user_cache"]
+
+    def get(self, user_id):
+        """The snapshot of user `user_id`, active or not, or None if there is none"""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        cache = self._state()
+        found, generation = cache.lookup((user_id,))
+        if user_id in found:
+            return found[user_id]
+        snapshot = self._load(user_id)
+        cache.store({user_id: snapshot}, generation)
+        return snapshot
+
+    def invalidate(self, *user_ids):
+        """Drop the given users' entries, or every entry if none are given"""
+        self._state().invalidate([int(user_id) for user_id in user_ids] or None)
+
+    def stats(self):
+        return self._state().stats()
+
+    @staticmethod
+    def _load(user_id):
+        from app.services.user_service import UserService
+
+        row = UserService.get_user_identity(user_id)
+        if row is None:
+            return None
+        return UserSnapshot(
+            id=row.id,
+            username=row.username,
+            email=row.email,
+            is_active=bool(row.is_active),
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+        )
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(User, "after_insert")
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _mark_user_dirty(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        defer(session, "user_cache", [target.id])
+
+
+@on_commit("user_cache", extension="user_cache")
+def _invalidate_on_commit(user_ids):
+    if user_ids:
+        user_cache.invalidate(*set(user_ids))
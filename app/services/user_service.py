@@ -1,7 +1,11 @@
-from sqlalchemy import or_
+from sqlalchemy import or_, select
 from app.extensions import db
 
 from app.models.user_model import User
+from app.services.revocation_filter import revocation_filter
+from app.services.token_service import TokenService
+from app.utils.passwords import password_hasher
+from app.utils.replicas import read_only, replica_router
 
 
 class UserService:
@@ -10,18 +14,37 @@ class UserService:
     @staticmethod
     def create_user(username: str, email: str, password: str):
         """Add user to the db"""
-        user = User(username=username, email=email, pass_hash=password)
-        user.set_password(password)
+        user = User(
+            username=username, email=email, pass_hash=password_hasher.hash(password)
+        )
         db.session.add(user)
         db.session.commit()
+        replica_router.mark_write(user.id)
         return user
 
     @staticmethod
+    @read_only
     def get_user_details_by_id(user_id: str):
         """Fetches users details from database given user id"""
         user = User.query.filter_by(id=user_id, is_active=True).first()
         return user
 
+    @staticmethod
+    @read_only
+    def get_user_identity(user_id: int):
+        """
+        Columns the user cache snapshots, for a user active or not, or None.
+        """
+        query = select(
+            User.id,
+            User.username,
+            User.email,
+            User.is_active,
+            User.created_at,
+            User.updated_at,
+        ).where(User.id == user_id)
+        return db.session.execute(query).first()
+
     @staticmethod
     def get_user_details_by_username(username: str):
         """Fetches users details from database given username"""
@@ -40,11 +63,34 @@ class UserService:
 
     @staticmethod
     def authenticate_user(username: str, password: str):
-        """Authenticate user with username and password"""
-        users_data = UserService.get_user_details_by_username(username)
-        if not users_data:
+        """
+        Authenticate user with username and password.
+
+        One query loads the user; the hash is checked on the password
+        hashing pool. A hash made with an outdated method is replaced with
+        one made with the configured method while the password is at hand.
+        """
+        user = UserService.get_user_details_by_username(username)
+        if not user or not password_hasher.verify(user.pass_hash, password):
             return None
-        user = User.query.get(users_data.id)
-        if user and user.check_password(password):
-            return user
-        return None
+        if password_hasher.needs_rehash(user.pass_hash):
+            user.pass_hash = password_hasher.hash(password)
+            db.session.commit()
+            password_hasher.record_rehash()
+        return user
+
+    @staticmethod
+    def deactivate_user(user_id: int):
+        """
+        Deactivate a user and revoke every token issued to them, in one
+        transaction. Returns False when there is no active user by that id.
+        """
+        user = db.session.get(User, user_id)
+        if not user or not user.is_active:
+            return False
+        user.is_active = False
+        TokenService.revoke_all_for_user(user.id, commit=False)
+        db.session.commit()
+        revocation_filter.add(user_id=user.id)
+        replica_router.mark_write(user.id)
+        return True
@@ -0,0 +1,38 @@
+"""JWT callbacks registered on the shared JWTManager, and service tokens"""
+
+from flask_jwt_extended import create_access_token, get_jwt
+from app.extensions import jwt
+from app.services.token_service import TokenService
+from app.services.user_cache import user_cache
+
+# claim of tokens issued to backend services, which may read every user's
+# entitlements and events; login never sets it
+SERVICE_CLAIM = "service"
+
+
+@jwt.token_in_blocklist_loader
+def token_in_blocklist(jwt_header, jwt_payload):
+    return TokenService.is_revoked(jwt_payload)
+
+
+@jwt.user_lookup_loader
+def load_current_user(jwt_header, jwt_payload):
+    """
+    `current_user` for protected routes: the cached snapshot of the token's
+    user. Unknown and deactivated users get None, which makes the request
+    fail with 401.
+    """
+    user = user_cache.get(jwt_payload["sub"])
+    return user if user is not None and user.is_active else None
+
+
+def create_service_token(user_id):
+    """An access token for a backend service, acting as the given user"""
+    return create_access_token(
+        identity=str(user_id), additional_claims={SERVICE_CLAIM: True}
+    )
+
+
+def is_service_token():
+    """Whether the current request's token was issued to a backend service"""
+    return get_jwt().get(SERVICE_CLAIM) is True
@@ -0,0 +1,6 @@
+from datetime import datetime, timezone
+
+
+def utcnow():
+    """The current UTC time, naive like the values in DateTime columns"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
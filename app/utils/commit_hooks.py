@@ -0,0 +1,50 @@
+"""
+Work deferred until the session's transaction commits.
+
+Writes note what they changed with `defer(session, key, items)`. Once the
+session commits, the handler registered for `key` with `on_commit` is called
+with everything deferred under that key since the last commit; a rollback
+drops it. Handlers run only inside an app context whose `app.extensions`
+has their extension, since that is where the caches and streams they update
+live.
+"""
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_PENDING = "commit_hooks_pending"
+
+# key -> (extension name, handler)
+_handlers = {}
+
+
+def on_commit(key, extension):
+    """Register the decorated function to handle `key` after each commit"""
+
+    def register(handler):
+        _handlers[key] = (extension, handler)
+        return handler
+
+    return register
+
+
+def defer(session, key, items=()):
+    """Hand `items` to the `key` handler once `session` commits"""
+    session.info.setdefault(_PENDING, {}).setdefault(key, []).extend(items)
+
+
+@event.listens_for(Session, "after_commit")
+def _run_on_commit(session):
+    pending = session.info.pop(_PENDING, None)
+    if not pending or not has_app_context():
+        return
+    for key, items in pending.items():
+        extension, handler = _handlers[key]
+        if extension in current_app.extensions:
+            handler(items)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_rollback(session):
+    session.info.pop(_PENDING, None)
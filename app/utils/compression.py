@@ -0,0 +1,187 @@
+"""
+Accept-Encoding negotiated response compression.
+
+An after_request hook compresses JSON, NDJSON and text responses with the
+best encoding the client accepts, in the server's order of preference:
+brotli and zstd when their libraries are installed, then gzip. Buffered
+bodies under `COMPRESSION_MIN_SIZE` bytes are sent as is; streamed bodies
+are compressed chunk by chunk as they are sent. Responses that already
+carry a Content-Encoding, such as `/export?gzip=true`, are left alone.
+
+Per-encoding input bytes, output bytes and compression CPU time are kept for
+/metrics, so `COMPRESSION_LEVELS` can be tuned against real traffic.
+"""
+
+import threading
+import time
+import zlib
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "application/x-ndjson")
+DEFAULT_LEVELS = {"br": 4, "zstd": 3, "gzip": 6}
+
+
+class _BrotliStream:
+    """brotli.Compressor behind the zlib compressobj interface"""
+
+    def __init__(self, quality):
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def flush(self):
+        return self.compressor.finish()
+
+
+def _gzip_stream(level):
+    return zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+
+def _zstd_stream(level):
+    return zstandard.ZstdCompressor(level=level).compressobj()
+
+
+# encoding: (stream factory, installed)
+ENCODINGS = {
+    "br": (_BrotliStream, brotli is not None),
+    "zstd": (_zstd_stream, zstandard is not None),
+    "gzip": (_gzip_stream, True),
+}
+
+
+def available_encodings(preferred):
+    """The encodings in `preferred` whose library is installed, in order"""
+    return [name for name in preferred if name in ENCODINGS and ENCODINGS[name][1]]
+
+
+class _CompressionState:
+    """Enabled encodings with their levels, and bytes saved per encoding"""
+
+    def __init__(self, encodings, levels, min_size):
+        self.lock = threading.Lock()
+        self.encodings = encodings
+        self.levels = levels
+        self.min_size = min_size
+        self.counters = {
+            name: {"responses": 0, "bytes_in": 0, "bytes_out": 0, "cpu_seconds": 0.0}
+            for name in encodings
+        }
+
+    def record(self, encoding, bytes_in, bytes_out, cpu_seconds):
+        with self.lock:
+            counters = self.counters[encoding]
+            counters["responses"] += 1
+            counters["bytes_in"] += bytes_in
+            counters["bytes_out"] += bytes_out
+            counters["cpu_seconds"] += cpu_seconds
+
+
+class ResponseCompression:
+    """Compresses responses for clients that accept it"""
+
+    def init_app(self, app):
+        if not app.config.get("COMPRESSION_ENABLED", True):
+            return
+        preferred = app.config.get("COMPRESSION_ENCODINGS") or ("gzip",)
+        app.extensions["compression"] = _CompressionState(
+            available_encodings(preferred),
+            {**DEFAULT_LEVELS, **(app.config.get("COMPRESSION_LEVELS") or {})},
+            app.config.get("COMPRESSION_MIN_SIZE", 1024),
+        )
+        app.after_request(_compress_response)
+
+    def stats(self):
+        """Counters per encoding: responses, bytes in and out, CPU seconds"""
+        state = current_app.extensions.get("compression")
+        if state is None:
+            return {}
+        with state.lock:
+            return {name: dict(counters) for name, counters in state.counters.items()}
+
+
+response_compression = ResponseCompression()
+
+
+def _compress_response(response):
+    state = current_app.extensions["compression"]
+    if not _compressible(response):
+        return response
+    response.vary.add("Accept-Encoding")
+    if not response.is_streamed and len(response.get_data()) < state.min_size:
+        return response
+    encoding = request.accept_encodings.best_match(state.encodings)
+    if encoding is None:
+        return response
+
+    factory = ENCODINGS[encoding][0]
+    stream = factory(state.levels[encoding])
+    if response.is_streamed:
+        response.response = _compress_chunks(response.response, stream, encoding, state)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.get_data()
+        started = time.thread_time()
+        compressed = stream.compress(body) + stream.flush()
+        state.record(encoding, len(body), len(compressed), time.thread_time() - started)
+        response.set_data(compressed)
+
+    response.headers["Content-Encoding"] = encoding
+    # the encoded bytes differ from the identity representation
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+
+def _compressible(response):
+    return (
+        200 <= response.status_code < 300
+        and response.status_code != 204
+        and not response.direct_passthrough
+        and "Content-Encoding" not in response.headers
+        and (
+            response.mimetype in COMPRESSIBLE_MIMETYPES
+            or response.mimetype.startswith("text/")
+        )
+        # compressors hold back output, which would delay every event
+        and response.mimetype != "text/event-stream"
+    )
+
+
+def _compress_chunks(chunks, stream, encoding, state):
+    """Compress a streamed body as it is sent, recording totals at the end"""
+    bytes_in = bytes_out = 0
+    cpu_seconds = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            started = time.thread_time()
+            compressed = stream.compress(chunk)
+            cpu_seconds += time.thread_time() - started
+            bytes_in += len(chunk)
+            if compressed:
+                bytes_out += len(compressed)
+                yield compressed
+        started = time.thread_time()
+        tail = stream.flush()
+        cpu_seconds += time.thread_time() - started
+        bytes_out += len(tail)
+        yield tail
+    finally:
+        close = getattr(chunks, "close", None)
+        if close is not None:
+            close()
+        state.record(encoding, bytes_in, bytes_out, cpu_seconds)
@@ -1,3 +1,4 @@
+from sqlalchemy import event
 from app.extensions import db
 
 
@@ -5,3 +6,33 @@ def init_db(app):
     """Initialize the database with the app context."""
     with app.app_context():
         db.create_all()
+
+
+def init_sqlite_pragmas(app):
+    """Apply `SQLITE_PRAGMAS` to every new connection of the app's SQLite engines"""
+    pragmas = app.config.get("SQLITE_PRAGMAS")
+    if not pragmas:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            apply_sqlite_pragmas(engine, pragmas)
+
+
+def apply_sqlite_pragmas(engine, pragmas):
+    """Run `pragmas` on each new connection of `engine` if it is SQLite"""
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _pragma_listener(pragmas))
+
+
+def _pragma_listener(pragmas):
+    statements = [f"PRAGMA {name} = {value}" for name, value in pragmas.items()]
+
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    return apply_pragmas
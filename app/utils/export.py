@@ -0,0 +1,21 @@
+import json
+import zlib
+
+
+def ndjson_chunks(batches):
+    """Encode batches of rows as newline-delimited JSON, one chunk per batch"""
+    for rows in batches:
+        if rows:
+            yield "".join(
+                json.dumps(row, separators=(",", ":")) + "\n" for row in rows
+            ).encode()
+
+
+def gzip_chunks(chunks, level=6):
+    """Gzip a stream of byte chunks on the fly"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire after `ttl_seconds`.
+
+    Loads happen outside the lock: `lookup` hands out the current generation
+    and `store` drops the value if an invalidation happened since, so a load
+    that raced a write never caches what it read before the write. `sizeof`
+    estimates an entry's memory for `stats()["bytes"]`.
+    """
+
+    def __init__(self, max_entries, ttl_seconds, sizeof):
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sizeof = sizeof
+        # key -> (value, expires_at, size)
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def lookup(self, keys):
+        """({key: value} for the cached keys, generation to pass to `store`)"""
+        now = time.monotonic()
+        found = {}
+        with self.lock:
+            for key in keys:
+                entry = self.entries.get(key)
+                if entry is not None and entry[1] > now:
+                    self.entries.move_to_end(key)
+                    found[key] = entry[0]
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+            return found, self.generation
+
+    def store(self, values, generation):
+        """Cache `values` ({key: value}) unless invalidated since `generation`"""
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self.lock:
+            if self.generation != generation:
+                return
+            for key, value in values.items():
+                self._discard(key)
+                size = self.sizeof(value)
+                self.entries[key] = (value, expires_at, size)
+                self.bytes += size
+            while len(self.entries) > self.max_entries:
+                _, (_, _, size) = self.entries.popitem(last=False)
+                self.bytes -= size
+                self.evictions += 1
+
+    def invalidate(self, keys=None):
+        """Drop the given keys, or every entry when `keys` is None"""
+        with self.lock:
+            self.generation += 1
+            for key in list(self.entries) if keys is None else keys:
+                if self._discard(key):
+                    self.invalidations += 1
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        self.bytes -= entry[2]
+        return True
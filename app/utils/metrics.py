@@ -0,0 +1,430 @@
+"""
+In-process request metrics, exposed in the Prometheus text format at /metrics.
+
+Every thread writes to its own shard of plain dicts, so recording a request
+takes no lock; a scrape merges the shards. Shards of threads that have
+exited are folded into a retired total so thread-per-request servers don't
+grow the shard list without bound.
+
+Per request: latency and response size histograms, status counts, and the
+number and total time of SQL statements (from engine cursor events). SQL run
+outside a request, by the CLI jobs and scheduler, is counted under the
+`none` endpoint. Pool, plan catalog, compression, password hashing and replica routing
+figures are read at scrape time.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.extensions import db
+from app.services.entitlement_cache import entitlement_cache
+from app.services.plan_catalog import plan_catalog
+from app.services.revocation_filter import revocation_filter
+from app.services.subscription_stream import subscription_stream
+from app.services.user_cache import user_cache
+from app.utils.compression import response_compression
+from app.utils.passwords import password_hasher
+from app.utils.replicas import replica_router
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000)
+
+# name: (type, help, label names, histogram buckets)
+METRICS = {
+    "http_requests_total": (
+        "counter",
+        "Requests handled, by endpoint, method and status.",
+        ("endpoint", "method", "status"),
+        None,
+    ),
+    "http_request_duration_seconds": (
+        "histogram",
+        "Request latency, including streaming the body.",
+        ("endpoint",),
+        LATENCY_BUCKETS,
+    ),
+    "http_response_size_bytes": (
+        "histogram",
+        "Response body size.",
+        ("endpoint",),
+        SIZE_BUCKETS,
+    ),
+    "db_statements_total": (
+        "counter",
+        "SQL statements executed.",
+        ("endpoint",),
+        None,
+    ),
+    "db_statement_seconds_total": (
+        "counter",
+        "Time spent executing SQL statements.",
+        ("endpoint",),
+        None,
+    ),
+}
+
+NO_ENDPOINT = "none"
+UNMATCHED_ENDPOINT = "unmatched"
+
+
+class _Shard:
+    __slots__ = ("thread", "values")
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.values = {}
+
+
+class _MetricsState:
+    """One counter shard per request thread, merged when metrics are read"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.shards = []
+        self.retired = {}
+
+    def shard(self):
+        shard = getattr(self.local, "shard", None)
+        if shard is None:
+            shard = self.local.shard = _Shard()
+            with self.lock:
+                self.shards.append(shard)
+        return shard.values
+
+    def totals(self):
+        with self.lock:
+            live = []
+            for shard in self.shards:
+                if shard.thread.is_alive():
+                    live.append(shard)
+                else:
+                    _merge(self.retired, shard.values.copy())
+            self.shards = live
+            totals = dict(self.retired)
+        for shard in live:
+            # dict.copy() is atomic, the owning thread may keep writing
+            _merge(totals, shard.values.copy())
+        return totals
+
+
+def _merge(into, values):
+    for key, value in values.items():
+        into[key] = into.get(key, 0) + value
+
+
+def _increment(values, key, amount=1):
+    values[key] = values.get(key, 0) + amount
+
+
+def _observe(values, name, labels, value):
+    buckets = METRICS[name][3]
+    _increment(values, (name, labels, bisect_left(buckets, value)))
+    _increment(values, (name, labels, "sum"), value)
+    _increment(values, (name, labels, "count"))
+
+
+class Metrics:
+    """Records request and SQL metrics and renders them for /metrics"""
+
+    def init_app(self, app):
+        app.extensions["metrics"] = _MetricsState()
+        if not app.config.get("METRICS_ENABLED", True):
+            return
+        app.before_request(_start_request)
+        app.after_request(_finish_response)
+        app.teardown_request(_record_request)
+        app.add_url_rule("/metrics", "metrics", metrics_view)
+
+    @staticmethod
+    def _state():
+        if not has_app_context():
+            return None
+        return current_app.extensions.get("metrics")
+
+    def record_statement(self, seconds):
+        """Count one SQL statement against the current request, or `none`"""
+        if has_request_context() and "metrics_sql" in g:
+            g.metrics_sql[0] += 1
+            g.metrics_sql[1] += seconds
+            return
+        state = self._state()
+        if state is not None:
+            values = state.shard()
+            _increment(values, ("db_statements_total", (NO_ENDPOINT,)))
+            _increment(values, ("db_statement_seconds_total", (NO_ENDPOINT,)), seconds)
+
+    def render(self):
+        """The current metrics in the Prometheus text exposition format"""
+        totals = self._state().totals()
+        lines = []
+        for name, (kind, help_text, label_names, buckets) in METRICS.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "histogram":
+                lines.extend(_histogram_lines(name, label_names, buckets, totals))
+            else:
+                for (_, labels), value in sorted(
+                    (key, value) for key, value in totals.items() if key[0] == name
+                ):
+                    lines.append(_sample(name, label_names, labels, value))
+        lines.extend(_gauge_lines())
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def _start_request():
+    g.metrics_started = time.perf_counter()
+    g.metrics_sql = [0, 0.0]
+
+
+def _finish_response(response):
+    g.metrics_status = response.status_code
+    g.metrics_size = size = [response.content_length or 0]
+    if response.is_streamed:
+        response.response = _counting(response.response, size)
+    return response
+
+
+def _counting(chunks, size):
+    """Count streamed bytes as they are sent"""
+    for chunk in chunks:
+        size[0] += len(chunk)
+        yield chunk
+
+
+def _record_request(exc):
+    """Teardown hook: runs after the body, including streams, is sent"""
+    started = g.pop("metrics_started", None)
+    if started is None:
+        return
+    elapsed = time.perf_counter() - started
+    statements, sql_seconds = g.pop("metrics_sql")
+    status = g.pop("metrics_status", 500)
+    size = g.pop("metrics_size", [0])[0]
+    endpoint = (request.endpoint or UNMATCHED_ENDPOINT,)
+
+    values = current_app.extensions["metrics"].shard()
+    _increment(
+        values,
+        ("http_requests_total", (endpoint[0], request.method, str(status))),
+    )
+    _observe(values, "http_request_duration_seconds", endpoint, elapsed)
+    _observe(values, "http_response_size_bytes", endpoint, size)
+    if statements:
+        _increment(values, ("db_statements_total", endpoint), statements)
+        _increment(values, ("db_statement_seconds_total", endpoint), sql_seconds)
+
+
+def metrics_view():
+    return current_app.response_class(
+        metrics.render(), mimetype="text/plain; version=0.0.4"
+    )
+
+
+def _histogram_lines(name, label_names, buckets, totals):
+    series = sorted({key[1] for key in totals if key[0] == name and len(key) == 3})
+    for labels in series:
+        cumulative = 0
+        for index, bound in enumerate(buckets + (float("inf"),)):
+            cumulative += totals.get((name, labels, index), 0)
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            yield _sample(
+                f"{name}_bucket", label_names + ("le",), labels + (le,), cumulative
+            )
+        yield _sample(f"{name}_sum", label_names, labels, totals[(name, labels, "sum")])
+        yield _sample(
+            f"{name}_count", label_names, labels, totals[(name, labels, "count")]
+        )
+
+
+def _gauge_lines():
+    engines = {"primary": db.engine}
+    state = current_app.extensions.get("replica_router")
+    if state is not None:
+        engines.update(state.engines)
+
+    pool_gauges = {
+        "db_pool_size": ("Connections the pool keeps open.", "size"),
+        "db_pool_checked_out": ("Connections currently in use.", "checkedout"),
+        "db_pool_overflow": ("Connections opened beyond the pool size.", "overflow"),
+    }
+    for name, (help_text, method) in pool_gauges.items():
+        yield f"# HELP {name} {help_text}"
+        yield f"# TYPE {name} gauge"
+        for label, engine in engines.items():
+            # StaticPool and NullPool don't track these
+            value = getattr(engine.pool, method, None)
+            if value is not None:
+                yield _sample(name, ("engine",), (label,), value())
+
+    catalog = plan_catalog.stats()
+    yield "# HELP plan_catalog_requests_total Plan catalog lookups."
+    yield "# TYPE plan_catalog_requests_total counter"
+    yield _sample("plan_catalog_requests_total", ("result",), ("hit",), catalog["hits"])
+    yield _sample(
+        "plan_catalog_requests_total", ("result",), ("miss",), catalog["misses"]
+    )
+    yield "# HELP plan_catalog_version Plan catalog invalidation count."
+    yield "# TYPE plan_catalog_version gauge"
+    yield _sample("plan_catalog_version", (), (), catalog["version"])
+
+    compression = response_compression.stats()
+    compression_counters = {
+        "http_compression_responses_total": ("Responses compressed.", "responses"),
+        "http_compression_input_bytes_total": (
+            "Body bytes before compression.",
+            "bytes_in",
+        ),
+        "http_compression_output_bytes_total": (
+            "Body bytes after compression.",
+            "bytes_out",
+        ),
+        "http_compression_cpu_seconds_total": (
+            "CPU time spent compressing.",
+            "cpu_seconds",
+        ),
+    }
+    for name, (help_text, key) in compression_counters.items():
+        yield f"# HELP {name} {help_text}"
+        yield f"# TYPE {name} counter"
+        for encoding, counters in compression.items():
+            yield _sample(name, ("encoding",), (encoding,), counters[key])
+
+    hashing = password_hasher.stats()
+    yield "# HELP password_hashes_in_flight Password hashes running or queued."
+    yield "# TYPE password_hashes_in_flight gauge"
+    yield _sample("password_hashes_in_flight", (), (), hashing["in_flight"])
+    yield "# HELP password_hashes_total Password hash operations by outcome."
+    yield "# TYPE password_hashes_total counter"
+    for outcome in ("completed", "rejected", "rehashed"):
+        yield _sample(
+            "password_hashes_total", ("outcome",), (outcome,), hashing[outcome]
+        )
+
+    users = user_cache.stats()
+    yield "# HELP user_cache_requests_total User identity cache lookups."
+    yield "# TYPE user_cache_requests_total counter"
+    yield _sample("user_cache_requests_total", ("result",), ("hit",), users["hits"])
+    yield _sample("user_cache_requests_total", ("result",), ("miss",), users["misses"])
+    yield "# HELP user_cache_hit_ratio Share of user cache lookups served from memory."
+    yield "# TYPE user_cache_hit_ratio gauge"
+    yield _sample("user_cache_hit_ratio", (), (), users["hit_ratio"])
+    yield "# HELP user_cache_entries Users in the identity cache."
+    yield "# TYPE user_cache_entries gauge"
+    yield _sample("user_cache_entries", (), (), users["entries"])
+    yield "# HELP user_cache_bytes Approximate memory held by the identity cache."
+    yield "# TYPE user_cache_bytes gauge"
+    yield _sample("user_cache_bytes", (), (), users["bytes"])
+    yield "# HELP user_cache_evictions_total Users evicted to stay within capacity."
+    yield "# TYPE user_cache_evictions_total counter"
+    yield _sample("user_cache_evictions_total", (), (), users["evictions"])
+
+    entitlements = entitlement_cache.stats()
+    yield "# HELP entitlement_cache_requests_total Entitlement cache lookups."
+    yield "# TYPE entitlement_cache_requests_total counter"
+    for result, key in (("hit", "hits"), ("miss", "misses")):
+        yield _sample(
+            "entitlement_cache_requests_total",
+            ("result",),
+            (result,),
+            entitlements[key],
+        )
+    yield "# HELP entitlement_cache_entries Users in the entitlement cache."
+    yield "# TYPE entitlement_cache_entries gauge"
+    yield _sample("entitlement_cache_entries", (), (), entitlements["entries"])
+    yield "# HELP entitlement_cache_bytes Approximate memory held by the entitlement cache."
+    yield "# TYPE entitlement_cache_bytes gauge"
+    yield _sample("entitlement_cache_bytes", (), (), entitlements["bytes"])
+
+    streams = subscription_stream.stats()
+    yield "# HELP subscription_stream_connections Open subscription event streams."
+    yield "# TYPE subscription_stream_connections gauge"
+    yield _sample("subscription_stream_connections", (), (), streams["connections"])
+    yield "# HELP subscription_stream_rejected_total Streams refused at the connection limit."
+    yield "# TYPE subscription_stream_rejected_total counter"
+    yield _sample("subscription_stream_rejected_total", (), (), streams["rejected"])
+    yield "# HELP subscription_stream_events_total Events pushed to open streams."
+    yield "# TYPE subscription_stream_events_total counter"
+    yield _sample("subscription_stream_events_total", (), (), streams["pushed"])
+    yield "# HELP subscription_stream_overflows_total Stream buffers dropped for a catch-up from the outbox."
+    yield "# TYPE subscription_stream_overflows_total counter"
+    yield _sample("subscription_stream_overflows_total", (), (), streams["overflows"])
+
+    revocation = revocation_filter.stats()
+    yield "# HELP token_revocation_checks_total Blocklist checks by how they were settled."
+    yield "# TYPE token_revocation_checks_total counter"
+    settled = {
+        "filtered": revocation["filtered"],
+        "false_positive": revocation["false_positives"],
+        "revoked": revocation["checks"]
+        - revocation["filtered"]
+        - revocation["false_positives"],
+    }
+    for result, value in settled.items():
+        yield _sample("token_revocation_checks_total", ("result",), (result,), value)
+    yield "# HELP token_revocation_filter_keys Keys in the revocation filter."
+    yield "# TYPE token_revocation_filter_keys gauge"
+    yield _sample("token_revocation_filter_keys", (), (), revocation["keys"])
+    yield "# HELP token_revocation_filter_bytes Memory used by the revocation filter bits."
+    yield "# TYPE token_revocation_filter_bytes gauge"
+    yield _sample("token_revocation_filter_bytes", (), (), revocation["bytes"])
+
+    routing = replica_router.stats()
+    if routing["replicas"]:
+        yield "# HELP db_reads_total SELECTs by routing decision and target."
+        yield "# TYPE db_reads_total counter"
+        yield _sample(
+            "db_reads_total",
+            ("route", "target"),
+            ("primary", "primary"),
+            routing["primary_reads"],
+        )
+        yield _sample(
+            "db_reads_total",
+            ("route", "target"),
+            ("sticky", "primary"),
+            routing["sticky_reads"],
+        )
+        for key, count in sorted(routing["replica_reads"].items()):
+            yield _sample(
+                "db_reads_total", ("route", "target"), ("replica", key), count
+            )
+
+
+def _sample(name, label_names, labels, value):
+    if label_names:
+        pairs = ",".join(
+            f'{label}="{_escape(value)}"' for label, value in zip(label_names, labels)
+        )
+        name = f"{name}{{{pairs}}}"
+    return f"{name} {value}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_started", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["metrics_started"].pop()
+    metrics.record_statement(time.perf_counter() - started)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    connection = context.connection
+    if connection is not None and connection.info.get("metrics_started"):
+        connection.info["metrics_started"].pop()
@@ -0,0 +1,102 @@
+"""
+Keyset pagination helpers.
+
+Pages are addressed by the (sort value, id) pair of the row at the edge of the
+previous page, wrapped in an opaque token. Each page is fetched with a single
+row-value range condition and `limit + 1` rows, so every page is one index
+range scan regardless of depth and `has_more` never costs an extra request.
+"""
+
+import base64
+import binascii
+import json
+from collections import namedtuple
+from datetime import datetime
+
+from sqlalchemy import Integer, String, cast, literal, tuple_
+
+FORWARD = "next"
+BACKWARD = "prev"
+
+Cursor = namedtuple("Cursor", ["direction", "value", "id"])
+
+
+def encode_cursor(value, row_id, direction=FORWARD):
+    """Encode a (sort value, id) position into an opaque cursor token"""
+    if isinstance(value, datetime):
+        value = value.isoformat(sep=" ")
+    payload = json.dumps([direction, value, row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    """Decode a cursor token, raising ValueError if it was tampered with"""
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        direction, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Invalid cursor format.")
+    if direction not in (FORWARD, BACKWARD) or not isinstance(row_id, int):
+        raise ValueError("Invalid cursor format.")
+    return Cursor(direction, value, row_id)
+
+
+def keyset_filter(sort_column, id_column, cursor=None, descending=True):
+    """
+    Build the keyset condition for a page.
+
+    Returns a `(clause, order_by)` tuple where `clause` is a row-value WHERE
+    condition (None for the first page) and `order_by` matches the composite
+    index on `(sort_column, id_column)`. Backward pages scan in the opposite
+    direction and are flipped back by `paginate_rows`.
+
+    The cursor value is bound as the raw stored value, so it compares equal
+    to the rows it came from whatever format the database keeps them in.
+    """
+    backward = cursor is not None and cursor.direction == BACKWARD
+    scan_descending = descending != backward
+    if scan_descending:
+        order_by = [sort_column.desc(), id_column.desc()]
+    else:
+        order_by = [sort_column.asc(), id_column.asc()]
+    if cursor is None:
+        return None, order_by
+
+    position = tuple_(sort_column, id_column)
+    boundary = tuple_(literal(cursor.value, String), literal(cursor.id, Integer))
+    clause = position < boundary if scan_descending else position > boundary
+    return clause, order_by
+
+
+def raw_value(column):
+    """Select a column as its stored text, for use as a cursor value"""
+    return cast(column, String)
+
+
+def paginate_rows(rows, limit, cursor=None, key=None):
+    """
+    Trim a `limit + 1` fetch down to a page and build its pagination block.
+
+    `key` maps a row to its `(sort value, id)` position.
+    """
+    rows = list(rows)
+    has_extra = len(rows) > limit
+    rows = rows[:limit]
+
+    if cursor is not None and cursor.direction == BACKWARD:
+        rows.reverse()
+        has_next, has_prev = True, has_extra
+    else:
+        has_next, has_prev = has_extra, cursor is not None
+
+    next_cursor = prev_cursor = None
+    if rows and has_next:
+        next_cursor = encode_cursor(*key(rows[-1]), direction=FORWARD)
+    if rows and has_prev:
+        prev_cursor = encode_cursor(*key(rows[0]), direction=BACKWARD)
+
+    return rows, {
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor,
+        "has_more": has_next,
+    }
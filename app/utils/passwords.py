@@ -0,0 +1,101 @@
+"""
+Password hashing on a bounded worker pool.
+
+Hashing and verification are deliberately slow, so they run on a pool of
+`PASSWORD_HASH_WORKERS` threads rather than on the request thread; the
+KDFs release the GIL, so the pool uses as many cores as it has workers and
+no more. At most `PASSWORD_HASH_MAX_QUEUE` calls wait for a worker; past
+that `PasswordHashingBusyError` is raised at once, so a login burst gets
+fast 503s instead of tying up every request thread.
+
+Hashes made with another method than `PASSWORD_HASH_METHOD` still verify,
+and `needs_rehash` tells the caller to replace them after a successful
+login.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.services.exceptions import PasswordHashingBusyError
+
+DEFAULT_METHOD = "scrypt:32768:8:1"
+
+
+class _HasherState:
+    """The hashing thread pool, its admission slots and usage counters"""
+
+    def __init__(self, method, workers, max_queue):
+        self.method = method
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="password-hash")
+        self.slots = threading.BoundedSemaphore(workers + max_queue)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords off the request thread"""
+
+    def init_app(self, app):
+        workers = app.config.get("PASSWORD_HASH_WORKERS") or os.cpu_count() or 1
+        app.extensions["password_hasher"] = _HasherState(
+            app.config.get("PASSWORD_HASH_METHOD") or DEFAULT_METHOD,
+            workers,
+            app.config.get("PASSWORD_HASH_MAX_QUEUE", 32),
+        )
+
+    @staticmethod
+    def _state():
+        return current_app.extensions["password_hasher"]
+
+    def hash(self, password):
+        """Hash `password` with the configured method"""
+        state = self._state()
+        return self._run(state, generate_password_hash, password, state.method)
+
+    def verify(self, pass_hash, password):
+        return self._run(self._state(), check_password_hash, pass_hash, password)
+
+    def needs_rehash(self, pass_hash):
+        """Whether `pass_hash` was made with other than the configured method"""
+        return pass_hash.split("$", 1)[0] != self._state().method
+
+    def record_rehash(self):
+        state = self._state()
+        with state.lock:
+            state.rehashed += 1
+
+    def stats(self):
+        state = self._state()
+        with state.lock:
+            return {
+                "in_flight": state.in_flight,
+                "completed": state.completed,
+                "rejected": state.rejected,
+                "rehashed": state.rehashed,
+            }
+
+    @staticmethod
+    def _run(state, func, *args):
+        if not state.slots.acquire(blocking=False):
+            with state.lock:
+                state.rejected += 1
+            raise PasswordHashingBusyError()
+        with state.lock:
+            state.in_flight += 1
+        try:
+            return state.executor.submit(func, *args).result()
+        finally:
+            with state.lock:
+                state.in_flight -= 1
+                state.completed += 1
+            state.slots.release()
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,183 @@
+"""
+Read-replica routing.
+
+Each URL in `SQLALCHEMY_REPLICA_URIS` gets its own engine, built with the
+app's `SQLALCHEMY_ENGINE_OPTIONS` and `SQLITE_PRAGMAS`. They are kept out of
+`SQLALCHEMY_BINDS` so `db.create_all()` never targets a replica.
+`RoutingSession.get_bind` sends plain SELECTs issued inside a
+`@read_only` service method to a replica, round-robin; everything else
+(writes, flushes, locking reads and reads outside a read-only method) stays
+on the primary.
+
+Replicas lag, so a user who just wrote is pinned to the primary for
+`REPLICA_STICKY_SECONDS` to keep read-your-writes. The window is tracked in
+process; with several app processes behind a balancer, pin users to a process
+or share the window in a store all processes can see.
+"""
+
+import functools
+import inspect
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+
+from flask import current_app, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine
+
+REPLICA_KEY_PREFIX = "replica_"
+
+_read_scope = ContextVar("read_scope", default=None)
+
+
+class _ReadScope:
+    __slots__ = ("user_id",)
+
+    def __init__(self, user_id):
+        self.user_id = user_id
+
+
+class _RouterState:
+    """Replica engines, the round-robin cursor and users pinned to the primary"""
+
+    def __init__(self, engines, sticky_seconds):
+        self.lock = threading.Lock()
+        self.engines = engines
+        self.sticky_seconds = sticky_seconds
+        self.sticky_until = {}
+        self.next_replica = itertools.cycle(engines)
+        self.primary_reads = 0
+        self.sticky_reads = 0
+        self.replica_reads = dict.fromkeys(engines, 0)
+
+
+class ReplicaRouter:
+    """Chooses the engine for reads and tracks per-user stickiness"""
+
+    def init_app(self, app):
+        # imported here: app.utils.db needs app.extensions, which needs this module
+        from app.utils.db import apply_sqlite_pragmas
+
+        options = app.config.get("SQLALCHEMY_ENGINE_OPTIONS") or {}
+        pragmas = app.config.get("SQLITE_PRAGMAS")
+        engines = {}
+        for index, url in enumerate(app.config.get("SQLALCHEMY_REPLICA_URIS") or []):
+            engine = create_engine(url, **options)
+            if pragmas:
+                apply_sqlite_pragmas(engine, pragmas)
+            engines[f"{REPLICA_KEY_PREFIX}{index}"] = engine
+        app.extensions["replica_router"] = _RouterState(
+            engines, app.config.get("REPLICA_STICKY_SECONDS", 5)
+        )
+
+    @staticmethod
+    def _state():
+        if not has_app_context():
+            return None
+        state = current_app.extensions.get("replica_router")
+        if state is None or not state.engines:
+            return None
+        return state
+
+    def route_read(self):
+        """Engine for a plain SELECT, or None to use the primary"""
+        state = self._state()
+        if state is None:
+            return None
+
+        scope = _read_scope.get()
+        with state.lock:
+            if scope is None:
+                state.primary_reads += 1
+                return None
+            if scope.user_id is not None:
+                until = state.sticky_until.get(str(scope.user_id))
+                if until is not None and until > time.monotonic():
+                    state.sticky_reads += 1
+                    return None
+            key = next(state.next_replica)
+            state.replica_reads[key] += 1
+        return state.engines[key]
+
+    def mark_write(self, *user_ids):
+        """Pin users to the primary until replicas have caught up with their write"""
+        state = self._state()
+        if state is None:
+            return
+        now = time.monotonic()
+        with state.lock:
+            # drop expired windows so the map only holds recent writers
+            state.sticky_until = {
+                user_id: until
+                for user_id, until in state.sticky_until.items()
+                if until > now
+            }
+            for user_id in user_ids:
+                state.sticky_until[str(user_id)] = now + state.sticky_seconds
+
+    def stats(self):
+        state = self._state()
+        if state is None:
+            return {"replicas": 0}
+        now = time.monotonic()
+        with state.lock:
+            return {
+                "replicas": len(state.engines),
+                "primary_reads": state.primary_reads,
+                "sticky_reads": state.sticky_reads,
+                "replica_reads": dict(state.replica_reads),
+                "sticky_users": sum(
+                    1 for until in state.sticky_until.values() if until > now
+                ),
+            }
+
+    def dispose(self):
+        """Close every pooled replica connection"""
+        state = self._state()
+        if state is not None:
+            for engine in state.engines.values():
+                engine.dispose()
+
+
+replica_router = ReplicaRouter()
+
+
+def read_only(func):
+    """
+    Let SELECTs inside `func` go to a replica.
+
+    A `user_id` argument, if the function takes one, is checked against the
+    sticky window so that user's reads stay on the primary after a write.
+    """
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        user_id = signature.bind_partial(*args, **kwargs).arguments.get("user_id")
+        token = _read_scope.set(_ReadScope(user_id))
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _read_scope.reset(token)
+
+    return wrapper
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that can send reads to a replica"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _is_plain_select(clause):
+            engine = replica_router.route_read()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _is_plain_select(clause):
+    return (
+        clause is not None
+        and getattr(clause, "is_select", False)
+        and getattr(clause, "_for_update_arg", None) is None
+    )
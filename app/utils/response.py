@@ -1,16 +1,99 @@
-from flask import jsonify
+import hashlib
+from datetime import timezone
 
+from flask import current_app, jsonify, request
 
-def success_response(data=None, status=200, message="success"):
+
+def success_response(
+    data=None, status=200, message="success", etag=None, last_modified=None
+):
+    """
+    Send a success envelope. With `etag` or `last_modified` the response
+    carries those validators and a matching conditional GET gets a 304
+    before anything is serialized.
+    """
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
     response = {"status": "success", "message": message, "data": data}
 
-    return jsonify(response), status
+    response = jsonify(response)
+    _set_validators(response, etag, last_modified)
+    return response, status
+
+
+def render_success_body(data=None, message="success"):
+    """Render a success envelope to the exact bytes `success_response` sends"""
+    response = {"status": "success", "message": message, "data": data}
+    return current_app.json.response(response).get_data()
+
 
+def raw_json_response(body, status=200, etag=None, last_modified=None):
+    """Send an already rendered JSON body without re-serializing it"""
+    cached = not_modified(etag, last_modified)
+    if cached is not None:
+        return cached
+    response = current_app.response_class(body, mimetype=current_app.json.mimetype)
+    _set_validators(response, etag, last_modified)
+    return response, status
 
-def error_response(message="error", status=400, errors=None):
+
+def error_response(message="error", status=400, errors=None, data=None):
+    """Send an error envelope; `data` carries fields clients can act on"""
     response = {
         "status": "error",
         "message": message,
         "errors": errors if errors else [],
     }
+    if data is not None:
+        response["data"] = data
     return jsonify(response), status
+
+
+def make_etag(*parts):
+    """Strong ETag value for a representation identified by `parts`"""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode())
+        digest.update(b"\x1f")
+    return digest.hexdigest()[:32]
+
+
+def not_modified(etag=None, last_modified=None):
+    """
+    A 304 response if the request's validators match, else None.
+
+    Routes can call this with a cached version stamp before loading or
+    serializing anything. If-None-Match takes precedence over
+    If-Modified-Since, as in RFC 9110.
+    """
+    if request.method not in ("GET", "HEAD") or not (etag or last_modified):
+        return None
+    if request.if_none_match:
+        matched = etag is not None and request.if_none_match.contains_weak(etag)
+    elif request.if_modified_since and last_modified is not None:
+        matched = _http_date(last_modified) <= request.if_modified_since
+    else:
+        matched = False
+    if not matched:
+        return None
+    response = current_app.response_class(status=304)
+    _set_validators(response, etag, last_modified)
+    return response, 304
+
+
+def _set_validators(response, etag, last_modified):
+    if etag is not None:
+        response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = _http_date(last_modified)
+    if etag is not None or last_modified is not None:
+        # cacheable, but always revalidated
+        response.headers["Cache-Control"] = "no-cache"
+
+
+def _http_date(value):
+    """Naive database timestamps are UTC; HTTP dates have whole seconds"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.replace(microsecond=0)
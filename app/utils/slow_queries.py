@@ -0,0 +1,206 @@
+"""
+Slow-query log.
+
+With `SLOW_QUERY_LOG_ENABLED`, every statement on the app's engines that
+takes longer than `SLOW_QUERY_THRESHOLD_MS` is logged with its normalized
+SQL, the shape of its parameters, its duration, the endpoint that ran it and
+the database's plan for it (`EXPLAIN QUERY PLAN` on SQLite, `EXPLAIN`
+elsewhere).
+
+Entries are deduplicated by statement fingerprint: a fingerprint is logged
+at most once per `SLOW_QUERY_REPEAT_SECONDS`, with a count of the
+occurrences suppressed in between, and at most `SLOW_QUERY_MAX_PER_MINUTE`
+entries are logged in total. The plan is only captured for entries that
+will be logged, so a hot slow statement costs one EXPLAIN per window.
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+
+from flask import has_request_context, request
+from loguru import logger
+from sqlalchemy import event
+
+FINGERPRINT_LIMIT = 1000
+RECENT_LIMIT = 100
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|(?<!:):\w+|\$\d+|%s|\?")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+
+def normalize_sql(statement):
+    """SQL with literals and placeholders replaced by `?` and IN lists folded"""
+    normalized = _STRING_LITERAL.sub("?", statement)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER_LITERAL.sub("?", normalized)
+    normalized = _PLACEHOLDER_LIST.sub("(?...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode()).hexdigest()[:12]
+
+
+def parameter_shape(parameters, executemany=False):
+    """Types of the bound parameters, without their values"""
+    if executemany:
+        first = parameters[0] if parameters else ()
+        return {"rows": len(parameters), "each": parameter_shape(first)}
+    if isinstance(parameters, dict):
+        return {name: type(value).__name__ for name, value in parameters.items()}
+    return [type(value).__name__ for value in parameters or ()]
+
+
+class _SlowQueryState:
+    """Threshold, rate limits and the recently logged slow statements"""
+
+    def __init__(self, threshold, repeat_seconds, max_per_minute, explain):
+        self.lock = threading.Lock()
+        self.threshold = threshold
+        self.repeat_seconds = repeat_seconds
+        self.max_per_minute = max_per_minute
+        self.explain = explain
+        self.last_logged = OrderedDict()
+        self.suppressed = {}
+        self.window_start = 0.0
+        self.window_count = 0
+        self.recent = deque(maxlen=RECENT_LIMIT)
+
+    def admit(self, key, now):
+        """Decide whether to log `key` now; returns the suppressed count or None"""
+        with self.lock:
+            last = self.last_logged.get(key)
+            if last is not None and now - last < self.repeat_seconds:
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                return None
+            if now - self.window_start >= 60:
+                self.window_start, self.window_count = now, 0
+            if self.window_count >= self.max_per_minute:
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                return None
+            self.window_count += 1
+            self.last_logged[key] = now
+            self.last_logged.move_to_end(key)
+            if len(self.last_logged) > FINGERPRINT_LIMIT:
+                stale, _ = self.last_logged.popitem(last=False)
+                self.suppressed.pop(stale, None)
+            return self.suppressed.pop(key, 0)
+
+
+class SlowQueryLog:
+    """Engine listeners that log slow statements"""
+
+    def init_app(self, app):
+        if not app.config.get("SLOW_QUERY_LOG_ENABLED"):
+            return
+        state = app.extensions["slow_query_log"] = _SlowQueryState(
+            threshold=app.config.get("SLOW_QUERY_THRESHOLD_MS", 100) / 1000,
+            repeat_seconds=app.config.get("SLOW_QUERY_REPEAT_SECONDS", 300),
+            max_per_minute=app.config.get("SLOW_QUERY_MAX_PER_MINUTE", 30),
+            explain=app.config.get("SLOW_QUERY_EXPLAIN", True),
+        )
+        from app.extensions import db
+
+        with app.app_context():
+            engines = list(db.engines.values())
+            router = app.extensions.get("replica_router")
+            if router is not None:
+                engines.extend(router.engines.values())
+        for engine in engines:
+            self._listen(engine, state)
+
+    @staticmethod
+    def recent(app):
+        """The most recently logged entries, newest last"""
+        state = app.extensions.get("slow_query_log")
+        return list(state.recent) if state else []
+
+    def _listen(self, engine, state):
+        @event.listens_for(engine, "before_cursor_execute")
+        def before(conn, cursor, statement, parameters, context, executemany):
+            conn.info.setdefault("slow_query_started", []).append(time.perf_counter())
+
+        @event.listens_for(engine, "after_cursor_execute")
+        def after(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - conn.info["slow_query_started"].pop()
+            if elapsed >= state.threshold:
+                self._record(conn, state, statement, parameters, executemany, elapsed)
+
+        @event.listens_for(engine, "handle_error")
+        def error(context):
+            connection = context.connection
+            if connection is not None and connection.info.get("slow_query_started"):
+                connection.info["slow_query_started"].pop()
+
+    def _record(self, conn, state, statement, parameters, executemany, elapsed):
+        normalized = normalize_sql(statement)
+        key = fingerprint(normalized)
+        suppressed = state.admit(key, time.monotonic())
+        if suppressed is None:
+            return
+
+        entry = {
+            "fingerprint": key,
+            "duration_ms": round(elapsed * 1000, 2),
+            "endpoint": request.endpoint if has_request_context() else None,
+            "sql": normalized,
+            "parameters": parameter_shape(parameters, executemany),
+            "suppressed": suppressed,
+            "plan": None,
+        }
+        if state.explain:
+            entry["plan"] = _explain(conn, statement, parameters, executemany)
+        state.recent.append(entry)
+        logger.warning(
+            "Slow query {fingerprint} {duration_ms}ms endpoint={endpoint} "
+            "suppressed={suppressed}\n{sql}\nparameters: {parameters}\nplan:\n{plan}",
+            **{**entry, "plan": "\n".join(entry["plan"] or ["(not captured)"])},
+        )
+
+
+slow_query_log = SlowQueryLog()
+
+
+def _explain(conn, statement, parameters, executemany):
+    """The plan for `statement` as text lines, or None if it can't be explained"""
+    if not statement.lstrip().upper().startswith(_EXPLAINABLE):
+        return None
+    if executemany:
+        parameters = parameters[0] if parameters else ()
+    sqlite = conn.dialect.name == "sqlite"
+    prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+    # a fresh DBAPI cursor, so the statement's own results are untouched and
+    # the EXPLAIN doesn't re-enter these listeners
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        if not sqlite:
+            # a failed statement would abort the caller's transaction
+            cursor.execute("SAVEPOINT slow_query_explain")
+        try:
+            cursor.execute(prefix + statement, parameters)
+            rows = cursor.fetchall()
+        except Exception as ex:
+            if not sqlite:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+            return [f"EXPLAIN failed: {ex}"]
+        if not sqlite:
+            cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+    finally:
+        cursor.close()
+    if not sqlite:
+        return [row[0] for row in rows]
+
+    # (id, parent, notused, detail) rows, indented under their parent
+    depth = {0: -1}
+    lines = []
+    for node_id, parent, _, detail in rows:
+        depth[node_id] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node_id] + detail)
+    return lines
@@ -0,0 +1,91 @@
+"""
+Dialect-portable SQL expressions.
+
+Each construct compiles to the native date arithmetic of the database in use:
+SQLite's `datetime()`/`julianday()` functions, and standard interval
+arithmetic everywhere else (PostgreSQL).
+"""
+
+from sqlalchemy import DateTime, Float, Integer
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class add_days(FunctionElement):
+    """`timestamp + days` where `days` may be any integer expression"""
+
+    type = DateTime()
+    inherit_cache = True
+
+
+class days_between(FunctionElement):
+    """Fractional number of days from `start` to `end`"""
+
+    type = Float()
+    inherit_cache = True
+
+
+class seconds_ago(FunctionElement):
+    """The database's current timestamp minus `seconds`, as stored timestamps"""
+
+    type = DateTime()
+    inherit_cache = True
+
+
+class truncate_int(FunctionElement):
+    """Truncate a non-negative number to an integer"""
+
+    type = Integer()
+    inherit_cache = True
+
+
+def _arguments(element, compiler, **kw):
+    return [compiler.process(clause, **kw) for clause in element.clauses]
+
+
+@compiles(add_days)
+def _add_days(element, compiler, **kw):
+    timestamp, days = _arguments(element, compiler, **kw)
+    return f"({timestamp} + make_interval(days => CAST({days} AS INTEGER)))"
+
+
+@compiles(add_days, "sqlite")
+def _add_days_sqlite(element, compiler, **kw):
+    timestamp, days = _arguments(element, compiler, **kw)
+    return f"datetime({timestamp}, '+' || ({days}) || ' days')"
+
+
+@compiles(days_between)
+def _days_between(element, compiler, **kw):
+    start, end = _arguments(element, compiler, **kw)
+    return f"(EXTRACT(EPOCH FROM ({end} - {start})) / 86400)"
+
+
+@compiles(days_between, "sqlite")
+def _days_between_sqlite(element, compiler, **kw):
+    start, end = _arguments(element, compiler, **kw)
+    return f"(julianday({end}) - julianday({start}))"
+
+
+@compiles(seconds_ago)
+def _seconds_ago(element, compiler, **kw):
+    (seconds,) = _arguments(element, compiler, **kw)
+    return f"(LOCALTIMESTAMP - make_interval(secs => {seconds}))"
+
+
+@compiles(seconds_ago, "sqlite")
+def _seconds_ago_sqlite(element, compiler, **kw):
+    (seconds,) = _arguments(element, compiler, **kw)
+    return f"datetime('now', '-' || ({seconds}) || ' seconds')"
+
+
+@compiles(truncate_int)
+def _truncate_int(element, compiler, **kw):
+    (value,) = _arguments(element, compiler, **kw)
+    return f"CAST(TRUNC({value}) AS INTEGER)"
+
+
+@compiles(truncate_int, "sqlite")
+def _truncate_int_sqlite(element, compiler, **kw):
+    (value,) = _arguments(element, compiler, **kw)
+    return f"CAST({value} AS INTEGER)"
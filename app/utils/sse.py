@@ -0,0 +1,16 @@
+"""Server-Sent Events wire format, as byte chunks ready to send"""
+
+
+def sse_event(event_id, event_type, data):
+    """An event; `data` must be a single line, such as compact JSON"""
+    return f"id: {event_id}\nevent: {event_type}\ndata: {data}\n\n".encode()
+
+
+def sse_comment(text):
+    """A comment line, ignored by clients; keeps idle connections open"""
+    return f": {text}\n\n".encode()
+
+
+def sse_retry(milliseconds):
+    """Tell the client how long to wait before reconnecting"""
+    return f"retry: {int(milliseconds)}\n\n".encode()
@@ -0,0 +1,146 @@
+"""
+Entitlement check benchmark.
+
+Seeds a file database with `scripts.seed_db`, then answers "does this user
+have plan P or better?" four ways: the cached check one user at a time, the
+cached check in batches, the check with an empty cache (one primary-key
+lookup on `entitlements` per batch) and the pre-entitlement way, reading the
+user's active subscriptions with their plans. Reports microseconds and SQL
+queries per user checked.
+
+    python -m benchmarks.bench_entitlements --users 20000 --checks 20000
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import event
+
+from app import create_app
+from app.config import ProductionConfig
+from app.extensions import db
+from app.services.entitlement_cache import entitlement_cache
+from app.services.entitlement_service import EntitlementService
+from app.services.plan_catalog import plan_catalog
+from app.services.subscription_service import SubscriptionService
+from scripts.seed_db import generate_data
+
+# the "Pro" plan of scripts.seed_db.PLANS
+PLAN_ID = 3
+
+
+def bench_config(path, max_entries):
+    return type(
+        "BenchEntitlementConfig",
+        (ProductionConfig,),
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+            "SQLALCHEMY_REPLICA_URIS": [],
+            "EXPIRY_SCHEDULER_ENABLED": False,
+            "ENTITLEMENT_CACHE_MAX_ENTRIES": max_entries,
+            "ENTITLEMENT_CACHE_TTL_SECONDS": 3600,
+        },
+    )
+
+
+def active_join(user_ids, plan_id):
+    """The check without `entitlements`: list each user's active subscriptions"""
+    tier = plan_catalog.get_plan(plan_id).tier
+    return {
+        user_id: any(
+            row["plan"]["tier"] >= tier
+            for row in SubscriptionService.get_active_subscriptions(user_id, limit=100)[
+                "data"
+            ]
+        )
+        for user_id in user_ids
+    }
+
+
+def measure(check, batches, before=None):
+    queries = [0]
+
+    def count(*_):
+        queries[0] += 1
+
+    users = sum(len(batch) for batch in batches)
+    entitled = 0
+    elapsed = 0.0
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        for batch in batches:
+            if before:
+                before()
+            started = time.perf_counter()
+            entitled += sum(check(batch, PLAN_ID).values())
+            elapsed += time.perf_counter() - started
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+    return {
+        "us_per_user": elapsed / users * 1e6,
+        "queries_per_user": queries[0] / users,
+        "entitled": entitled,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--subscriptions-per-user", type=int, default=5)
+    parser.add_argument("--checks", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        app = create_app(
+            bench_config(Path(workdir) / "entitlements.db", args.users + 1)
+        )
+        with app.app_context():
+            db.create_all()
+            generate_data(
+                db.engine,
+                users=args.users,
+                subscriptions_per_user=args.subscriptions_per_user,
+                report=lambda message: None,
+            )
+            rng = random.Random(7)
+            user_ids = [rng.randint(1, args.users) for _ in range(args.checks)]
+            # distinct within a batch, since `check` returns one answer per user
+            user_ids = list(dict.fromkeys(user_ids))
+            singles = [[user_id] for user_id in user_ids]
+            batches = [
+                user_ids[i : i + args.batch_size]
+                for i in range(0, len(user_ids), args.batch_size)
+            ]
+
+            # warm the cache with every user checked
+            EntitlementService.check(user_ids, PLAN_ID)
+            stats = entitlement_cache.stats()
+            print(f"cache: {stats['entries']} entries, {stats['bytes'] / 1024:.0f} KiB")
+            runs = (
+                ("cached", EntitlementService.check, singles, None),
+                (f"cached x{args.batch_size}", EntitlementService.check, batches, None),
+                (
+                    f"uncached x{args.batch_size}",
+                    EntitlementService.check,
+                    batches,
+                    entitlement_cache.invalidate,
+                ),
+                ("active-join", active_join, singles[: len(singles) // 10], None),
+            )
+            for label, check, checks, before in runs:
+                result = measure(check, checks, before)
+                print(
+                    f"{label:>13}: {result['us_per_user']:8.2f} us/user "
+                    f"{result['queries_per_user']:.3f} queries/user "
+                    f"{result['entitled']} entitled"
+                )
+            db.session.remove()
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
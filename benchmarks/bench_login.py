@@ -0,0 +1,161 @@
+"""
+Login throughput benchmark.
+
+Drives `POST /api/v1/users/login` from client threads against a seeded file
+database, once per password hashing pool size, and reports logins/sec,
+logins/sec per core the pool can use, p95 latency, 503s from the bounded
+queue and SQL queries per login. A probe thread polls the plan listing
+meanwhile, to show how much logins slow down other endpoints.
+
+    python -m benchmarks.bench_login --clients 16 --workers 1 2 4 --seconds 5
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+
+from app import create_app
+from app.config import ProductionConfig
+from app.extensions import db
+from app.models.user_model import User
+
+USERS = 200
+PASSWORD = "benchmark"
+
+
+def bench_config(path, workers, max_queue):
+    return type(
+        "BenchLoginConfig",
+        (ProductionConfig,),
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+            "SQLALCHEMY_REPLICA_URIS": [],
+            "EXPIRY_SCHEDULER_ENABLED": False,
+            "PASSWORD_HASH_WORKERS": workers,
+            "PASSWORD_HASH_MAX_QUEUE": max_queue,
+        },
+    )
+
+
+def seed(method):
+    pass_hash = generate_password_hash(PASSWORD, method)
+    db.session.add_all(
+        User(id=i, username=f"user{i}", email=f"u{i}@x.io", pass_hash=pass_hash)
+        for i in range(1, USERS + 1)
+    )
+    db.session.commit()
+
+
+def client_loop(app, stop, latencies, statuses, index):
+    client = app.test_client()
+    user_id = index % USERS + 1
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = client.post(
+            "/api/v1/users/login",
+            json={"username": f"user{user_id}", "password": PASSWORD},
+        )
+        latencies.append(time.perf_counter() - started)
+        statuses.append(response.status_code)
+        user_id = user_id % USERS + 1
+
+
+def probe_loop(app, stop, latencies):
+    client = app.test_client()
+    while not stop.is_set():
+        started = time.perf_counter()
+        client.get("/api/v1/plans/")
+        latencies.append(time.perf_counter() - started)
+        time.sleep(0.01)
+
+
+def p95_ms(latencies):
+    if len(latencies) < 2:
+        return 0.0
+    return statistics.quantiles(latencies, n=100)[94] * 1e3
+
+
+def run(workdir, workers, args):
+    path = Path(workdir) / f"login_{workers}.db"
+    app = create_app(bench_config(path, workers, args.max_queue))
+    with app.app_context():
+        db.create_all()
+        seed(app.config["PASSWORD_HASH_METHOD"])
+
+    queries = [0]
+
+    def count(*_):
+        if threading.current_thread().name.startswith("login-client"):
+            queries[0] += 1
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", count)
+
+    stop = threading.Event()
+    latencies, statuses, probe_latencies = [], [], []
+    threads = [
+        threading.Thread(
+            target=client_loop,
+            args=(app, stop, latencies, statuses, index),
+            name=f"login-client-{index}",
+        )
+        for index in range(args.clients)
+    ]
+    threads.append(
+        threading.Thread(target=probe_loop, args=(app, stop, probe_latencies))
+    )
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        event.remove(db.engine, "before_cursor_execute", count)
+        db.engine.dispose()
+
+    logins = statuses.count(200)
+    cores = min(workers, len(os.sched_getaffinity(0)))
+    ok_latencies = [t for t, status in zip(latencies, statuses) if status == 200]
+    return {
+        "logins_per_second": logins / args.seconds,
+        "logins_per_second_per_core": logins / args.seconds / cores,
+        "p95_ms": p95_ms(ok_latencies),
+        "probe_p95_ms": p95_ms(probe_latencies),
+        "busy": statuses.count(503),
+        "queries_per_login": queries[0] / len(statuses) if statuses else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--max-queue", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"{len(os.sched_getaffinity(0))} cores available")
+    with tempfile.TemporaryDirectory() as workdir:
+        for workers in args.workers:
+            result = run(workdir, workers, args)
+            print(
+                f"{workers:>2} workers: {result['logins_per_second']:7.1f} logins/s "
+                f"{result['logins_per_second_per_core']:6.1f}/core "
+                f"p95 {result['p95_ms']:7.1f} ms "
+                f"busy {result['busy']} "
+                f"plans p95 {result['probe_p95_ms']:6.1f} ms "
+                f"{result['queries_per_login']:.2f} queries/login"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Token revocation check benchmark.
+
+Seeds a file database with revoked tokens (some by `jti`, some revoke-alls
+for a user), then checks unrevoked and revoked tokens the way the JWT
+blocklist loader does, once through the Bloom pre-filter and once querying
+the blocklist for every check. Reports microseconds and SQL queries per
+check and the filter's observed false-positive rate on unrevoked tokens.
+
+    python -m benchmarks.bench_revocation --revoked 50000 --checks 20000
+"""
+
+import argparse
+import tempfile
+import time
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
+from sqlalchemy import event, insert
+
+from app import create_app
+from app.config import ProductionConfig
+from app.extensions import db
+from app.models.token_blocklist_model import RevokedToken
+from app.models.user_model import User
+from app.services.revocation_filter import revocation_filter
+from app.utils.clock import utcnow
+from app.services.token_service import TokenService
+
+USERS = 1000
+# one user in this many has a revoke-all in force
+REVOKE_ALL_EVERY = 20
+
+
+def bench_config(path):
+    return type(
+        "BenchRevocationConfig",
+        (ProductionConfig,),
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+            "SQLALCHEMY_REPLICA_URIS": [],
+            "EXPIRY_SCHEDULER_ENABLED": False,
+        },
+    )
+
+
+def token(user_id, issued_at, jti=None):
+    return {
+        "jti": jti or str(uuid.uuid4()),
+        "sub": str(user_id),
+        "iat": issued_at,
+        "exp": issued_at + 3600,
+    }
+
+
+def seed(revoked):
+    """Insert users and revocations, returning the revoked jtis"""
+    now = utcnow()
+    db.session.execute(
+        insert(User),
+        [
+            {"id": i, "username": f"user{i}", "email": f"u{i}@x.io", "pass_hash": "x"}
+            for i in range(1, USERS + 1)
+        ],
+    )
+    jtis = [str(uuid.uuid4()) for _ in range(revoked)]
+    rows = [
+        {
+            "jti": jti,
+            "user_id": i % USERS + 1,
+            "revoked_at": now,
+            "expires_at": now + timedelta(hours=1),
+        }
+        for i, jti in enumerate(jtis)
+    ]
+    rows += [
+        {
+            "jti": None,
+            "user_id": user_id,
+            "revoked_at": now,
+            "expires_at": now + timedelta(hours=1),
+        }
+        for user_id in range(1, USERS + 1, REVOKE_ALL_EVERY)
+    ]
+    db.session.execute(insert(RevokedToken), rows)
+    db.session.commit()
+    return jtis
+
+
+def always_query(payload):
+    """The check without a pre-filter: both blocklist lookups every time"""
+    return TokenService._jti_revoked(payload["jti"]) or (
+        TokenService._revoked_for_user(payload["sub"], payload["iat"])
+    )
+
+
+def measure(check, payloads):
+    queries = [0]
+
+    def count(*_):
+        queries[0] += 1
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    started = time.perf_counter()
+    try:
+        revoked = sum(bool(check(payload)) for payload in payloads)
+    finally:
+        elapsed = time.perf_counter() - started
+        event.remove(db.engine, "before_cursor_execute", count)
+    return {
+        "us_per_check": elapsed / len(payloads) * 1e6,
+        "queries_per_check": queries[0] / len(payloads),
+        "revoked": revoked,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--revoked", type=int, default=50000)
+    parser.add_argument("--checks", type=int, default=20000)
+    parser.add_argument("--capacity", type=int, default=100000)
+    parser.add_argument("--error-rate", type=float, default=0.001)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        config = bench_config(Path(workdir) / "revocation.db")
+        config.TOKEN_BLOCKLIST_CAPACITY = args.capacity
+        config.TOKEN_BLOCKLIST_ERROR_RATE = args.error_rate
+        app = create_app(config)
+        with app.app_context():
+            db.create_all()
+            jtis = seed(args.revoked)
+            # issued before the revoke-alls, so those users' tokens count
+            issued_at = int(time.time()) - 60
+            # tokens of users without a revoke-all, none of them revoked
+            clean = [
+                token(user_id, issued_at)
+                for user_id in (
+                    i % USERS + 1 for i in range(args.checks * REVOKE_ALL_EVERY)
+                )
+                if (user_id - 1) % REVOKE_ALL_EVERY
+            ][: args.checks]
+            revoked = [
+                token(i % USERS + 1, issued_at, jtis[i % len(jtis)])
+                for i in range(args.checks)
+            ]
+
+            started = time.perf_counter()
+            revocation_filter.rebuild()
+            load_ms = (time.perf_counter() - started) * 1e3
+            stats = revocation_filter.stats()
+            print(
+                f"filter: {stats['keys']} keys, {stats['bytes'] / 1024:.0f} KiB, "
+                f"built in {load_ms:.0f} ms"
+            )
+
+            for label, payloads in (("unrevoked", clean), ("revoked", revoked)):
+                for mode, check in (
+                    ("filter", TokenService.is_revoked),
+                    ("db-always", always_query),
+                ):
+                    before = revocation_filter.stats()["false_positives"]
+                    result = measure(check, payloads)
+                    line = (
+                        f"{label:>9} {mode:>9}: {result['us_per_check']:7.1f} us/check "
+                        f"{result['queries_per_check']:.3f} queries/check "
+                        f"{result['revoked']} revoked"
+                    )
+                    if mode == "filter" and label == "unrevoked":
+                        false_positives = (
+                            revocation_filter.stats()["false_positives"] - before
+                        )
+                        line += (
+                            f", false positives {false_positives / len(payloads):.4%}"
+                        )
+                    print(line)
+            db.session.remove()
+            db.engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
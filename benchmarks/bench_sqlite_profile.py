@@ -0,0 +1,157 @@
+"""
+Read/write concurrency benchmark of the SQLite config profiles.
+
+Runs reader threads paging subscription history while a writer thread
+commits new subscriptions, against a file database opened with the base
+`Config` (rollback journal, default pragmas and pool) and with
+`ProductionConfig` (WAL and tuned pragmas).
+
+    python -m benchmarks.bench_sqlite_profile --readers 8 --seconds 5
+"""
+
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from app import create_app
+from app.config import Config, ProductionConfig
+from app.extensions import db
+from app.models.plan_model import Plan
+from app.models.subscription_model import Subscription
+from app.models.user_model import User
+from app.services.subscription_service import SubscriptionService
+
+USERS = 50
+
+
+def profile_config(base, path):
+    return type(
+        f"Bench{base.__name__}",
+        (base,),
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}",
+            "EXPIRY_SCHEDULER_ENABLED": False,
+        },
+    )
+
+
+def seed(rows):
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    db.session.add(
+        Plan(id=1, name="Pro", description="Pro plan", price=10, duration_in_days=30)
+    )
+    db.session.add_all(
+        User(id=i, username=f"user{i}", email=f"u{i}@x.io", pass_hash="x")
+        for i in range(1, USERS + 1)
+    )
+    db.session.commit()
+    db.session.execute(
+        Subscription.__table__.insert(),
+        [
+            {
+                "user_id": i % USERS + 1,
+                "plan_id": 1,
+                "start_date": now,
+                "end_date": now + timedelta(days=30),
+                "created_at": now + timedelta(seconds=i),
+            }
+            for i in range(rows)
+        ],
+    )
+    db.session.commit()
+
+
+def reader(app, stop, latencies, errors, index):
+    with app.app_context():
+        user_id = index % USERS + 1
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                SubscriptionService.get_subscription_history(user_id, limit=20)
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                errors.append(1)
+            finally:
+                db.session.remove()
+            user_id = user_id % USERS + 1
+
+
+def writer(app, stop, latencies, errors):
+    with app.app_context():
+        user_id = 1
+        while not stop.is_set():
+            started = time.perf_counter()
+            try:
+                SubscriptionService.create_subscription(user_id, 1)
+                latencies.append(time.perf_counter() - started)
+            except Exception:
+                db.session.rollback()
+                errors.append(1)
+            finally:
+                db.session.remove()
+            user_id = user_id % USERS + 1
+
+
+def run_profile(base, workdir, args):
+    app = create_app(profile_config(base, Path(workdir) / f"{base.__name__}.db"))
+    with app.app_context():
+        db.create_all()
+        seed(args.rows)
+
+    stop = threading.Event()
+    read_latencies, write_latencies, errors = [], [], []
+    threads = [
+        threading.Thread(target=reader, args=(app, stop, read_latencies, errors, i))
+        for i in range(args.readers)
+    ]
+    threads.append(
+        threading.Thread(target=writer, args=(app, stop, write_latencies, errors))
+    )
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        db.engine.dispose()
+
+    read_p95 = statistics.quantiles(read_latencies, n=100)[94] if read_latencies else 0
+    return {
+        "reads_per_second": len(read_latencies) / args.seconds,
+        "writes_per_second": len(write_latencies) / args.seconds,
+        "read_p95_ms": read_p95 * 1e3,
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, base in (("default", Config), ("production", ProductionConfig)):
+            results[name] = result = run_profile(base, workdir, args)
+            print(
+                f"{name:>10}: {result['reads_per_second']:8.0f} reads/s "
+                f"{result['writes_per_second']:7.0f} writes/s "
+                f"read p95 {result['read_p95_ms']:6.2f} ms "
+                f"errors {result['errors']}"
+            )
+
+    for metric in ("reads_per_second", "writes_per_second"):
+        baseline = results["default"][metric] or 1
+        print(f"{metric} gain: {results['production'][metric] / baseline:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Micro-benchmark of the subscription listing serialization paths.
+
+Compares the legacy path (untyped rows, dateutil parsing, nested dicts and a
+marshmallow dump) with `dump_subscription_rows` on typed rows.
+
+    python -m benchmarks.bench_subscription_serializer --rows 100 --repeat 500
+"""
+
+import argparse
+import timeit
+from datetime import datetime, timedelta
+
+from dateutil.parser import parse as parse_datetime
+from sqlalchemy import DateTime, text
+
+from app import create_app
+from app.extensions import db
+from app.models.plan_model import Plan
+from app.models.subscription_model import Subscription
+from app.schemas import dump_subscription_rows, subscription_list_schema
+
+LISTING_QUERY = """
+    SELECT s.id, s.user_id, s.plan_id, s.start_date, s.end_date, s.is_active,
+           s.auto_renew, s.created_at,
+           p.name as plan_name, p.price as plan_price,
+           p.description as plan_description,
+           p.duration_in_days as plan_duration_in_days, p.tier as plan_tier
+    FROM subscriptions s
+    JOIN plans p ON s.plan_id = p.id
+    WHERE s.user_id = :user_id
+    ORDER BY s.created_at DESC, s.id DESC
+    LIMIT :limit
+"""
+
+
+class BenchConfig:
+    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+
+def seed(rows):
+    now = datetime(2025, 1, 1, 12, 0, 0)
+    db.session.add(
+        Plan(id=1, name="Pro", description="Pro plan", price=10, duration_in_days=30)
+    )
+    db.session.add_all(
+        Subscription(
+            user_id=1,
+            plan_id=1,
+            start_date=now + timedelta(minutes=i),
+            end_date=now + timedelta(days=30, minutes=i),
+            created_at=now + timedelta(minutes=i, microseconds=i),
+        )
+        for i in range(rows)
+    )
+    db.session.commit()
+
+
+def legacy_path(limit):
+    rows = db.session.execute(
+        text(LISTING_QUERY), {"user_id": 1, "limit": limit}
+    ).fetchall()
+    data = [
+        {
+            "id": row.id,
+            "user_id": row.user_id,
+            "plan_id": row.plan_id,
+            "start_date": parse_datetime(row.start_date),
+            "end_date": parse_datetime(row.end_date),
+            "is_active": bool(row.is_active),
+            "auto_renew": bool(row.auto_renew),
+            "created_at": parse_datetime(row.created_at),
+            "plan": {
+                "id": row.plan_id,
+                "name": row.plan_name,
+                "price": float(row.plan_price),
+                "description": row.plan_description,
+                "duration_in_days": row.plan_duration_in_days,
+                "tier": row.plan_tier,
+            },
+        }
+        for row in rows
+    ]
+    return subscription_list_schema.dump(data)
+
+
+def fast_path(limit):
+    query = text(LISTING_QUERY).columns(
+        start_date=DateTime, end_date=DateTime, created_at=DateTime
+    )
+    rows = db.session.execute(query, {"user_id": 1, "limit": limit}).fetchall()
+    return dump_subscription_rows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        db.create_all()
+        seed(args.rows)
+
+        assert legacy_path(args.rows) == fast_path(args.rows)
+
+        results = {}
+        for name, func in (("legacy", legacy_path), ("fast", fast_path)):
+            seconds = min(
+                timeit.repeat(lambda: func(args.rows), number=args.repeat, repeat=3)
+            )
+            results[name] = seconds / args.repeat
+            print(f"{name:>8}: {results[name] * 1e3:.3f} ms per {args.rows}-row page")
+        print(f" speedup: {results['legacy'] / results['fast']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""
+Endpoint load benchmark.
+
+Seeds a fresh database with the synthetic data generator, then drives every API route through the WSGI app
+with concurrent workers, one endpoint at a time, and reports throughput,
+p50/p95/p99 latency and SQL queries per request. Results are saved as JSON
+and can be compared against a previous run:
+
+    flask bench --users 1000 --subscriptions-per-user 20 --output base.json
+    flask bench --users 1000 --subscriptions-per-user 20 --baseline base.json
+"""
+
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter, namedtuple
+from datetime import datetime, timezone
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event, func, select
+
+from app import create_app
+from app.config import get_config
+from app.extensions import db
+from app.models.plan_model import Plan
+from app.models.subscription_model import Subscription
+from scripts.seed_db import generate_data
+
+PASSWORD = "benchmark"
+SAMPLE_SIZE = 10000
+
+Endpoint = namedtuple("Endpoint", ["name", "method", "build"])
+
+_queries = threading.local()
+
+
+class Fixture:
+    """Seeded ids the request builders draw from"""
+
+    def __init__(self, app, owned, plan_ids, tokens):
+        self.app = app
+        self.owned = owned
+        self.plan_ids = plan_ids
+        self.tokens = tokens
+        self.names = itertools.count()
+        self.users = itertools.cycle(sorted(tokens))
+
+    def subscription(self, rng):
+        """A (subscription id, owner id) pair; heavy users come up more often"""
+        return rng.choice(self.owned)
+
+    def headers(self, user_id):
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+    def fresh_headers(self, user_id):
+        """Headers with a newly minted token, for requests that revoke it"""
+        with self.app.app_context():
+            token = create_access_token(identity=str(user_id))
+        return {"Authorization": f"Bearer {token}"}
+
+    def unique(self, prefix):
+        return f"{prefix}{os.getpid()}_{next(self.names)}"
+
+
+def _get(path):
+    def build(rng, fixture):
+        _, user_id = fixture.subscription(rng)
+        return path.format(user_id=user_id), None, fixture.headers(user_id)
+
+    return build
+
+
+def _get_plan(rng, fixture):
+    return f"/api/v1/plans/{rng.choice(fixture.plan_ids)}", None, None
+
+
+def _signup(rng, fixture):
+    name = fixture.unique("bench")
+    body = {"username": name, "email": f"{name}@bench.io", "password": PASSWORD}
+    return "/api/v1/users/signup", body, None
+
+
+def _login(rng, fixture):
+    _, user_id = fixture.subscription(rng)
+    body = {"username": f"user{user_id}", "password": PASSWORD}
+    return "/api/v1/users/login", body, None
+
+
+def _create_plan(rng, fixture):
+    _, user_id = fixture.subscription(rng)
+    body = {
+        "name": fixture.unique("plan")[-50:],
+        "description": "Benchmark plan",
+        "price": rng.randint(1, 50),
+        "duration_in_days": 30,
+    }
+    return "/api/v1/plans/", body, fixture.headers(user_id)
+
+
+def _create_subscription(rng, fixture):
+    _, user_id = fixture.subscription(rng)
+    body = {"plan_id": rng.choice(fixture.plan_ids)}
+    return "/api/v1/subscriptions/", body, fixture.headers(user_id)
+
+
+def _bulk_create(rng, fixture):
+    _, user_id = fixture.subscription(rng)
+    items = [
+        {"user_id": user_id, "plan_id": rng.choice(fixture.plan_ids)} for _ in range(10)
+    ]
+    return (
+        "/api/v1/subscriptions/bulk",
+        {"subscriptions": items},
+        fixture.headers(user_id),
+    )
+
+
+def _upgrade(rng, fixture):
+    subscription_id, user_id = fixture.subscription(rng)
+    body = {"new_plan_id": rng.choice(fixture.plan_ids)}
+    path = f"/api/v1/subscriptions/{subscription_id}/upgrade"
+    return path, body, fixture.headers(user_id)
+
+
+def _cancel(rng, fixture):
+    subscription_id, user_id = fixture.subscription(rng)
+    path = f"/api/v1/subscriptions/{subscription_id}/cancel"
+    return path, None, fixture.headers(user_id)
+
+
+def _entitlement(rng, fixture):
+    _, user_id = fixture.subscription(rng)
+    path = f"/api/v1/entitlements/{user_id}?plan_id={rng.choice(fixture.plan_ids)}"
+    return path, None, fixture.headers(user_id)
+
+
+def _check_entitlements(rng, fixture):
+    _, user_id = fixture.subscription(rng)
+    body = {"plan_id": rng.choice(fixture.plan_ids), "user_ids": [user_id]}
+    return "/api/v1/entitlements/check", body, fixture.headers(user_id)
+
+
+def _logout(path):
+    def build(rng, fixture):
+        # each user in turn: logout-all also revokes tokens minted later in
+        # the same second
+        user_id = next(fixture.users)
+        return path, None, fixture.fresh_headers(user_id)
+
+    return build
+
+
+def _events(rng, fixture):
+    _, user_id = fixture.subscription(rng)
+    return "/api/v1/events?limit=1000", None, fixture.headers(user_id)
+
+
+# reads run first so they see the seeded data, the event feed after the
+# writes that fill it, then password hashing, and logouts last because
+# logout-all revokes the fixture's tokens. Not covered: the subscription
+# stream, which holds its connection open for the token's lifetime, so
+# request latency and throughput don't describe it.
+ENDPOINTS = (
+    Endpoint("plans.list", "GET", lambda rng, fixture: ("/api/v1/plans/", None, None)),
+    Endpoint("plans.get", "GET", _get_plan),
+    Endpoint("users.get", "GET", _get("/api/v1/users/{user_id}")),
+    Endpoint("subscriptions.active", "GET", _get("/api/v1/subscriptions/active")),
+    Endpoint("subscriptions.history", "GET", _get("/api/v1/subscriptions/history")),
+    Endpoint("subscriptions.export", "GET", _get("/api/v1/subscriptions/export")),
+    Endpoint("subscriptions.changes", "GET", _get("/api/v1/subscriptions/changes")),
+    Endpoint("entitlements.get", "GET", _entitlement),
+    Endpoint("entitlements.check", "POST", _check_entitlements),
+    Endpoint("metrics", "GET", lambda rng, fixture: ("/metrics", None, None)),
+    Endpoint("subscriptions.create", "POST", _create_subscription),
+    Endpoint("subscriptions.bulk", "POST", _bulk_create),
+    Endpoint("subscriptions.upgrade", "GET", _upgrade),
+    Endpoint("subscriptions.cancel", "PUT", _cancel),
+    Endpoint("events.feed", "GET", _events),
+    Endpoint("plans.create", "POST", _create_plan),
+    Endpoint("users.signup", "POST", _signup),
+    Endpoint("users.login", "POST", _login),
+    Endpoint("users.logout", "POST", _logout("/api/v1/users/logout")),
+    Endpoint("users.logout_all", "POST", _logout("/api/v1/users/logout-all")),
+)
+
+
+def load_fixture(app, rng):
+    """Sample subscriptions and mint tokens for their owners"""
+    last_id = db.session.execute(select(func.max(Subscription.id))).scalar() or 0
+    sample = rng.sample(range(1, last_id + 1), min(SAMPLE_SIZE, last_id))
+    owned = [
+        tuple(row)
+        for row in db.session.execute(
+            select(Subscription.id, Subscription.user_id)
+            .where(Subscription.id.in_(sample))
+            .order_by(Subscription.id)
+        )
+    ]
+    plan_ids = db.session.execute(select(Plan.id)).scalars().all()
+    tokens = {
+        user_id: create_access_token(identity=str(user_id))
+        for user_id in {user_id for _, user_id in owned}
+    }
+    return Fixture(app, owned, plan_ids, tokens)
+
+
+def _count_query(*args):
+    _queries.count = getattr(_queries, "count", 0) + 1
+
+
+def _percentile(values, percent):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[percent - 1]
+
+
+def run_endpoint(app, endpoint, fixture, requests, workers, seed_value):
+    latencies, queries, statuses = [], [], Counter()
+    lock = threading.Lock()
+
+    def worker(index, count):
+        rng = random.Random(f"{seed_value}:{endpoint.name}:{index}")
+        client = app.test_client()
+        for _ in range(count):
+            path, body, headers = endpoint.build(rng, fixture)
+            _queries.count = 0
+            started = time.perf_counter()
+            response = client.open(
+                path, method=endpoint.method, json=body, headers=headers
+            )
+            response.get_data()
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                queries.append(_queries.count)
+                statuses[response.status_code] += 1
+
+    shares = [requests // workers + (i < requests % workers) for i in range(workers)]
+    threads = [
+        threading.Thread(target=worker, args=(index, count))
+        for index, count in enumerate(shares)
+        if count
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / wall, 1),
+        "p50_ms": round(_percentile(latencies, 50) * 1e3, 3),
+        "p95_ms": round(_percentile(latencies, 95) * 1e3, 3),
+        "p99_ms": round(_percentile(latencies, 99) * 1e3, 3),
+        "queries_per_request": round(statistics.fmean(queries), 2),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+def run_benchmark(
+    users=1000,
+    subscriptions_per_user=20,
+    skew=1.0,
+    requests=200,
+    workers=8,
+    endpoints=None,
+    profile="production",
+    database=None,
+    seed_value=42,
+    report=print,
+):
+    """Seed a fresh database and benchmark each endpoint, returning the results"""
+    selected = [e for e in ENDPOINTS if not endpoints or e.name in endpoints]
+    unknown = set(endpoints or ()) - {e.name for e in ENDPOINTS}
+    if unknown:
+        raise ValueError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = database or os.path.join(workdir, "bench.db")
+        if os.path.exists(path):
+            raise ValueError(f"{path} already exists, pass a fresh database path")
+        config = type(
+            "BenchConfig",
+            (get_config(profile),),
+            {
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{os.path.abspath(path)}",
+                "SQLALCHEMY_REPLICA_URIS": [],
+                "EXPIRY_SCHEDULER_ENABLED": False,
+            },
+        )
+        app = create_app(config)
+        rng = random.Random(seed_value)
+
+        with app.app_context():
+            db.create_all()
+            generate_data(
+                db.engine,
+                users=users,
+                subscriptions_per_user=subscriptions_per_user,
+                skew=skew,
+                seed=seed_value,
+                password=PASSWORD,
+                report=report,
+            )
+            fixture = load_fixture(app, rng)
+            event.listen(db.engine, "before_cursor_execute", _count_query)
+
+        results = {}
+        try:
+            for endpoint in selected:
+                results[endpoint.name] = result = run_endpoint(
+                    app, endpoint, fixture, requests, workers, seed_value
+                )
+                report(format_result(endpoint.name, result))
+        finally:
+            with app.app_context():
+                event.remove(db.engine, "before_cursor_execute", _count_query)
+                db.engine.dispose()
+
+    return {
+        "meta": {
+            "users": users,
+            "subscriptions_per_user": subscriptions_per_user,
+            "skew": skew,
+            "requests": requests,
+            "workers": workers,
+            "profile": profile,
+            "seed": seed_value,
+            "python": platform.python_version(),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
+        "endpoints": results,
+    }
+
+
+def format_result(name, result):
+    return (
+        f"{name:<24} {result['throughput_rps']:>8.1f} req/s  "
+        f"p50 {result['p50_ms']:>7.2f}  p95 {result['p95_ms']:>7.2f}  "
+        f"p99 {result['p99_ms']:>7.2f} ms  "
+        f"{result['queries_per_request']:>5.1f} queries"
+    )
+
+
+def compare(results, baseline, tolerance=0.1):
+    """
+    Compare a run against a baseline run.
+
+    Returns report lines and the names of endpoints that regressed: p95 more
+    than `tolerance` slower, throughput more than `tolerance` lower, or more
+    queries per request.
+    """
+    lines, regressions = [], []
+    for name, result in results["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(name)
+        if base is None:
+            lines.append(f"{name:<24} no baseline")
+            continue
+        p95 = result["p95_ms"] / base["p95_ms"] if base["p95_ms"] else 1.0
+        throughput = (
+            result["throughput_rps"] / base["throughput_rps"]
+            if base["throughput_rps"]
+            else 1.0
+        )
+        regressed = (
+            p95 > 1 + tolerance
+            or throughput < 1 - tolerance
+            or result["queries_per_request"] > base["queries_per_request"]
+        )
+        if regressed:
+            regressions.append(name)
+        lines.append(
+            f"{name:<24} p95 {p95:>5.2f}x  throughput {throughput:>5.2f}x  "
+            f"queries {base['queries_per_request']:.1f} -> "
+            f"{result['queries_per_request']:.1f}"
+            + ("  REGRESSED" if regressed else "")
+        )
+    return lines, regressions
+
+
+def save(results, path):
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+
+
+def load(path):
+    with open(path) as file:
+        return json.load(file)
@@ -1,7 +1,20 @@
+import sys
+from datetime import timedelta
+
+import click
 from flask_migrate import Migrate
 from app import create_app
 from app.extensions import db
-from scripts.seed_db import seed_initial_data
+from app.services.entitlement_service import EntitlementService
+from app.services.event_service import EventService
+from app.services.expiry_service import ExpiryScheduler, ExpiryService
+from app.services.renewal_service import RenewalService
+from app.services.subscription_service import SubscriptionService
+from app.services.token_service import TokenService
+from app.utils.auth import create_service_token
+from app.utils.export import gzip_chunks, ndjson_chunks
+from benchmarks import load as load_benchmark
+from scripts.seed_db import seed_fresh_sqlite, seed_initial_data
 
 
 app = create_app()
@@ -9,10 +22,210 @@ migrate = Migrate(app, db)
 
 
 @app.cli.command()
-def seed():
-    """Seed the database with data."""
-    seed_initial_data()
-    print("Data inserted successfully.")
+@click.option("--users", type=int, default=0, show_default=True)
+@click.option("--subscriptions-per-user", type=int, default=0, show_default=True)
+@click.option("--seed", "seed_value", type=int, default=42, show_default=True)
+@click.option(
+    "--skew",
+    type=float,
+    default=1.0,
+    show_default=True,
+    help="Zipf exponent, 0 = even.",
+)
+@click.option("--cancel-rate", type=float, default=0.15, show_default=True)
+@click.option("--auto-renew-rate", type=float, default=0.7, show_default=True)
+@click.option("--history-days", type=int, default=730, show_default=True)
+@click.option(
+    "--database",
+    type=click.Path(dir_okay=False),
+    help="Build a new SQLite file here instead of seeding the app database.",
+)
+def seed(database, seed_value, **options):
+    """Seed the database with plans, an admin user and synthetic data."""
+    try:
+        if database:
+            result = seed_fresh_sqlite(database, seed=seed_value, **options)
+        else:
+            result = seed_initial_data(seed=seed_value, **options)
+    except ValueError as err:
+        sys.exit(str(err))
+    print(
+        f"Inserted {result['users']} users and {result['subscriptions']} "
+        f"subscriptions in {result['elapsed_seconds']:.1f}s."
+    )
+
+
+@app.cli.command("export-subscriptions")
+@click.option("--user-id", type=int, help="Only export this user's subscriptions.")
+@click.option("--output", type=click.Path(dir_okay=False), help="Defaults to stdout.")
+@click.option(
+    "--order-by", type=click.Choice(["created_at", "end_date"]), default="created_at"
+)
+@click.option("--active-only", is_flag=True)
+@click.option("--future-only", is_flag=True)
+@click.option("--gzip", "compress", is_flag=True, help="Gzip the output.")
+@click.option("--batch-size", type=int, default=5000, show_default=True)
+def export_subscriptions(
+    user_id, output, order_by, active_only, future_only, compress, batch_size
+):
+    """Stream subscriptions as newline-delimited JSON."""
+    chunks = ndjson_chunks(
+        SubscriptionService.iter_subscription_batches(
+            user_id=user_id,
+            cursor_field=order_by,
+            active_only=active_only,
+            future_only=future_only,
+            batch_size=batch_size,
+        )
+    )
+    if compress:
+        chunks = gzip_chunks(chunks)
+
+    stream = open(output, "wb") if output else sys.stdout.buffer
+    try:
+        for chunk in chunks:
+            stream.write(chunk)
+    finally:
+        if output:
+            stream.close()
+
+
+@app.cli.command("renew-subscriptions")
+@click.option("--batch-size", type=int, default=1000, show_default=True)
+@click.option("--dry-run", is_flag=True, help="Count renewals without writing.")
+@click.option("--no-resume", is_flag=True, help="Ignore any saved checkpoint.")
+def renew_subscriptions(batch_size, dry_run, no_resume):
+    """Renew lapsed auto-renewing subscriptions."""
+    report = RenewalService.renew_expired_subscriptions(
+        batch_size=batch_size, dry_run=dry_run, resume=not no_resume
+    )
+    action = "Would renew" if dry_run else "Renewed"
+    print(
+        f"{action} {report['renewed']} subscriptions in {report['batches']} batches "
+        f"({report['elapsed_seconds']}s, {report['rows_per_second']} rows/sec)"
+    )
+
+
+@app.cli.command("expire-subscriptions")
+@click.option("--batch-size", type=int, default=500, show_default=True)
+def expire_subscriptions(batch_size):
+    """Deactivate every lapsed, non-renewing subscription once."""
+    expired = ExpiryService.expire_lapsed_subscriptions(batch_size=batch_size)
+    print(f"Deactivated {expired} lapsed subscriptions")
+
+
+@app.cli.command("rebuild-entitlements")
+@click.option("--batch-size", type=int, default=1000, show_default=True)
+def rebuild_entitlements(batch_size):
+    """Recompute every user's entitlement from their active subscriptions."""
+    written = EntitlementService.rebuild(batch_size=batch_size)
+    print(f"Wrote {written} entitlements")
+
+
+@app.cli.command("compact-events")
+@click.option(
+    "--retention-days",
+    type=float,
+    default=None,
+    help="Keep this many days of events [default: EVENT_RETENTION_DAYS].",
+)
+@click.option("--batch-size", type=int, default=5000, show_default=True)
+def compact_events(retention_days, batch_size):
+    """Delete subscription events older than the retention period."""
+    if retention_days is None:
+        retention_days = app.config["EVENT_RETENTION_DAYS"]
+    deleted = EventService.compact(
+        timedelta(days=retention_days), batch_size=batch_size
+    )
+    print(f"Deleted {deleted} subscription events")
+
+
+@app.cli.command("purge-revoked-tokens")
+def purge_revoked_tokens():
+    """Delete blocklist rows whose tokens have all expired."""
+    purged = TokenService.purge_expired()
+    print(f"Purged {purged} expired blocklist entries")
+
+
+@app.cli.command("issue-service-token")
+@click.argument("user_id", type=int)
+def issue_service_token(user_id):
+    """Print a service access token acting as USER_ID."""
+    print(create_service_token(user_id))
+
+
+@app.cli.command("run-expiry-scheduler")
+def run_expiry_scheduler():
+    """Run the subscription expiry scheduler in the foreground."""
+    ExpiryScheduler(app).run_forever()
+
+
+@app.cli.command("bench")
+@click.option("--users", type=int, default=1000, show_default=True)
+@click.option("--subscriptions-per-user", type=int, default=20, show_default=True)
+@click.option(
+    "--skew",
+    type=float,
+    default=1.0,
+    show_default=True,
+    help="Zipf exponent, 0 = even.",
+)
+@click.option("--requests", type=int, default=200, show_default=True)
+@click.option("--workers", type=int, default=8, show_default=True)
+@click.option(
+    "--endpoint",
+    "endpoints",
+    multiple=True,
+    type=click.Choice([endpoint.name for endpoint in load_benchmark.ENDPOINTS]),
+    help="Only benchmark these endpoints (repeatable).",
+)
+@click.option(
+    "--profile",
+    type=click.Choice(["development", "production"]),
+    default="production",
+    show_default=True,
+)
+@click.option("--database", type=click.Path(dir_okay=False), help="Keep the DB here.")
+@click.option("--seed", type=int, default=42, show_default=True)
+@click.option("--output", type=click.Path(dir_okay=False), help="Write results JSON.")
+@click.option("--baseline", type=click.Path(exists=True, dir_okay=False))
+@click.option("--tolerance", type=float, default=0.1, show_default=True)
+def bench(
+    users,
+    subscriptions_per_user,
+    skew,
+    requests,
+    workers,
+    endpoints,
+    profile,
+    database,
+    seed,
+    output,
+    baseline,
+    tolerance,
+):
+    """Load-benchmark every endpoint against a freshly seeded database."""
+    results = load_benchmark.run_benchmark(
+        users=users,
+        subscriptions_per_user=subscriptions_per_user,
+        skew=skew,
+        requests=requests,
+        workers=workers,
+        endpoints=endpoints,
+        profile=profile,
+        database=database,
+        seed_value=seed,
+    )
+    if output:
+        load_benchmark.save(results, output)
+        print(f"Results written to {output}")
+    if baseline:
+        lines, regressions = load_benchmark.compare(
+            results, load_benchmark.load(baseline), tolerance
+        )
+        print("\n".join(lines))
+        if regressions:
+            sys.exit(f"Regressed against baseline: {', '.join(regressions)}")
 
 
 if __name__ == "__main__":
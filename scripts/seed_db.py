@@ -1,44 +1,283 @@
+"""
+Synthetic data generator.
+
+Builds users, plans and subscriptions at production-like volumes with bulk
+Core inserts: large executemany batches inside a handful of transactions,
+with the secondary subscription indexes dropped during the load and rebuilt
+once at the end. Output is deterministic for a given seed.
+
+    flask seed                                      # admin user and plans only
+    flask seed --users 100000 --subscriptions-per-user 10
+    flask seed --users 1000000 --subscriptions-per-user 10 --database big.db
+"""
+
+import itertools
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import create_engine, event, func, insert, select
+from werkzeug.security import generate_password_hash
+
 from app import create_app
 from app.extensions import db
-from app.models.user_model import User
 from app.models.plan_model import Plan
+from app.models.subscription_model import Subscription
+from app.models.user_model import User
+from app.services.subscription_queries import entitlement_insert
+
+# name, description, price, duration_in_days, tier, share of new subscriptions
+PLANS = (
+    ("Free", "Basic free plan", 0, 30, 0, 0.45),
+    ("Basic", "Basic subscription", 4.99, 30, 1, 0.30),
+    ("Pro", "Professional plan", 9.99, 30, 2, 0.15),
+    ("Enterprise", "Enterprise solution", 19.99, 30, 3, 0.04),
+    ("Basic Annual", "Basic subscription, billed yearly", 49.99, 365, 1, 0.04),
+    ("Pro Annual", "Professional plan, billed yearly", 99.99, 365, 2, 0.02),
+)
+
+BATCH_SIZE = 50000
+# commit every this many rows, so a large load is a few big transactions
+ROWS_PER_TRANSACTION = 2000000
+
+# fast, non-durable settings for building a fresh file; not for serving
+BULK_LOAD_PRAGMAS = (
+    "PRAGMA journal_mode = OFF",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA locking_mode = EXCLUSIVE",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -262144",
+)
 
 
-def seed_initial_data():
+def seed_initial_data(**options):
+    """Seed the app's configured database"""
     app = create_app()
     with app.app_context():
-        if not User.query.filter_by(username="admin").first():
-            admin = User(username="admin", email="admin@gmail.com")
-            admin.set_password("admin123")
-            db.session.add(admin)
-
-        if not Plan.query.count():
-            plans = [
-                Plan(
-                    name="Free",
-                    description="Basic free plan",
-                    price=0,
-                    duration_in_days=30,
-                ),
-                Plan(
-                    name="Basic",
-                    description="Basic subscription",
-                    price=4.99,
-                    duration_in_days=30,
-                ),
-                Plan(
-                    name="Pro",
-                    description="Professional plan",
-                    price=9.99,
-                    duration_in_days=30,
-                ),
-                Plan(
-                    name="Enterprise",
-                    description="Enterprise solution",
-                    price=19.99,
-                    duration_in_days=30,
-                ),
-            ]
-            db.session.add_all(plans)
-
-        db.session.commit()
+        db.create_all()
+        return generate_data(db.engine, **options)
+
+
+def seed_fresh_sqlite(path, **options):
+    """Build a new SQLite file at `path` with bulk-load pragmas"""
+    if os.path.exists(path):
+        raise ValueError(f"{path} already exists")
+    engine = create_engine(f"sqlite:///{os.path.abspath(path)}")
+
+    @event.listens_for(engine, "connect")
+    def bulk_load_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in BULK_LOAD_PRAGMAS:
+            cursor.execute(pragma)
+        cursor.close()
+
+    try:
+        db.metadata.create_all(engine)
+        return generate_data(engine, **options)
+    finally:
+        engine.dispose()
+
+
+def generate_data(
+    engine,
+    users=0,
+    subscriptions_per_user=0,
+    seed=42,
+    skew=1.0,
+    cancel_rate=0.15,
+    auto_renew_rate=0.7,
+    inactive_user_rate=0.02,
+    history_days=730,
+    password="password",
+    now=None,
+    report=print,
+):
+    """
+    Generate plans, an admin user, `users` users and roughly
+    `users * subscriptions_per_user` subscriptions into empty tables.
+
+    Sign-ups and subscriptions are spread over the last `history_days` with
+    more activity in recent months. Subscriptions are shared between users
+    with Zipf weights of exponent `skew`, plans follow the mix in `PLANS`,
+    `cancel_rate` of them are cancelled and non-renewing subscriptions past
+    their end date are inactive.
+    """
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc).replace(tzinfo=None)
+    started = time.perf_counter()
+
+    with engine.begin() as connection:
+        if connection.execute(select(func.count()).select_from(Plan)).scalar():
+            raise ValueError("Database already has data, seed an empty database")
+        _insert_plans(connection, now)
+        _insert_admin(connection, now)
+
+    pass_hash = generate_password_hash(password)
+    _load(
+        engine,
+        User.__table__,
+        _user_rows(rng, users, pass_hash, inactive_user_rate, history_days, now),
+    )
+    report(f"Inserted {users} users ({time.perf_counter() - started:.1f}s)")
+
+    indexes = list(Subscription.__table__.indexes)
+    with engine.begin() as connection:
+        for index in indexes:
+            index.drop(connection)
+    total = _load(
+        engine,
+        Subscription.__table__,
+        _subscription_rows(
+            rng,
+            users,
+            users * subscriptions_per_user,
+            skew,
+            cancel_rate,
+            auto_renew_rate,
+            history_days,
+            now,
+        ),
+    )
+    report(f"Inserted {total} subscriptions ({time.perf_counter() - started:.1f}s)")
+
+    with engine.begin() as connection:
+        for index in indexes:
+            index.create(connection)
+        _sync_sequences(connection)
+    report(f"Built indexes ({time.perf_counter() - started:.1f}s)")
+
+    with engine.begin() as connection:
+        connection.execute(entitlement_insert(now))
+    elapsed = time.perf_counter() - started
+    report(f"Built entitlements ({elapsed:.1f}s)")
+    return {"users": users, "subscriptions": total, "elapsed_seconds": elapsed}
+
+
+def _insert_plans(connection, now):
+    connection.execute(
+        insert(Plan),
+        [
+            {
+                "id": plan_id,
+                "name": name,
+                "description": description,
+                "price": price,
+                "duration_in_days": duration,
+                "tier": tier,
+                "is_active": True,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for plan_id, (name, description, price, duration, tier, _) in enumerate(
+                PLANS, 1
+            )
+        ],
+    )
+
+
+def _insert_admin(connection, now):
+    connection.execute(
+        insert(User),
+        {
+            "username": "admin",
+            "email": "admin@gmail.com",
+            "pass_hash": generate_password_hash("admin123"),
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now,
+        },
+    )
+
+
+def _load(engine, table, rows):
+    """executemany `rows` in batches, committing every ROWS_PER_TRANSACTION"""
+    statement = table.insert()
+    total = 0
+    rows = iter(rows)
+    while True:
+        with engine.begin() as connection:
+            loaded = 0
+            while loaded < ROWS_PER_TRANSACTION:
+                batch = list(itertools.islice(rows, BATCH_SIZE))
+                if not batch:
+                    break
+                connection.execute(statement, batch)
+                loaded += len(batch)
+        total += loaded
+        if loaded < ROWS_PER_TRANSACTION:
+            return total
+
+
+def _sync_sequences(connection):
+    """Move id sequences past the explicit ids inserted above (PostgreSQL)"""
+    if connection.dialect.name != "postgresql":
+        return
+    for table in (Plan.__table__, User.__table__, Subscription.__table__):
+        connection.execute(
+            select(
+                func.setval(
+                    func.pg_get_serial_sequence(table.name, "id"),
+                    func.coalesce(select(func.max(table.c.id)).scalar_subquery(), 1),
+                )
+            )
+        )
+
+
+def _recent_offset(rng, history_days):
+    """Seconds before now, weighted toward the recent end of the history"""
+    return int(history_days * 86400 * (1 - rng.random() ** 0.5))
+
+
+def _user_rows(rng, users, pass_hash, inactive_rate, history_days, now):
+    # user ids start after the admin
+    for user_id in range(2, users + 2):
+        created_at = now - timedelta(seconds=_recent_offset(rng, history_days))
+        yield {
+            "id": user_id,
+            "username": f"user{user_id}",
+            "email": f"user{user_id}@example.com",
+            "pass_hash": pass_hash,
+            "is_active": rng.random() >= inactive_rate,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+
+
+def _subscription_rows(
+    rng, users, total, skew, cancel_rate, auto_renew_rate, history_days, now
+):
+    if not users:
+        return
+    owners = list(range(2, users + 2))
+    rng.shuffle(owners)
+    owner_weights = list(
+        itertools.accumulate(1 / rank**skew for rank in range(1, users + 1))
+    )
+    plan_ids = list(range(1, len(PLANS) + 1))
+    plan_weights = list(itertools.accumulate(share for *_, share in PLANS))
+    durations = {plan_id: plan[3] for plan_id, plan in zip(plan_ids, PLANS)}
+
+    for start in range(0, total, BATCH_SIZE):
+        count = min(BATCH_SIZE, total - start)
+        user_ids = rng.choices(owners, cum_weights=owner_weights, k=count)
+        plans = rng.choices(plan_ids, cum_weights=plan_weights, k=count)
+        for user_id, plan_id in zip(user_ids, plans):
+            start_date = now - timedelta(seconds=_recent_offset(rng, history_days))
+            end_date = start_date + timedelta(days=durations[plan_id])
+            cancelled = rng.random() < cancel_rate
+            auto_renew = not cancelled and rng.random() < auto_renew_rate
+            if auto_renew and end_date <= now:
+                # renewals have kept it current, as the renewal job would
+                period = timedelta(days=durations[plan_id])
+                end_date += period * ((now - end_date) // period + 1)
+            yield {
+                "user_id": user_id,
+                "plan_id": plan_id,
+                "start_date": start_date,
+                "end_date": end_date,
+                "is_active": not cancelled and end_date > now,
+                "auto_renew": auto_renew,
+                "created_at": start_date,
+                "updated_at": start_date,
+            }
@@ -0,0 +1,122 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.models.plan_model import Plan
+from app.services.subscription_service import SubscriptionService
+from app.utils.auth import create_service_token
+
+
+@pytest.fixture
+def auth_headers(users):
+    token = create_access_token(identity="1")
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def entitled_user(app, users):
+    """User 1 on Pro (tier 2); user 2 with no subscription"""
+    db.session.add_all(
+        Plan(
+            id=tier,
+            name=name,
+            description=name,
+            price=tier,
+            duration_in_days=30,
+            tier=tier,
+        )
+        for tier, name in ((1, "Basic"), (2, "Pro"), (3, "Enterprise"))
+    )
+    db.session.commit()
+    SubscriptionService.create_subscription("1", 2)
+
+
+def test_get_entitlement(client, auth_headers, entitled_user):
+    """Test a single user's entitlement, with and without a plan to check"""
+    response = client.get("/api/v1/entitlements/1?plan_id=1", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.get_json()["data"] == {
+        "user_id": 1,
+        "plan_id": 2,
+        "tier": 2,
+        "entitled": True,
+    }
+
+    token = create_access_token(identity="2")
+    response = client.get(
+        "/api/v1/entitlements/2", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert response.get_json()["data"] == {"user_id": 2, "plan_id": None, "tier": None}
+
+
+def test_other_users_entitlements_are_private(client, auth_headers, entitled_user):
+    """Test a caller can't read or check another user's entitlements"""
+    response = client.get("/api/v1/entitlements/2", headers=auth_headers)
+    assert response.status_code == 403
+
+    response = client.post(
+        "/api/v1/entitlements/check",
+        json={"plan_id": 2, "user_ids": [1, 2]},
+        headers=auth_headers,
+    )
+    assert response.status_code == 403
+
+
+def test_batch_check(client, auth_headers, entitled_user):
+    """Test the caller's entitlement is checked through the batch endpoint"""
+    response = client.post(
+        "/api/v1/entitlements/check",
+        json={"plan_id": 2, "user_ids": [1, 1]},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    assert response.get_json()["data"] == {"plan_id": 2, "entitled": {"1": True}}
+
+    response = client.post(
+        "/api/v1/entitlements/check",
+        json={"plan_id": 3, "user_ids": [1]},
+        headers=auth_headers,
+    )
+    assert response.get_json()["data"]["entitled"] == {"1": False}
+
+
+def test_service_token_checks_any_users(client, entitled_user):
+    """Test a service token reads and batch-checks other users"""
+    headers = {"Authorization": f"Bearer {create_service_token(2)}"}
+    response = client.get("/api/v1/entitlements/1", headers=headers)
+    assert response.get_json()["data"]["plan_id"] == 2
+
+    response = client.post(
+        "/api/v1/entitlements/check",
+        json={"plan_id": 2, "user_ids": [1, 2, 3]},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.get_json()["data"]["entitled"] == {
+        "1": True,
+        "2": False,
+        "3": False,
+    }
+
+
+@pytest.mark.parametrize(
+    "payload, message",
+    [
+        ({"user_ids": [1]}, "Plan ID is required"),
+        ({"plan_id": 2, "user_ids": []}, "user_ids must be a non-empty list"),
+        ({"plan_id": 2, "user_ids": ["1"]}, "user_ids must be a non-empty list"),
+        ({"plan_id": 2, "user_ids": list(range(1001))}, "At most 1000 users"),
+        ({"plan_id": 99, "user_ids": [1]}, "Invalid or inactive subscription plan"),
+    ],
+)
+def test_batch_check_rejects_bad_requests(
+    client, auth_headers, entitled_user, payload, message
+):
+    response = client.post(
+        "/api/v1/entitlements/check", json=payload, headers=auth_headers
+    )
+    assert response.status_code == 400
+    assert response.get_json()["message"].startswith(message)
+
+
+def test_requires_token(client):
+    assert client.get("/api/v1/entitlements/1").status_code == 401
@@ -0,0 +1,126 @@
+import pytest
+from datetime import timedelta
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.models.plan_model import Plan
+from app.services.event_service import EventService
+from app.services.subscription_service import SubscriptionService
+from app.utils.auth import create_service_token
+
+
+@pytest.fixture
+def auth_headers(users):
+    token = create_access_token(identity="1")
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def events(app, users):
+    """Three created subscriptions and one cancellation, ready to be read"""
+    app.config["EVENT_FEED_SETTLE_SECONDS"] = 0
+    db.session.add(
+        Plan(id=1, name="Pro", description="Pro", price=10, duration_in_days=30)
+    )
+    db.session.commit()
+    subscriptions = [SubscriptionService.create_subscription(1, 1) for _ in range(3)]
+    SubscriptionService.cancel_subscription(subscriptions[0].id, 1)
+    return [subscription.id for subscription in subscriptions]
+
+
+def test_feed_pages_by_cursor(client, auth_headers, events):
+    """Test the feed is read in order by following next_after"""
+    response = client.get("/api/v1/events?limit=3", headers=auth_headers)
+    assert response.status_code == 200
+    page = response.get_json()["data"]
+    assert [event["type"] for event in page["events"]] == ["subscription.created"] * 3
+    assert [event["data"]["subscription_id"] for event in page["events"]] == events
+    assert page["events"][0]["id"] == 1 and "created_at" in page["events"][0]
+    assert page["has_more"] is True and page["next_after"] == 3
+
+    response = client.get("/api/v1/events?after=3", headers=auth_headers)
+    page = response.get_json()["data"]
+    assert [event["type"] for event in page["events"]] == ["subscription.cancelled"]
+    assert page["has_more"] is False and page["next_after"] == 4
+
+    response = client.get("/api/v1/events?after=4", headers=auth_headers)
+    assert response.get_json()["data"] == {
+        "events": [],
+        "has_more": False,
+        "next_after": 4,
+    }
+
+
+def test_feed_holds_back_unsettled_events(client, auth_headers, events, app):
+    """Test events are served only once older than the settle delay"""
+    app.config["EVENT_FEED_SETTLE_SECONDS"] = 60
+    response = client.get("/api/v1/events", headers=auth_headers)
+    assert response.get_json()["data"]["events"] == []
+
+
+def test_compacted_cursor_is_gone(client, auth_headers, events):
+    """Test a cursor behind compacted events gets 410"""
+    EventService.compact(timedelta(seconds=-60))
+    response = client.get("/api/v1/events?after=1", headers=auth_headers)
+    assert response.status_code == 410
+    assert "compacted" in response.get_json()["message"]
+    assert response.get_json()["data"] == {"compacted_through": 4}
+
+    response = client.get("/api/v1/events?after=4", headers=auth_headers)
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize("query", ["after=-1", "limit=0", "limit=10001"])
+def test_feed_rejects_bad_parameters(client, auth_headers, events, query):
+    """Test invalid cursors and page sizes"""
+    response = client.get(f"/api/v1/events?{query}", headers=auth_headers)
+    assert response.status_code == 400
+
+
+def test_feed_shows_only_the_callers_events(client, auth_headers, events):
+    """Test another user's events stay out of the caller's feed"""
+    other = SubscriptionService.create_subscription(2, 1)
+    response = client.get("/api/v1/events?after=4", headers=auth_headers)
+    assert response.get_json()["data"]["events"] == []
+
+    token = create_access_token(identity="2")
+    response = client.get(
+        "/api/v1/events", headers={"Authorization": f"Bearer {token}"}
+    )
+    page = response.get_json()["data"]
+    assert [event["data"]["subscription_id"] for event in page["events"]] == [other.id]
+    assert page["next_after"] == 5
+
+
+def test_compaction_only_breaks_cursors_that_lost_events(client, auth_headers, events):
+    """Test compacting one user's events leaves other users' cursors valid"""
+    EventService.compact(timedelta(seconds=-60))
+    SubscriptionService.create_subscription(1, 1)
+    token = create_access_token(identity="2")
+    for after in (0, 3):
+        response = client.get(
+            f"/api/v1/events?after={after}",
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code == 200
+        assert response.get_json()["data"]["events"] == []
+
+    # a fresh reader starts from the oldest event kept
+    response = client.get("/api/v1/events", headers=auth_headers)
+    assert [event["id"] for event in response.get_json()["data"]["events"]] == [5]
+
+
+def test_service_token_reads_every_users_events(client, events):
+    """Test a service token gets the unfiltered feed"""
+    other = SubscriptionService.create_subscription(2, 1)
+    token = create_service_token(1)
+    response = client.get(
+        "/api/v1/events?after=4", headers={"Authorization": f"Bearer {token}"}
+    )
+    page = response.get_json()["data"]
+    assert [event["data"]["subscription_id"] for event in page["events"]] == [other.id]
+    assert page["events"][0]["data"]["user_id"] == 2
+
+
+def test_feed_requires_token(client):
+    """Test the feed is not public"""
+    assert client.get("/api/v1/events").status_code == 401
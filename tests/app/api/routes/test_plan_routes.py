@@ -6,9 +6,9 @@ import pytest
 
 
 @pytest.fixture
-def auth_headers():
+def auth_headers(users):
     """Fixture to return authentication headers"""
-    token = create_access_token("test@example.com")
+    token = create_access_token("1")
     return {"Authorization": f"Bearer {token}"}
 
 
@@ -110,6 +110,7 @@ def test_create_plan(client, auth_headers):
             description=plan_data["description"],
             price=plan_data["price"],
             duration_in_days=plan_data["duration_in_days"],
+            tier=0,
         )
 
 
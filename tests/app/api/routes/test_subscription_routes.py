@@ -1,13 +1,18 @@
+import gzip
+import json
 import pytest
 from datetime import datetime, timedelta, timezone
 from unittest.mock import patch
 from flask_jwt_extended import create_access_token
+from sqlalchemy import func
+from app.extensions import db
 from app.models.subscription_model import Subscription
 from app.models.plan_model import Plan
+from app.services.exceptions import SubscriptionNotOwnedError
 
 
 @pytest.fixture
-def auth_headers():
+def auth_headers(users):
     token = create_access_token(identity="1")
     return {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
 
@@ -89,11 +94,11 @@ def test_get_active_subscriptions(
                 "id": sample_subscription.id,
                 "user_id": sample_subscription.user_id,
                 "plan_id": sample_subscription.plan_id,
-                "start_date": sample_subscription.start_date,
-                "end_date": sample_subscription.end_date,
+                "start_date": sample_subscription.start_date.isoformat(),
+                "end_date": sample_subscription.end_date.isoformat(),
                 "is_active": sample_subscription.is_active,
                 "auto_renew": sample_subscription.auto_renew,
-                "created_at": datetime.now(timezone.utc),
+                "created_at": datetime.now(timezone.utc).isoformat(),
                 "plan": {
                     "id": sample_plan.id,
                     "name": sample_plan.name,
@@ -143,7 +148,7 @@ def test_get_active_subscriptions_with_pagination(client, auth_headers):
         )
 
         assert response.status_code == 200
-        mock_get.assert_called_once_with("1", cursor, limit)
+        mock_get.assert_called_once_with(1, cursor, limit)
 
 
 def test_get_subscription_history(
@@ -156,11 +161,11 @@ def test_get_subscription_history(
                 "id": sample_subscription.id,
                 "user_id": sample_subscription.user_id,
                 "plan_id": sample_subscription.plan_id,
-                "start_date": sample_subscription.start_date,
-                "end_date": sample_subscription.end_date,
+                "start_date": sample_subscription.start_date.isoformat(),
+                "end_date": sample_subscription.end_date.isoformat(),
                 "is_active": sample_subscription.is_active,
                 "auto_renew": sample_subscription.auto_renew,
-                "created_at": datetime.now(timezone.utc),
+                "created_at": datetime.now(timezone.utc).isoformat(),
                 "plan": {
                     "id": sample_plan.id,
                     "name": sample_plan.name,
@@ -209,7 +214,7 @@ def test_get_subscription_history_with_pagination(client, auth_headers):
         )
 
         assert response.status_code == 200
-        mock_get.assert_called_once_with("1", cursor, limit)
+        mock_get.assert_called_once_with(1, cursor, limit)
 
 
 def test_upgrade_subscription_success(client, auth_headers, sample_subscription):
@@ -269,3 +274,209 @@ def test_cancel_subscription_success(client, auth_headers, sample_subscription):
         data = response.get_json()
         assert data["status"] == "success"
         assert "Subscription cancelled successfully" in data["data"]["message"]
+
+
+@pytest.fixture
+def stored_subscriptions(app, users):
+    db.session.add(
+        Plan(id=1, name="Pro", description="Pro plan", price=10, duration_in_days=30)
+    )
+    now = datetime(2025, 6, 1, 10, 0, 0)
+    db.session.add_all(
+        Subscription(
+            user_id=user_id,
+            plan_id=1,
+            start_date=now,
+            end_date=now + timedelta(days=30),
+            created_at=now + timedelta(minutes=i),
+        )
+        for i, user_id in enumerate([1, 1, 1, 2])
+    )
+    db.session.commit()
+
+
+def test_export_subscriptions_ndjson(client, auth_headers, stored_subscriptions):
+    """Test the export streams one JSON document per line for the user"""
+    response = client.get(
+        "/api/v1/subscriptions/export?direction=asc", headers=auth_headers
+    )
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.get_data().splitlines()]
+    assert [row["id"] for row in rows] == [1, 2, 3]
+    assert rows[0]["plan"]["name"] == "Pro"
+
+
+def test_export_subscriptions_gzip(client, auth_headers, stored_subscriptions):
+    """Test the export can be gzipped on the fly"""
+    response = client.get(
+        "/api/v1/subscriptions/export?gzip=true", headers=auth_headers
+    )
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    lines = gzip.decompress(response.get_data()).splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [3, 2, 1]
+
+
+def test_export_subscriptions_invalid_ordering(client, auth_headers):
+    response = client.get(
+        "/api/v1/subscriptions/export?order_by=plan_id", headers=auth_headers
+    )
+    assert response.status_code == 400
+
+
+def stamp(subscription_ids, updated_at):
+    """Set updated_at as a commit would; older values simulate time passing"""
+    subscriptions = Subscription.__table__
+    db.session.execute(
+        subscriptions.update()
+        .where(subscriptions.c.id.in_(subscription_ids))
+        .values(updated_at=updated_at)
+    )
+    db.session.commit()
+
+
+def sync(client, headers, since=None, limit=100):
+    query = f"?limit={limit}" + (f"&since={since}" if since else "")
+    response = client.get(f"/api/v1/subscriptions/changes{query}", headers=headers)
+    assert response.status_code == 200
+    return response.get_json()["data"]
+
+
+def test_subscription_changes_sync(client, auth_headers, stored_subscriptions):
+    """Test syncing pages through changes, then picks up a cancellation"""
+    stamp([1, 2, 3], datetime(2025, 6, 1))
+
+    page = sync(client, auth_headers, limit=2)
+    assert [row["id"] for row in page["subscriptions"]] == [1, 2]
+    assert page["tombstones"] == [] and page["has_more"] is True
+
+    page = sync(client, auth_headers, page["next_since"])
+    assert [row["id"] for row in page["subscriptions"]] == [3]
+    assert page["has_more"] is False
+    since = page["next_since"]
+
+    client.put("/api/v1/subscriptions/2/cancel", headers=auth_headers)
+    assert sync(client, auth_headers, since)["tombstones"] == []
+    stamp([2], datetime(2025, 6, 2))
+    page = sync(client, auth_headers, since)
+    assert page["subscriptions"] == [] and page["tombstones"] == [2]
+    since = page["next_since"]
+
+    page = sync(client, auth_headers, since)
+    assert page["subscriptions"] == page["tombstones"] == []
+    assert page["next_since"] == since
+
+
+def test_subscription_changes_wait_for_late_commits(
+    client, auth_headers, stored_subscriptions
+):
+    """
+    Test a row committed late within the same second as a lower-id change
+    is still synced: the token doesn't pass a second until it has settled
+    """
+    stamp([1], datetime(2025, 6, 1))
+    stamp([3], func.current_timestamp())
+    page = sync(client, auth_headers)
+    assert [row["id"] for row in page["subscriptions"]] == [1]
+    since = page["next_since"]
+
+    # subscription 2 commits late, stamped with the same second
+    stamp([2], func.current_timestamp())
+    stamp([2, 3], datetime(2025, 6, 2))
+    page = sync(client, auth_headers, since)
+    assert [row["id"] for row in page["subscriptions"]] == [2, 3]
+
+
+def test_subscription_changes_invalid_token(client, auth_headers):
+    response = client.get(
+        "/api/v1/subscriptions/changes?since=not-a-token", headers=auth_headers
+    )
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def bulk_fixtures(app, users):
+    db.session.add(
+        Plan(id=1, name="Pro", description="Pro plan", price=10, duration_in_days=30)
+    )
+    db.session.commit()
+
+
+def test_bulk_create_subscriptions(client, auth_headers, bulk_fixtures):
+    items = [
+        {"user_id": 1, "plan_id": 1},
+        {"plan_id": 1, "auto_renew": False},
+    ]
+    response = client.post(
+        "/api/v1/subscriptions/bulk",
+        json={"subscriptions": items},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 201
+    data = response.get_json()["data"]
+    assert data["created"] == 2
+    ids = [item["subscription_id"] for item in data["results"]]
+    subscriptions = [db.session.get(Subscription, i) for i in ids]
+    assert [s.user_id for s in subscriptions] == [1, 1]
+    assert [s.auto_renew for s in subscriptions] == [True, False]
+    assert subscriptions[0].end_date - subscriptions[0].start_date == timedelta(days=30)
+
+
+def test_bulk_create_atomic_failure(client, auth_headers, bulk_fixtures):
+    items = [{"user_id": 1, "plan_id": 1}, {"user_id": 1, "plan_id": 99}]
+    response = client.post(
+        "/api/v1/subscriptions/bulk",
+        json={"subscriptions": items},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 400
+    errors = response.get_json()["errors"]
+    assert errors == [
+        {
+            "index": 1,
+            "status": "error",
+            "error": "Invalid or inactive subscription plan",
+        }
+    ]
+    assert Subscription.query.count() == 0
+
+
+def test_bulk_create_partial_failure(client, auth_headers, bulk_fixtures):
+    items = [
+        {"user_id": 1, "plan_id": 1},
+        {"user_id": 2, "plan_id": 1},
+        {"user_id": 1, "plan_id": True},
+    ]
+    response = client.post(
+        "/api/v1/subscriptions/bulk",
+        json={"subscriptions": items, "atomic": False},
+        headers=auth_headers,
+    )
+
+    assert response.status_code == 207
+    results = response.get_json()["data"]["results"]
+    assert results[0]["status"] == "created"
+    assert results[1] == {
+        "index": 1,
+        "status": "error",
+        "error": "Cannot create subscriptions for another user",
+    }
+    assert results[2]["error"] == "Plan ID is required"
+    assert Subscription.query.count() == 1
+
+
+def test_cancel_subscription_not_owned(client, auth_headers):
+    """Test cancelling another user's subscription is forbidden"""
+    with patch(
+        "app.services.subscription_service.SubscriptionService.cancel_subscription"
+    ) as mock_cancel:
+        mock_cancel.side_effect = SubscriptionNotOwnedError()
+
+        response = client.put("/api/v1/subscriptions/1/cancel", headers=auth_headers)
+
+        assert response.status_code == 403
+        mock_cancel.assert_called_once_with(1, 1)
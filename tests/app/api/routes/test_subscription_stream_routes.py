@@ -0,0 +1,111 @@
+import json
+import pytest
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.models.plan_model import Plan
+from app.services.subscription_service import SubscriptionService
+from app.services.subscription_stream import subscription_stream
+
+
+@pytest.fixture
+def auth_headers(users):
+    token = create_access_token(identity="1")
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def streams(app, users):
+    """Stream state with a short heartbeat, and a plan to subscribe to"""
+    state = app.extensions["subscription_stream"]
+    state.heartbeat_seconds = 0.01
+    db.session.add(
+        Plan(id=1, name="Pro", description="Pro", price=10, duration_in_days=30)
+    )
+    db.session.commit()
+    return state
+
+
+def open_stream(client, headers):
+    response = client.get(
+        "/api/v1/subscriptions/stream", headers=headers, buffered=False
+    )
+    return response, iter(response.response)
+
+
+def parse(chunk):
+    """(id, event, data) of each event in a chunk"""
+    events = []
+    for block in chunk.decode().strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((int(fields["id"]), fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_stream_pushes_committed_changes(client, auth_headers, streams):
+    """Test the caller's writes arrive as events, with heartbeats in between"""
+    response, chunks = open_stream(client, auth_headers)
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert "Content-Encoding" not in response.headers
+    assert next(chunks) == b"retry: 3000\n\n"
+    assert next(chunks) == b": heartbeat\n\n"
+    assert subscription_stream.stats()["connections"] == 1
+
+    subscription = SubscriptionService.create_subscription(1, 1)
+    SubscriptionService.cancel_subscription(subscription.id, 1)
+    SubscriptionService.create_subscription(2, 1)
+    events = parse(next(chunks))
+    assert [event for _, event, _ in events] == [
+        "subscription.created",
+        "subscription.cancelled",
+    ]
+    assert events[0][2]["subscription_id"] == subscription.id
+
+    response.close()
+    assert subscription_stream.stats()["connections"] == 0
+
+
+def test_stream_resumes_after_last_event_id(client, auth_headers, streams):
+    """Test reconnecting with Last-Event-ID replays what was missed"""
+    first = SubscriptionService.create_subscription(1, 1)
+    SubscriptionService.create_subscription(2, 1)
+    second = SubscriptionService.create_subscription(1, 1)
+
+    response, chunks = open_stream(client, {**auth_headers, "Last-Event-ID": "1"})
+    next(chunks)
+    events = parse(next(chunks))
+    assert [data["subscription_id"] for _, _, data in events] == [second.id]
+    assert events[0][0] == 3
+    assert first.id < second.id
+    response.close()
+
+
+def test_slow_reader_catches_up_from_the_outbox(client, auth_headers, streams):
+    """Test a full buffer is dropped and its events are replayed instead"""
+    streams.max_queued = 2
+    response, chunks = open_stream(client, auth_headers)
+    next(chunks)
+    created = [SubscriptionService.create_subscription(1, 1) for _ in range(5)]
+
+    events = parse(next(chunks))
+    assert [data["subscription_id"] for _, _, data in events] == [
+        subscription.id for subscription in created
+    ]
+    assert subscription_stream.stats()["overflows"] == 1
+    response.close()
+
+
+def test_stream_limits(client, auth_headers, streams):
+    """Test bad resume ids, the connection limit and anonymous callers"""
+    response = client.get(
+        "/api/v1/subscriptions/stream",
+        headers={**auth_headers, "Last-Event-ID": "abc"},
+    )
+    assert response.status_code == 400
+
+    streams.max_connections = 0
+    response = client.get("/api/v1/subscriptions/stream", headers=auth_headers)
+    assert response.status_code == 503
+    assert subscription_stream.stats()["rejected"] == 1
+
+    assert client.get("/api/v1/subscriptions/stream").status_code == 401
@@ -0,0 +1,171 @@
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import event, select
+from app.extensions import db
+from app.models.entitlement_model import Entitlement
+from app.models.plan_model import Plan
+from app.models.subscription_model import Subscription
+from app.services.entitlement_cache import EntitlementSnapshot, entitlement_cache
+from app.services.entitlement_service import EntitlementService
+from app.services.exceptions import InvalidPlanError
+from app.services.expiry_service import ExpiryService
+from app.services.subscription_service import SubscriptionService
+from scripts.seed_db import generate_data
+
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def plans(app, users):
+    """Plans of tiers 0-3, with a yearly plan sharing tier 1"""
+    db.session.add_all(
+        [
+            Plan(id=1, name="Free", description="Free", price=0, duration_in_days=30),
+            Plan(
+                id=2,
+                name="Basic",
+                description="Basic",
+                price=5,
+                duration_in_days=30,
+                tier=1,
+            ),
+            Plan(
+                id=3,
+                name="Basic Annual",
+                description="Basic, yearly",
+                price=50,
+                duration_in_days=365,
+                tier=1,
+            ),
+            Plan(
+                id=4,
+                name="Pro",
+                description="Pro",
+                price=10,
+                duration_in_days=30,
+                tier=2,
+            ),
+            Plan(
+                id=5,
+                name="Enterprise",
+                description="Enterprise",
+                price=20,
+                duration_in_days=30,
+                tier=3,
+            ),
+        ]
+    )
+    db.session.commit()
+
+
+def entitlement(user_id):
+    db.session.expire_all()
+    row = db.session.get(Entitlement, user_id)
+    return (row.plan_id, row.tier) if row else None
+
+
+def test_writes_maintain_entitlement(app, plans):
+    """Test create, upgrade, cancel and expiry each keep the row current"""
+    basic = SubscriptionService.create_subscription("1", 2)
+    assert entitlement(1) == (2, 1)
+    pro = SubscriptionService.create_subscription("1", 4)
+    assert entitlement(1) == (4, 2)
+    assert entitlement(2) is None
+
+    SubscriptionService.cancel_subscription(pro.id, "1")
+    assert entitlement(1) == (2, 1)
+    SubscriptionService.upgrade_subscription(basic.id, 5, "1")
+    assert entitlement(1) == (5, 3)
+
+    subscription = db.session.get(Subscription, basic.id)
+    subscription.auto_renew = False
+    subscription.end_date = NOW - timedelta(days=1)
+    db.session.commit()
+    assert ExpiryService.expire_lapsed_subscriptions(NOW) == 1
+    assert entitlement(1) is None
+
+
+def test_bulk_create_maintains_entitlements(app, plans):
+    """Test bulk creation writes one row per user, for their best plan"""
+    result = SubscriptionService.create_subscriptions_bulk(
+        [
+            {"user_id": 1, "plan_id": 3},
+            {"user_id": 1, "plan_id": 1},
+            {"user_id": 2, "plan_id": 4},
+        ]
+    )
+    assert result["created"] == 3
+    assert entitlement(1) == (3, 1)
+    assert entitlement(2) == (4, 2)
+
+
+def test_check_by_tier(app, plans):
+    """Test a plan entitles to its tier and below, whatever the period"""
+    SubscriptionService.create_subscription("1", 3)
+    assert EntitlementService.check([1, 2], 2) == {1: True, 2: False}
+    assert EntitlementService.check([1], 3) == {1: True}
+    assert EntitlementService.check([1], 1) == {1: True}
+    assert EntitlementService.check([1], 4) == {1: False}
+    with pytest.raises(InvalidPlanError):
+        EntitlementService.check([1], 99)
+
+
+def test_checks_served_from_cache_until_a_write(app, plans):
+    """Test repeated checks skip the database and a commit refreshes them"""
+    SubscriptionService.create_subscription("1", 2)
+    assert entitlement_cache.get_many([1, 2]) == {
+        1: EntitlementSnapshot(2, 1),
+        2: None,
+    }
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        for _ in range(3):
+            assert EntitlementService.check([1, 2], 2) == {1: True, 2: False}
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    assert statements == []
+
+    SubscriptionService.create_subscription("2", 5)
+    assert EntitlementService.check([1, 2], 5) == {1: False, 2: True}
+    stats = entitlement_cache.stats()
+    assert stats["invalidations"] == 1
+    assert stats["entries"] == 2 and stats["bytes"] > 0
+
+
+def test_rolled_back_refresh_keeps_cache(app, plans):
+    """Test a refresh that never commits leaves the cached entries alone"""
+    SubscriptionService.create_subscription("1", 2)
+    entitlement_cache.get_many([1])
+    db.session.add(Subscription(user_id=1, plan_id=5, end_date=NOW))
+    EntitlementService.refresh([1])
+    db.session.rollback()
+    assert entitlement_cache.stats()["invalidations"] == 0
+    assert entitlement(1) == (2, 1)
+
+
+def test_rebuild_matches_seeded_entitlements(app):
+    """Test a batched rebuild reproduces what seeding computed"""
+    generate_data(
+        db.engine, users=60, subscriptions_per_user=5, now=NOW, report=lambda _: None
+    )
+    query = select(Entitlement.user_id, Entitlement.plan_id, Entitlement.tier)
+    seeded = set(db.session.execute(query).all())
+    assert seeded
+
+    assert EntitlementService.rebuild(batch_size=16, now=NOW) == len(seeded)
+    assert set(db.session.execute(query).all()) == seeded
+
+    # the best active subscription of one user, worked out by hand
+    user_id = next(iter(seeded))[0]
+    best = max(
+        (plan.tier, subscription.end_date, subscription.id, plan.id)
+        for subscription, plan in db.session.execute(
+            select(Subscription, Plan)
+            .join(Plan)
+            .where(Subscription.user_id == user_id, Subscription.is_active)
+        )
+    )
+    assert (user_id, best[3], best[0]) in seeded
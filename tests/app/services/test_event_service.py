@@ -0,0 +1,139 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models.plan_model import Plan
+from app.services.event_service import (
+    SUBSCRIPTION_CANCELLED,
+    SUBSCRIPTION_CREATED,
+    SUBSCRIPTION_UPGRADED,
+    EventService,
+)
+from app.services.exceptions import EventsCompactedError, SubscriptionNotOwnedError
+from app.services.subscription_service import SubscriptionService
+
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def plans(app, users):
+    db.session.add_all(
+        Plan(
+            id=plan_id,
+            name=name,
+            description=name,
+            price=plan_id,
+            duration_in_days=30,
+            tier=plan_id,
+        )
+        for plan_id, name in ((1, "Basic"), (2, "Pro"))
+    )
+    db.session.commit()
+
+
+def record(count, now):
+    EventService.record(
+        SUBSCRIPTION_CREATED,
+        [{"subscription_id": i, "user_id": 1} for i in range(count)],
+        now,
+    )
+    db.session.commit()
+
+
+def feed(after=0, **kwargs):
+    events, has_more = EventService.get_events(after, **kwargs)
+    return [(row.event_type, json.loads(row.payload)) for row in events], has_more
+
+
+def test_lifecycle_writes_append_events(plans):
+    """Test create, upgrade and cancel each commit an event with the change"""
+    subscription = SubscriptionService.create_subscription(1, 1, auto_renew=False)
+    upgraded = SubscriptionService.upgrade_subscription(subscription.id, 2, 1)
+    SubscriptionService.cancel_subscription(subscription.id, 1)
+
+    events, has_more = feed()
+    assert [event_type for event_type, _ in events] == [
+        SUBSCRIPTION_CREATED,
+        SUBSCRIPTION_UPGRADED,
+        SUBSCRIPTION_CANCELLED,
+    ]
+    created, upgrade, cancel = (data for _, data in events)
+    assert created == {
+        "subscription_id": subscription.id,
+        "user_id": 1,
+        "plan_id": 1,
+        "start_date": created["start_date"],
+        "end_date": created["end_date"],
+        "auto_renew": False,
+        "is_active": True,
+    }
+    assert upgrade == {
+        "subscription_id": subscription.id,
+        "user_id": 1,
+        "plan_id": 2,
+        "end_date": upgraded.end_date.isoformat(),
+    }
+    assert cancel["is_active"] is False and cancel["auto_renew"] is False
+    assert has_more is False
+
+
+def test_rejected_and_bulk_writes(plans):
+    """Test refused writes record nothing and bulk creation one event per row"""
+    subscription = SubscriptionService.create_subscription(1, 1)
+    with pytest.raises(SubscriptionNotOwnedError):
+        SubscriptionService.cancel_subscription(subscription.id, 2)
+    result = SubscriptionService.create_subscriptions_bulk(
+        [{"user_id": 2, "plan_id": 2}, {"user_id": 1, "plan_id": 9}], atomic=False
+    )
+
+    events, _ = feed()
+    assert len(events) == 2
+    assert events[1] == (
+        SUBSCRIPTION_CREATED,
+        {
+            "user_id": 2,
+            "plan_id": 2,
+            "auto_renew": True,
+            "start_date": events[1][1]["start_date"],
+            "end_date": events[1][1]["end_date"],
+            "is_active": True,
+            "subscription_id": result["results"][0]["subscription_id"],
+        },
+    )
+
+
+def test_feed_pages_and_waits_for_events_to_settle(app):
+    """Test paging by cursor, stopping at the first event younger than the delay"""
+    record(3, NOW - timedelta(seconds=5))
+    record(1, NOW)
+    record(1, NOW - timedelta(seconds=5))
+
+    first, has_more = EventService.get_events(0, limit=2, settle_seconds=1, now=NOW)
+    assert len(first) == 2 and has_more is True
+    rest, has_more = EventService.get_events(
+        first[-1].id, limit=2, settle_seconds=1, now=NOW
+    )
+    # the last event is old enough, but the one before it is not
+    assert len(rest) == 1 and has_more is False
+
+    settled, _ = EventService.get_events(
+        rest[-1].id, settle_seconds=1, now=NOW + timedelta(seconds=1)
+    )
+    assert [row.id for row in settled] == [rest[-1].id + 1, rest[-1].id + 2]
+
+
+def test_compaction(app):
+    """Test old events are deleted, stale cursors refused and ids never reused"""
+    record(3, NOW - timedelta(days=10))
+    record(2, NOW - timedelta(days=1))
+
+    assert EventService.compact(timedelta(days=7), batch_size=2, now=NOW) == 3
+    with pytest.raises(EventsCompactedError):
+        EventService.get_events(2, now=NOW)
+    events, _ = EventService.get_events(3, now=NOW)
+    assert [row.id for row in events] == [4, 5]
+
+    assert EventService.compact(timedelta(0), now=NOW) == 2
+    record(1, NOW)
+    events, _ = EventService.get_events(5, now=NOW)
+    assert [row.id for row in events] == [6]
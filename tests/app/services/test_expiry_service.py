@@ -0,0 +1,105 @@
+import pytest
+from datetime import datetime, timedelta
+from app.extensions import db
+from app.models.plan_model import Plan
+from app.models.subscription_model import Subscription
+from app.services.subscription_service import SubscriptionService
+from app.services.expiry_service import ExpiryScheduler, ExpiryService
+
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def subscriptions(app, users):
+    db.session.add(
+        Plan(id=1, name="Monthly", description="Monthly", price=5, duration_in_days=30)
+    )
+
+    def add(end_date, auto_renew=False):
+        subscription = Subscription(
+            user_id=1,
+            plan_id=1,
+            start_date=end_date - timedelta(days=30),
+            end_date=end_date,
+            auto_renew=auto_renew,
+        )
+        db.session.add(subscription)
+        return subscription
+
+    subscriptions = {
+        "lapsed": add(NOW - timedelta(days=3)),
+        "renewing": add(NOW - timedelta(days=3), auto_renew=True),
+        "soon": add(NOW + timedelta(minutes=2)),
+        "later": add(NOW + timedelta(hours=2)),
+    }
+    db.session.commit()
+    return {name: subscription.id for name, subscription in subscriptions.items()}
+
+
+def is_active(subscription_id):
+    db.session.expire_all()
+    return db.session.get(Subscription, subscription_id).is_active
+
+
+def test_expire_lapsed_subscriptions(app, subscriptions):
+    assert ExpiryService.expire_lapsed_subscriptions(now=NOW, batch_size=1) == 1
+
+    assert is_active(subscriptions["lapsed"]) is False
+    assert is_active(subscriptions["renewing"]) is True
+    assert is_active(subscriptions["soon"]) is True
+
+
+def test_expire_auto_renewing_subscriptions_on_retired_plans(app, subscriptions):
+    """Test renewal skips a deactivated plan, so the sweep expires the row"""
+    db.session.get(Plan, 1).is_active = False
+    db.session.commit()
+
+    assert ExpiryService.expire_lapsed_subscriptions(now=NOW) == 2
+    assert is_active(subscriptions["renewing"]) is False
+    assert is_active(subscriptions["soon"]) is True
+    listed = SubscriptionService.get_active_subscriptions(1, limit=10)["data"]
+    assert [row["id"] for row in listed] == [
+        subscriptions["later"],
+        subscriptions["soon"],
+    ]
+
+
+def test_scheduler_expires_rows_on_plans_retired_after_the_sweep(app, subscriptions):
+    """Test a plan deactivated long after its subscriptions lapsed is swept"""
+    scheduler = ExpiryScheduler(app, sweep_interval=timedelta(minutes=5))
+    scheduler.tick(now=NOW)
+    assert is_active(subscriptions["renewing"]) is True
+
+    db.session.get(Plan, 1).is_active = False
+    db.session.commit()
+    # the renewing row lapsed days before this sweep's `since` bound
+    scheduler.tick(now=NOW + timedelta(minutes=6))
+    assert is_active(subscriptions["renewing"]) is False
+
+
+def test_scheduler_expires_subscriptions_as_they_lapse(app, subscriptions):
+    scheduler = ExpiryScheduler(app, horizon=timedelta(minutes=10))
+
+    # the first tick sweeps the backlog and loads the next window
+    assert scheduler.tick(now=NOW) == 1
+    assert scheduler.pending() == 1
+
+    assert scheduler.tick(now=NOW + timedelta(minutes=1)) == 0
+    assert is_active(subscriptions["soon"]) is True
+
+    assert scheduler.tick(now=NOW + timedelta(minutes=3)) == 1
+    assert is_active(subscriptions["soon"]) is False
+    assert is_active(subscriptions["later"]) is True
+    assert scheduler.pending() == 0
+
+
+def test_scheduler_skips_rows_extended_after_loading(app, subscriptions):
+    scheduler = ExpiryScheduler(app, horizon=timedelta(minutes=10))
+    scheduler.tick(now=NOW)
+
+    soon = db.session.get(Subscription, subscriptions["soon"])
+    soon.end_date = NOW + timedelta(days=30)
+    db.session.commit()
+
+    assert scheduler.tick(now=NOW + timedelta(minutes=3)) == 0
+    assert is_active(subscriptions["soon"]) is True
@@ -0,0 +1,105 @@
+import pytest
+import time
+from unittest.mock import patch
+from sqlalchemy import update
+from app.extensions import db
+from app.models.plan_model import Plan
+from app.schemas import plan_list_schema
+from app.services.exceptions import InvalidPlanError
+from app.services.plan_catalog import plan_catalog
+from app.services.plan_service import PlanService
+from app.services.subscription_service import SubscriptionService
+
+
+def test_catalog_counts_hits_and_misses(app):
+    """Test the catalog is loaded once and then served from memory"""
+    with app.app_context():
+        PlanService.create_plan("Basic", "Basic plan", 4.99, 30)
+
+        with patch.object(
+            PlanService, "get_all_active_plans", wraps=PlanService.get_all_active_plans
+        ) as mock_get_plans:
+            plan_catalog.list_body()
+            plan_catalog.list_body()
+            plan_catalog.get_plan(1)
+
+            mock_get_plans.assert_called_once()
+
+        stats = plan_catalog.stats()
+        assert stats["misses"] == 1
+        assert stats["hits"] == 2
+        assert stats["plans"] == 1
+
+
+def test_catalog_invalidated_on_plan_write(app):
+    """Test committed plan writes bump the catalog version"""
+    with app.app_context():
+        PlanService.create_plan("Basic", "Basic plan", 4.99, 30)
+        version = plan_catalog.version()
+        assert len(plan_catalog.snapshot().plans) == 1
+
+        plan = PlanService.create_plan("Pro", "Pro plan", 9.99, 30)
+        assert plan_catalog.version() == version + 1
+        assert len(plan_catalog.snapshot().plans) == 2
+
+        plan.is_active = False
+        db.session.commit()
+        assert plan_catalog.get_plan(plan.id) is None
+
+
+def test_catalog_expires_after_ttl(app, users):
+    """Test a plan deactivated by another process is refused once the TTL ends"""
+    with app.app_context():
+        plan = PlanService.create_plan("Basic", "Basic plan", 4.99, 30)
+        plan_catalog.snapshot()
+        # a write this process's commit hook never sees
+        db.session.execute(
+            update(Plan).where(Plan.id == plan.id).values(is_active=False)
+        )
+        db.session.commit()
+        assert plan_catalog.get_plan(plan.id) is not None
+
+        ttl = app.extensions["plan_catalog"].ttl_seconds
+        with patch(
+            "app.services.plan_catalog.time.monotonic",
+            return_value=time.monotonic() + ttl,
+        ):
+            assert plan_catalog.get_plan(plan.id) is None
+            with pytest.raises(InvalidPlanError):
+                SubscriptionService.create_subscription(1, plan.id)
+
+
+def test_catalog_body_matches_schema_output(client):
+    """Test the cached plan listing is identical to the schema path"""
+    plans = [
+        PlanService.create_plan("Basic", "Basic plan", 4.99, 30),
+        PlanService.create_plan("Pro", "Pro plan", 9.99, 30),
+    ]
+    expected = client.application.json.response(
+        {
+            "status": "success",
+            "message": "success",
+            "data": {"plans": plan_list_schema.dump(plans)},
+        }
+    ).get_data()
+
+    response = client.get("/api/v1/plans/")
+    assert response.status_code == 200
+    assert response.get_data() == expected
+
+    response = client.get(f"/api/v1/plans/{plans[1].id}")
+    assert response.status_code == 200
+    assert response.get_json()["data"]["plan"]["name"] == "Pro"
+
+
+def test_create_subscription_uses_catalog(app, users):
+    """Test subscription creation resolves the plan from the catalog"""
+    with app.app_context():
+        plan = PlanService.create_plan("Basic", "Basic plan", 4.99, 30)
+        plan_catalog.snapshot()
+
+        with patch("app.services.subscription_service.Plan.query") as mock_query:
+            subscription = SubscriptionService.create_subscription(1, plan.id)
+            mock_query.get.assert_not_called()
+
+        assert subscription.plan_id == plan.id
@@ -0,0 +1,483 @@
+"""
+Query-plan regression tests.
+
+Every service method is run against a seeded SQLite database and the
+`EXPLAIN QUERY PLAN` of each statement it issues is checked: large tables
+must never be scanned, and each table listed for the method must be searched
+through one of the expected indexes. A new service method needs a
+`PlanCase` below before the suite passes.
+"""
+
+import re
+import time
+import uuid
+from collections import namedtuple
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event, func, select
+
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models.subscription_model import Subscription
+from app.services.entitlement_service import EntitlementService
+from app.services.event_service import SUBSCRIPTION_CREATED, EventService
+from app.services.exceptions import EventsCompactedError
+from app.services.expiry_service import ExpiryService
+from app.services.renewal_service import RenewalService
+from app.services.subscription_service import SubscriptionService
+from app.services.token_service import TokenService
+from app.services.user_service import UserService
+from scripts.seed_db import generate_data
+
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+USERS = 2000
+SUBSCRIPTIONS_PER_USER = 20
+
+# tables too large to read in full on any request or job path
+NEVER_SCANNED = ("subscriptions", "users")
+
+PRIMARY_KEY = "INTEGER PRIMARY KEY"
+# unique columns are searched through SQLite's constraint index or ours
+USERNAME = ("sqlite_autoindex_users_1", "ix_users_username")
+EMAIL = ("sqlite_autoindex_users_2", "ix_users_email")
+JTI = "sqlite_autoindex_token_blocklist_1"
+CHECKPOINT_NAME = "sqlite_autoindex_job_checkpoints_1"
+# a user's active subscriptions, as the entitlement refresh reads them
+USER_ACTIVE = ("idx_subscription_user_active_end",)
+
+_PLAN_LINE = re.compile(
+    r"^(?P<op>SCAN|SEARCH) (?P<table>\w+)(?: AS \w+)?"
+    r"(?: USING (?:COVERING )?INDEX (?P<index>\w+)| USING (?P<pk>INTEGER PRIMARY KEY))?"
+)
+_EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE")
+
+
+def _explainable(statement):
+    statement = statement.lstrip().upper()
+    if statement.startswith("INSERT"):
+        # INSERT ... SELECT reads tables; plain INSERTs have no plan to check
+        return "SELECT" in statement
+    return statement.startswith(_EXPLAINABLE)
+
+
+# name: "Service.method"; run(data) calls it; indexes maps each table the
+# method must search to the indexes it may use
+PlanCase = namedtuple("PlanCase", ["name", "run", "indexes"])
+
+
+def _pages(fetch):
+    """Fetch the first page and the one after it, covering the keyset filter"""
+
+    def run(data):
+        page = fetch(data, None)
+        fetch(data, page["pagination"]["next_cursor"])
+
+    return run
+
+
+def _sync_changes(data):
+    changes = SubscriptionService.get_subscription_changes(data.user_id, limit=5)
+    SubscriptionService.get_subscription_changes(
+        data.user_id, changes["next_since"], limit=5
+    )
+
+
+def _token(data):
+    # unexpired in real time, so the revocation filter keeps it
+    issued_at = int(time.time())
+    return {
+        "jti": str(uuid.uuid4()),
+        "sub": data.user_id,
+        "iat": issued_at,
+        "exp": issued_at + 3600,
+    }
+
+
+def _record_events(data, now, count=1):
+    EventService.record(
+        SUBSCRIPTION_CREATED,
+        [{"subscription_id": data.subscription_id, "user_id": int(data.user_id)}]
+        * count,
+        now,
+    )
+    db.session.commit()
+
+
+def _read_events(data):
+    _record_events(data, NOW)
+    try:
+        EventService.get_events(0, limit=10, settle_seconds=1, now=NOW)
+        EventService.get_events(
+            0, limit=10, settle_seconds=1, now=NOW, user_id=int(data.user_id)
+        )
+    except EventsCompactedError:
+        # the compaction case may have run first; the feed was read anyway
+        pass
+
+
+def _compact_events(data):
+    _record_events(data, NOW - timedelta(days=30), count=3)
+    EventService.compact(timedelta(days=7), batch_size=2, now=NOW)
+
+
+def _revoke_and_check(data):
+    token = _token(data)
+    TokenService.revoke_token(token)
+    assert TokenService.is_revoked(token)
+
+
+CASES = (
+    PlanCase(
+        "SubscriptionService.get_active_subscriptions",
+        _pages(
+            lambda data, cursor: SubscriptionService.get_active_subscriptions(
+                data.user_id, cursor, limit=5
+            )
+        ),
+        {"subscriptions": ("idx_subscription_user_active_end",)},
+    ),
+    PlanCase(
+        "SubscriptionService.get_subscription_history",
+        _pages(
+            lambda data, cursor: SubscriptionService.get_subscription_history(
+                data.user_id, cursor, limit=5
+            )
+        ),
+        {"subscriptions": ("idx_subscription_user_created",)},
+    ),
+    PlanCase(
+        "SubscriptionService.get_subscription_changes",
+        _sync_changes,
+        {"subscriptions": ("idx_subscription_user_updated",)},
+    ),
+    PlanCase(
+        "SubscriptionService.iter_subscription_batches",
+        lambda data: list(
+            SubscriptionService.iter_subscription_batches(
+                user_id=data.user_id, batch_size=10
+            )
+        ),
+        {"subscriptions": ("idx_subscription_user_created",)},
+    ),
+    PlanCase(
+        "SubscriptionService.create_subscription",
+        lambda data: SubscriptionService.create_subscription(data.user_id, 1),
+        {"subscriptions": USER_ACTIVE},
+    ),
+    PlanCase(
+        "SubscriptionService.create_subscriptions_bulk",
+        lambda data: SubscriptionService.create_subscriptions_bulk(
+            [{"user_id": int(data.user_id), "plan_id": 1}] * 3
+        ),
+        {"users": (PRIMARY_KEY,), "subscriptions": USER_ACTIVE},
+    ),
+    PlanCase(
+        "SubscriptionService.upgrade_subscription",
+        lambda data: SubscriptionService.upgrade_subscription(
+            data.subscription_id, 2, data.user_id
+        ),
+        {"subscriptions": (PRIMARY_KEY,) + USER_ACTIVE},
+    ),
+    PlanCase(
+        "SubscriptionService.cancel_subscription",
+        lambda data: SubscriptionService.cancel_subscription(
+            data.subscription_id, data.user_id
+        ),
+        {"subscriptions": (PRIMARY_KEY,) + USER_ACTIVE},
+    ),
+    PlanCase(
+        "ExpiryService.expire_lapsed_subscriptions",
+        lambda data: ExpiryService.expire_lapsed_subscriptions(
+            NOW + timedelta(days=1), since=NOW - timedelta(days=1)
+        ),
+        {"subscriptions": ("idx_subscription_lapse", PRIMARY_KEY) + USER_ACTIVE},
+    ),
+    PlanCase(
+        "ExpiryService.upcoming_expiries",
+        lambda data: ExpiryService.upcoming_expiries(NOW, NOW + timedelta(hours=1)),
+        {"subscriptions": ("idx_subscription_lapse",)},
+    ),
+    PlanCase(
+        "ExpiryService.deactivate",
+        lambda data: ExpiryService.deactivate([data.subscription_id], NOW),
+        {"subscriptions": (PRIMARY_KEY,) + USER_ACTIVE},
+    ),
+    PlanCase(
+        "RenewalService.renew_expired_subscriptions",
+        lambda data: RenewalService.renew_expired_subscriptions(
+            NOW + timedelta(days=1), resume=False
+        ),
+        {"subscriptions": ("idx_subscription_lapse", PRIMARY_KEY)},
+    ),
+    PlanCase(
+        "UserService.create_user",
+        lambda data: UserService.create_user("planner", "planner@example.com", "pw"),
+        {},
+    ),
+    PlanCase(
+        "UserService.get_user_details_by_id",
+        lambda data: UserService.get_user_details_by_id(data.user_id),
+        {"users": (PRIMARY_KEY,)},
+    ),
+    PlanCase(
+        "UserService.get_user_identity",
+        lambda data: UserService.get_user_identity(data.user_id),
+        {"users": (PRIMARY_KEY,)},
+    ),
+    PlanCase(
+        "UserService.get_user_details_by_username",
+        lambda data: UserService.get_user_details_by_username(data.username),
+        {"users": USERNAME},
+    ),
+    PlanCase(
+        "UserService.user_exists",
+        lambda data: UserService.user_exists(data.username, "nobody@example.com"),
+        {"users": USERNAME + EMAIL},
+    ),
+    PlanCase(
+        "UserService.authenticate_user",
+        lambda data: UserService.authenticate_user(data.username, "password"),
+        {"users": USERNAME + (PRIMARY_KEY,)},
+    ),
+    PlanCase(
+        "UserService.deactivate_user",
+        # someone other than data.user_id, whom later cases need active
+        lambda data: UserService.deactivate_user(int(data.user_id) % USERS + 1),
+        {"users": (PRIMARY_KEY,)},
+    ),
+    PlanCase(
+        "EntitlementService.refresh",
+        lambda data: EntitlementService.refresh([data.user_id], NOW),
+        {
+            "users": (PRIMARY_KEY,),
+            "subscriptions": USER_ACTIVE,
+            "entitlements": (PRIMARY_KEY,),
+        },
+    ),
+    PlanCase(
+        "EntitlementService.rebuild",
+        # with statistics, a page that is a quarter of the seeded users is
+        # rightly deleted by a scan; real deployments page a far smaller share
+        lambda data: EntitlementService.rebuild(batch_size=100, now=NOW),
+        {
+            "users": (PRIMARY_KEY,),
+            "subscriptions": USER_ACTIVE,
+            "entitlements": (PRIMARY_KEY,),
+        },
+    ),
+    PlanCase(
+        "EntitlementService.get_entitlements",
+        lambda data: EntitlementService.get_entitlements([data.user_id, 1, 2]),
+        {"entitlements": (PRIMARY_KEY,)},
+    ),
+    PlanCase(
+        "EntitlementService.check",
+        lambda data: EntitlementService.check([int(data.user_id), 1, 2], 3),
+        {"entitlements": (PRIMARY_KEY,)},
+    ),
+    PlanCase("EventService.record", lambda data: _record_events(data, NOW), {}),
+    PlanCase(
+        "EventService.get_events",
+        _read_events,
+        {
+            "subscription_events": (PRIMARY_KEY, "idx_subscription_events_user"),
+            "job_checkpoints": (CHECKPOINT_NAME,),
+            "event_watermarks": (PRIMARY_KEY,),
+        },
+    ),
+    PlanCase(
+        "EventService.get_user_events",
+        lambda data: EventService.get_user_events(int(data.user_id), 0, limit=10),
+        {
+            "subscription_events": ("idx_subscription_events_user",),
+            "event_watermarks": (PRIMARY_KEY,),
+        },
+    ),
+    # max(id) reads the last entry of the primary key, which SQLite reports
+    # as a bare SEARCH
+    PlanCase(
+        "EventService.latest_event_id", lambda data: EventService.latest_event_id(), {}
+    ),
+    PlanCase(
+        "EventService.compact",
+        _compact_events,
+        {
+            # each user's newest compacted event comes from the covering
+            # (user_id, id) index
+            "subscription_events": (
+                "idx_subscription_events_created",
+                PRIMARY_KEY,
+                "idx_subscription_events_user",
+            ),
+            "job_checkpoints": (CHECKPOINT_NAME,),
+            "event_watermarks": (PRIMARY_KEY,),
+        },
+    ),
+    PlanCase(
+        "TokenService.revoke_token",
+        lambda data: TokenService.revoke_token(_token(data)),
+        {},
+    ),
+    PlanCase(
+        "TokenService.revoke_all_for_user",
+        lambda data: TokenService.revoke_all_for_user(data.user_id),
+        {},
+    ),
+    PlanCase(
+        "TokenService.is_revoked",
+        _revoke_and_check,
+        {
+            "token_blocklist": (
+                JTI,
+                "idx_token_blocklist_user_revoked",
+                "idx_token_blocklist_revoked",
+                "idx_token_blocklist_expires",
+            )
+        },
+    ),
+    PlanCase(
+        "TokenService.revocations_since",
+        lambda data: TokenService.revocations_since(NOW),
+        {"token_blocklist": ("idx_token_blocklist_revoked",)},
+    ),
+    PlanCase(
+        "TokenService.active_revocations",
+        lambda data: TokenService.active_revocations(NOW),
+        {"token_blocklist": ("idx_token_blocklist_expires",)},
+    ),
+    PlanCase(
+        "TokenService.purge_expired",
+        lambda data: TokenService.purge_expired(NOW - timedelta(days=1)),
+        {"token_blocklist": ("idx_token_blocklist_expires",)},
+    ),
+)
+
+SERVICES = (
+    SubscriptionService,
+    ExpiryService,
+    RenewalService,
+    UserService,
+    TokenService,
+    EntitlementService,
+    EventService,
+)
+
+
+@pytest.fixture(scope="module", params=["no_stats", "analyzed"])
+def seeded_app(request, tmp_path_factory):
+    """
+    App on a seeded SQLite file, with and without ANALYZE statistics so
+    plans hold whether or not the planner has sqlite_stat1 to go on.
+    """
+    path = tmp_path_factory.mktemp("plans") / "plans.db"
+    config = type(
+        "QueryPlanConfig",
+        (TestingConfig,),
+        {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{path}"},
+    )
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        generate_data(
+            db.engine,
+            users=USERS,
+            subscriptions_per_user=SUBSCRIPTIONS_PER_USER,
+            now=NOW,
+            report=lambda _: None,
+        )
+        if request.param == "analyzed":
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql("ANALYZE")
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def data(seeded_app):
+    """The heaviest user and one of their subscriptions"""
+    user_id, count = db.session.execute(
+        select(Subscription.user_id, func.count())
+        .group_by(Subscription.user_id)
+        .order_by(func.count().desc())
+        .limit(1)
+    ).one()
+    assert count > 10
+    subscription_id = db.session.scalar(
+        select(func.max(Subscription.id)).where(Subscription.user_id == user_id)
+    )
+    db.session.remove()
+    return SimpleNamespace(
+        user_id=str(user_id),
+        username=f"user{user_id}",
+        subscription_id=subscription_id,
+    )
+
+
+def capture_statements(run):
+    """Statements and parameters executed by `run()`, in order"""
+    statements = []
+
+    def before(conn, cursor, statement, parameters, context, executemany):
+        if executemany:
+            parameters = parameters[0] if parameters else ()
+        statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", before)
+    try:
+        run()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before)
+        db.session.remove()
+    return statements
+
+
+def query_plan(statement, parameters):
+    """(op, table, index) for every table access in the statement's plan"""
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql(
+            "EXPLAIN QUERY PLAN " + statement, parameters
+        ).fetchall()
+    accesses = []
+    for *_, detail in rows:
+        match = _PLAN_LINE.match(detail)
+        if match:
+            index = match.group("index") or match.group("pk")
+            accesses.append((match.group("op"), match.group("table"), index))
+    return accesses
+
+
+@pytest.mark.parametrize("case", CASES, ids=[case.name for case in CASES])
+def test_service_query_plan(seeded_app, data, case):
+    statements = capture_statements(lambda: case.run(data))
+    searched = set()
+    for statement, parameters in statements:
+        if not _explainable(statement):
+            continue
+        for op, table, index in query_plan(statement, parameters):
+            assert not (
+                op == "SCAN" and table in NEVER_SCANNED
+            ), f"{case.name} scans {table}:\n{statement}"
+            if table in case.indexes:
+                assert index in case.indexes[table], (
+                    f"{case.name} searches {table} using {index}, expected one of "
+                    f"{case.indexes[table]}:\n{statement}"
+                )
+                searched.add(table)
+    assert searched == set(
+        case.indexes
+    ), f"{case.name} never read {set(case.indexes) - searched}"
+
+
+def test_every_service_method_has_a_plan_case():
+    declared = {case.name for case in CASES}
+    methods = {
+        f"{service.__name__}.{name}"
+        for service in SERVICES
+        for name, member in vars(service).items()
+        if isinstance(member, staticmethod) and not name.startswith("_")
+    }
+    assert methods - declared == set()
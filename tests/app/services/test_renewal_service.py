@@ -0,0 +1,87 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from app.extensions import db
+from app.models.job_checkpoint_model import JobCheckpoint
+from app.models.plan_model import Plan
+from app.models.subscription_model import Subscription
+from app.services.renewal_service import RENEWAL_CHECKPOINT, RenewalService
+from app.utils.pagination import raw_value
+
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def lapsed_subscriptions(app, users):
+    db.session.add(
+        Plan(id=1, name="Monthly", description="Monthly", price=5, duration_in_days=30)
+    )
+
+    def add(end_date, **kwargs):
+        subscription = Subscription(
+            user_id=1,
+            plan_id=1,
+            start_date=end_date - timedelta(days=30),
+            end_date=end_date,
+            **kwargs,
+        )
+        db.session.add(subscription)
+        return subscription
+
+    subscriptions = {
+        "lapsed": add(NOW - timedelta(days=1)),
+        "lapsed_long_ago": add(NOW - timedelta(days=65)),
+        "not_renewing": add(NOW - timedelta(days=1), auto_renew=False),
+        "cancelled": add(NOW - timedelta(days=1), is_active=False),
+        "current": add(NOW + timedelta(days=10)),
+    }
+    db.session.commit()
+    return {name: subscription.id for name, subscription in subscriptions.items()}
+
+
+def end_date(subscription_id):
+    db.session.expire_all()
+    return db.session.get(Subscription, subscription_id).end_date
+
+
+def test_renews_lapsed_subscriptions(app, lapsed_subscriptions):
+    report = RenewalService.renew_expired_subscriptions(now=NOW, batch_size=1)
+
+    assert report["renewed"] == 2
+    assert report["batches"] == 2
+    assert end_date(lapsed_subscriptions["lapsed"]) == NOW + timedelta(days=29)
+    # missed periods are caught up in one pass
+    assert end_date(lapsed_subscriptions["lapsed_long_ago"]) == NOW + timedelta(days=25)
+    assert end_date(lapsed_subscriptions["not_renewing"]) < NOW
+    assert end_date(lapsed_subscriptions["cancelled"]) < NOW
+    assert end_date(lapsed_subscriptions["current"]) == NOW + timedelta(days=10)
+    assert db.session.get(JobCheckpoint, RENEWAL_CHECKPOINT) is None
+
+
+def test_dry_run_does_not_write(app, lapsed_subscriptions):
+    report = RenewalService.renew_expired_subscriptions(now=NOW, dry_run=True)
+
+    assert report["renewed"] == 2
+    assert end_date(lapsed_subscriptions["lapsed"]) < NOW
+
+
+def test_resumes_from_checkpoint(app, lapsed_subscriptions):
+    """Test an interrupted run skips rows before its checkpoint"""
+    long_ago_id = lapsed_subscriptions["lapsed_long_ago"]
+    # checkpoints hold the raw stored end_date of the last renewed row
+    stored_end_date = db.session.execute(
+        select(raw_value(Subscription.end_date)).where(Subscription.id == long_ago_id)
+    ).scalar()
+    db.session.add(
+        JobCheckpoint(
+            name=RENEWAL_CHECKPOINT,
+            position=json.dumps([stored_end_date, long_ago_id]),
+        )
+    )
+    db.session.commit()
+
+    report = RenewalService.renew_expired_subscriptions(now=NOW)
+
+    assert report["renewed"] == 1
+    assert end_date(lapsed_subscriptions["lapsed"]) == NOW + timedelta(days=29)
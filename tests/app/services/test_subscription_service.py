@@ -1,10 +1,18 @@
 import time
+import pytest
 from datetime import datetime, timezone, timedelta
 from unittest.mock import ANY, patch, MagicMock
+from app.services.exceptions import (
+    InvalidPlanError,
+    SubscriptionNotFoundError,
+    SubscriptionNotOwnedError,
+)
+from app.services.event_service import SUBSCRIPTION_CREATED
 from app.services.subscription_service import SubscriptionService
 from app.models.subscription_model import Subscription
 from app.models.plan_model import Plan
 from app.extensions import db
+from app.schemas import subscription_list_schema
 
 
 def test_create_subscription(app, client):
@@ -26,7 +34,11 @@ def test_create_subscription(app, client):
             "app.services.subscription_service.Subscription"
         ) as mock_sub_cls, patch(
             "app.services.subscription_service.db.session"
-        ) as mock_session:
+        ) as mock_session, patch(
+            "app.services.subscription_service.EntitlementService.refresh"
+        ) as mock_refresh, patch(
+            "app.services.subscription_service.EventService.record"
+        ) as mock_record:
             mock_plan_query.get.return_value = mock_plan
             mock_sub_cls.return_value = mock_sub
 
@@ -44,46 +56,100 @@ def test_create_subscription(app, client):
                 is_active=True,
             )
             mock_session.add.assert_called_once_with(mock_sub)
+            mock_refresh.assert_called_once_with(["user1"])
+            mock_record.assert_called_once_with(SUBSCRIPTION_CREATED, [ANY])
             mock_session.commit.assert_called_once()
             assert result == mock_sub
 
 
-def test_upgrade_subscription(app):
-    """Test subscription upgrade with app context"""
+@pytest.fixture
+def owned_subscription(app, users):
+    """Subscription 1 owned by user 1, with an active and an inactive plan"""
+    db.session.add_all(
+        [
+            Plan(id=1, name="Basic", description="Basic", price=5, duration_in_days=30),
+            Plan(id=2, name="Pro", description="Pro", price=10, duration_in_days=60),
+            Plan(
+                id=3,
+                name="Legacy",
+                description="Legacy",
+                price=1,
+                duration_in_days=30,
+                is_active=False,
+            ),
+        ]
+    )
+    db.session.add(
+        Subscription(
+            id=1,
+            user_id=1,
+            plan_id=1,
+            start_date=datetime(2025, 6, 1, 10, 0, 0),
+            end_date=datetime(2025, 7, 1, 10, 0, 0),
+            updated_at=datetime(2025, 6, 1, 10, 0, 0),
+        )
+    )
+    db.session.commit()
+
+
+def test_upgrade_subscription(app, owned_subscription):
+    """Test subscription upgrade extends the end date by the new plan"""
     with app.app_context():
-        mock_result = MagicMock()
-        mock_row = {"id": 1, "plan_id": 2}
-        mock_result.fetchone.return_value = mock_row
+        result = SubscriptionService.upgrade_subscription(1, 2, "1")
+
+        assert result.plan_id == 2
+        assert result.end_date == datetime(2025, 8, 30, 10, 0, 0)
 
-        with patch("app.services.subscription_service.text"), patch(
-            "app.services.subscription_service.db.session.execute"
-        ) as mock_execute:
-            mock_execute.return_value = mock_result
 
-            result = SubscriptionService.upgrade_subscription(1, 2)
+@pytest.mark.parametrize(
+    "subscription_id, new_plan_id, user_id, error",
+    [
+        (99, 2, "1", SubscriptionNotFoundError),
+        (1, 2, "2", SubscriptionNotOwnedError),
+        (1, 3, "1", InvalidPlanError),
+        (1, 99, "1", InvalidPlanError),
+    ],
+)
+def test_upgrade_subscription_misses(
+    app, owned_subscription, subscription_id, new_plan_id, user_id, error
+):
+    """Test upgrade misses are reported distinctly and change nothing"""
+    with app.app_context():
+        with pytest.raises(error):
+            SubscriptionService.upgrade_subscription(
+                subscription_id, new_plan_id, user_id
+            )
 
-            mock_execute.assert_called_once()
-            assert result == mock_row
+        db.session.expire_all()
+        subscription = db.session.get(Subscription, 1)
+        assert subscription.plan_id == 1
+        assert subscription.end_date == datetime(2025, 7, 1, 10, 0, 0)
+        assert subscription.updated_at == datetime(2025, 6, 1, 10, 0, 0)
 
 
-def test_cancel_subscription(app):
+def test_cancel_subscription(app, owned_subscription):
     """Test subscription cancellation"""
     with app.app_context():
-        mock_sub = MagicMock(spec=Subscription)
-        mock_sub.is_active = True
-        mock_sub.auto_renew = True
+        result = SubscriptionService.cancel_subscription(1, "1")
 
-        with patch(
-            "app.services.subscription_service.Subscription.query"
-        ) as mock_query, patch("app.services.subscription_service.db.session.commit"):
-            mock_query.get.return_value = mock_sub
+        assert result.id == 1
+        assert not result.is_active
+        assert not result.auto_renew
 
-            result = SubscriptionService.cancel_subscription(1)
 
-            mock_query.get.assert_called_once_with(1)
-            assert mock_sub.is_active is False
-            assert mock_sub.auto_renew is False
-            assert result == mock_sub
+def test_cancel_subscription_misses(app, owned_subscription):
+    """Test cancelling another user's subscription doesn't write its row"""
+    with app.app_context():
+        with pytest.raises(SubscriptionNotFoundError):
+            SubscriptionService.cancel_subscription(99, "1")
+        with pytest.raises(SubscriptionNotOwnedError):
+            SubscriptionService.cancel_subscription(1, "2")
+
+        db.session.expire_all()
+        subscription = db.session.get(Subscription, 1)
+        assert subscription.is_active is True
+        assert subscription.auto_renew is True
+        assert subscription.updated_at == datetime(2025, 6, 1, 10, 0, 0)
 
 
 def test_get_subscription_history(app):
@@ -130,15 +196,14 @@ def test_get_active_subscriptions(app):
                 limit=3,
                 cursor_field="end_date",
                 active_only=True,
-                future_only=True,
             )
             assert result == mock_result
 
 
-def test_fetch_subscriptions_performance(app):
+def test_fetch_subscriptions_performance(app, users):
     """Performance test for _fetch_subscriptions"""
     with app.app_context():
-        user_id = "test_user"
+        user_id = 1
 
         # Insert dummy data
         now = datetime.now(timezone.utc)
@@ -176,3 +241,28 @@ def test_fetch_subscriptions_performance(app):
 
         assert duration < 0.5, f"Query took too long: {duration}s"
         assert len(result["data"]) == 100
+
+
+def test_fetch_subscriptions_matches_schema_output(app, users):
+    """Test the fast listing serializer matches the marshmallow schema"""
+    with app.app_context():
+        now = datetime(2025, 6, 1, 10, 0, 0)
+        plan = Plan(
+            id=1, name="Pro", description="Pro plan", price=10, duration_in_days=30
+        )
+        db.session.add(plan)
+        db.session.add(
+            Subscription(
+                user_id=1,
+                plan_id=1,
+                start_date=now,
+                end_date=now + timedelta(days=30, microseconds=250),
+                created_at=now,
+            )
+        )
+        db.session.commit()
+
+        result = SubscriptionService._fetch_subscriptions(user_id=1)
+
+        subscription = db.session.get(Subscription, 1)
+        assert result["data"] == subscription_list_schema.dump([subscription])
@@ -0,0 +1,86 @@
+import pytest
+from datetime import timedelta
+from sqlalchemy import insert
+from app.extensions import db
+from app.models.subscription_event_model import SubscriptionEvent
+from app.services.event_service import SUBSCRIPTION_CREATED, EventService
+from app.services.subscription_stream import RESYNC_EVENT, subscription_stream
+from app.utils.clock import utcnow
+
+
+def record(user_id, subscription_id):
+    EventService.record(
+        SUBSCRIPTION_CREATED,
+        [{"subscription_id": subscription_id, "user_id": user_id}],
+    )
+
+
+@pytest.fixture
+def stream(app, users):
+    stream = subscription_stream.open(1)
+    yield stream
+    subscription_stream.close(stream)
+
+
+def test_events_are_published_on_commit(stream):
+    """Test only committed events reach the streams of their user"""
+    record(1, 10)
+    record(2, 20)
+    assert stream.take(0) == ([], False)
+    db.session.commit()
+    events, overflowed = stream.take(0)
+    assert [event.user_id for event in events] == [1] and not overflowed
+
+    record(1, 11)
+    db.session.rollback()
+    db.session.commit()
+    assert stream.take(0) == ([], False)
+
+
+def test_full_buffer_overflows(app, users):
+    """Test a stream keeps at most max_queued events, then flags the overflow"""
+    app.extensions["subscription_stream"].max_queued = 2
+    stream = subscription_stream.open(1)
+    for subscription_id in range(3):
+        record(1, subscription_id)
+    db.session.commit()
+    assert stream.take(0) == ([], True)
+    assert subscription_stream.stats()["overflows"] == 1
+    subscription_stream.close(stream)
+    subscription_stream.close(stream)
+    assert subscription_stream.stats()["connections"] == 0
+
+
+def test_poll_pushes_events_from_other_writers(app, stream):
+    """Test the tailer step delivers events committed without a local publish"""
+    app.extensions["subscription_stream"].settle_seconds = 0
+    db.session.execute(
+        insert(SubscriptionEvent),
+        [
+            {
+                "event_type": SUBSCRIPTION_CREATED,
+                "subscription_id": 10,
+                "user_id": 1,
+                "payload": "{}",
+                "created_at": utcnow(),
+            }
+        ],
+    )
+    db.session.commit()
+    subscription_stream.poll()
+    events, _ = stream.take(0)
+    assert [event.id for event in events] == [1]
+
+
+def test_replay_resyncs_after_compaction(stream):
+    """Test a resume point behind compacted events asks the client to resync"""
+    for subscription_id in range(3):
+        record(1, subscription_id)
+    db.session.commit()
+    stream.take(0)
+    EventService.compact(timedelta(seconds=-60))
+    messages = subscription_stream.messages(stream, last_event_id=1)
+    next(messages)
+    assert next(messages) == f"id: 3\nevent: {RESYNC_EVENT}\ndata: {{}}\n\n".encode()
+    messages.close()
+    assert subscription_stream.stats()["connections"] == 0
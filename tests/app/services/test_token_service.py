@@ -0,0 +1,152 @@
+import time
+from datetime import timedelta
+from flask_jwt_extended import create_access_token, decode_token
+from sqlalchemy import event, update
+from app.extensions import db
+from app.models.token_blocklist_model import RevokedToken
+from app.models.user_model import User
+from app.services.revocation_filter import revocation_filter
+from app.utils.clock import utcnow
+from app.services.token_service import TokenService
+from app.services.user_service import UserService
+
+
+def _auth(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _count_queries(run):
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        run()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+    return statements
+
+
+def _backdate_revocations(seconds=2):
+    """Move revocations into the past, as if the test had slept"""
+    db.session.execute(
+        update(RevokedToken).values(
+            revoked_at=RevokedToken.revoked_at - timedelta(seconds=seconds)
+        )
+    )
+    db.session.commit()
+
+
+def test_unrevoked_token_checked_without_query(client, users):
+    """Test a filter miss settles the check without touching the blocklist"""
+    headers = _auth(create_access_token(identity="1"))
+    assert (
+        client.get("/api/v1/subscriptions/active", headers=headers).status_code == 200
+    )
+
+    token = decode_token(create_access_token(identity="1"))
+    statements = _count_queries(lambda: TokenService.is_revoked(token))
+    assert statements == []
+    assert revocation_filter.stats()["filtered"] >= 2
+
+
+def test_logout_revokes_only_that_token(client, users):
+    """Test logout rejects the token it was called with and nothing else"""
+    token, other = create_access_token(identity="1"), create_access_token(identity="1")
+    response = client.post("/api/v1/users/logout", headers=_auth(token))
+    assert response.status_code == 200
+
+    response = client.get("/api/v1/subscriptions/active", headers=_auth(token))
+    assert response.status_code == 401
+    assert response.get_json()["msg"] == "Token has been revoked"
+    assert (
+        client.get("/api/v1/subscriptions/active", headers=_auth(other)).status_code
+        == 200
+    )
+    assert db.session.scalar(db.select(RevokedToken.jti)) == decode_token(token)["jti"]
+
+
+def test_logout_all_revokes_earlier_tokens(client, users):
+    """Test logout-all rejects the user's earlier tokens but not later ones"""
+    first, second = create_access_token(identity="1"), create_access_token(identity="1")
+    bystander = create_access_token(identity="2")
+    assert client.post(
+        "/api/v1/users/logout-all", headers=_auth(first)
+    ).status_code == (200)
+
+    for token in (first, second):
+        response = client.get("/api/v1/subscriptions/active", headers=_auth(token))
+        assert response.status_code == 401
+    response = client.get("/api/v1/subscriptions/active", headers=_auth(bystander))
+    assert response.status_code == 200
+
+    _backdate_revocations()
+    later, logged_out = create_access_token(identity="1"), create_access_token(
+        identity="1"
+    )
+    assert client.post(
+        "/api/v1/users/logout", headers=_auth(logged_out)
+    ).status_code == (200)
+    # a later single-token logout is not mistaken for another revoke-all
+    response = client.get("/api/v1/subscriptions/active", headers=_auth(later))
+    assert response.status_code == 200
+    assert revocation_filter.stats()["false_positives"] == 2
+
+
+def test_deactivate_user_revokes_tokens(client, users):
+    """Test deactivating a user revokes their tokens in the same commit"""
+    token = create_access_token(identity="1")
+    assert UserService.deactivate_user(1) is True
+    assert UserService.deactivate_user(1) is False
+    assert db.session.get(User, 1).is_active is False
+
+    response = client.get("/api/v1/subscriptions/active", headers=_auth(token))
+    assert response.status_code == 401
+
+
+def test_refresh_picks_up_other_processes_revocations(app, users):
+    """Test rows written elsewhere are seen after the refresh interval"""
+    token = decode_token(create_access_token(identity="1"))
+    assert TokenService.is_revoked(token) is False
+
+    db.session.add(
+        RevokedToken(
+            jti=token["jti"],
+            user_id=1,
+            revoked_at=utcnow(),
+            expires_at=utcnow() + timedelta(hours=1),
+        )
+    )
+    db.session.commit()
+    assert TokenService.is_revoked(token) is False
+
+    app.extensions["revocation_filter"].refreshed_at = time.monotonic() - 60
+    assert TokenService.is_revoked(token) is True
+
+
+def test_purge_expired_and_rebuild(app, users):
+    """Test purging drops expired rows and a rebuild drops their keys"""
+    now = utcnow()
+    db.session.add_all(
+        [
+            RevokedToken(
+                jti="expired",
+                user_id=1,
+                revoked_at=now - timedelta(hours=2),
+                expires_at=now - timedelta(hours=1),
+            ),
+            RevokedToken(
+                jti="live",
+                user_id=1,
+                revoked_at=now,
+                expires_at=now + timedelta(hours=1),
+            ),
+        ]
+    )
+    db.session.commit()
+
+    assert TokenService.purge_expired() == 1
+    assert db.session.scalars(db.select(RevokedToken.jti)).all() == ["live"]
+
+    revocation_filter.rebuild()
+    assert revocation_filter.might_be_revoked("live", 2) == (True, False)
+    assert revocation_filter.stats()["keys"] == 1
@@ -0,0 +1,104 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+from app.extensions import db
+from app.models.user_model import User
+from app.services.user_cache import UserSnapshot, user_cache
+
+
+def _auth(user_id):
+    return {"Authorization": f"Bearer {create_access_token(identity=str(user_id))}"}
+
+
+@pytest.fixture
+def user_queries(app):
+    """SELECTs against users issued while the test runs"""
+    statements = []
+
+    def before(conn, cursor, statement, *args):
+        if "FROM users" in statement:
+            statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before)
+    yield statements
+    event.remove(db.engine, "before_cursor_execute", before)
+
+
+def test_protected_routes_resolve_user_from_cache(client, users, user_queries):
+    """Test the token's user is loaded once, then served from memory"""
+    for _ in range(3):
+        response = client.get("/api/v1/subscriptions/active", headers=_auth(1))
+        assert response.status_code == 200
+    assert len(user_queries) == 1
+
+    snapshot = user_cache.get(1)
+    assert isinstance(snapshot, UserSnapshot)
+    assert (snapshot.id, snapshot.username, snapshot.is_active) == (1, "user1", True)
+    stats = user_cache.stats()
+    assert stats["hits"] == 3 and stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.75
+    assert stats["entries"] == 1 and stats["bytes"] > 0
+
+
+def test_deactivated_user_rejected_without_query(client, users, user_queries):
+    """Test a committed deactivation drops the entry and later rejects cheaply"""
+    headers = _auth(1)
+    assert client.get("/api/v1/subscriptions/active", headers=headers).status_code == (
+        200
+    )
+    user = db.session.get(User, 1)
+    user.is_active = False
+    db.session.commit()
+    assert user_cache.stats()["invalidations"] == 1
+
+    user_queries.clear()
+    for _ in range(3):
+        response = client.get("/api/v1/subscriptions/active", headers=headers)
+        assert response.status_code == 401
+    assert len(user_queries) == 1
+    assert client.get("/api/v1/users/1").status_code == 404
+    assert len(user_queries) == 1
+
+
+def test_unknown_user_rejected(client, users):
+    """Test tokens for users that don't exist, or non-numeric subjects, get 401"""
+    assert client.get(
+        "/api/v1/subscriptions/active", headers=_auth(99)
+    ).status_code == (401)
+    headers = _auth("test@example.com")
+    assert client.get("/api/v1/subscriptions/active", headers=headers).status_code == (
+        401
+    )
+
+
+def test_updates_invalidate_entry(app, users):
+    """Test a committed update is visible on the next lookup"""
+    assert user_cache.get(1).email == "u1@x.io"
+    db.session.get(User, 1).email = "new@x.io"
+    db.session.commit()
+    assert user_cache.get(1).email == "new@x.io"
+
+    db.session.get(User, 1).email = "rolled@x.io"
+    db.session.rollback()
+    assert user_cache.get(1).email == "new@x.io"
+    assert user_cache.stats()["hits"] == 1
+
+
+def test_bounded_by_entries_and_ttl(app, users):
+    """Test the least recently used user is evicted and entries expire"""
+    cache = app.extensions["user_cache"]
+    cache.max_entries = 1
+    user_cache.get(1)
+    user_cache.get(2)
+    stats = user_cache.stats()
+    assert stats["entries"] == 1 and stats["evictions"] == 1
+    assert list(cache.entries) == [2]
+
+    cache.ttl_seconds = 0
+    user_cache.get(1)
+    user_cache.get(1)
+    assert user_cache.stats()["misses"] == 4
+
+    user_cache.invalidate()
+    assert user_cache.stats()["entries"] == 0
+    assert user_cache.stats()["bytes"] == 0
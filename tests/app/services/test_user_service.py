@@ -0,0 +1,95 @@
+import threading
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+from app.extensions import db
+from app.models.user_model import User
+from app.services.exceptions import PasswordHashingBusyError
+from app.services.user_service import UserService
+from app.utils.passwords import password_hasher
+
+FAST_METHOD = "pbkdf2:sha256:1000"
+
+
+@pytest.fixture
+def fast_hashing(app):
+    """Cheap hashes so the tests don't pay for production parameters"""
+    state = app.extensions["password_hasher"]
+    state.method = FAST_METHOD
+    return state
+
+
+def test_authenticate_user_is_one_query(app, fast_hashing):
+    """Test login loads the user once and verifies on the hashing pool"""
+    UserService.create_user("alice", "alice@example.com", "secret")
+    db.session.remove()
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(db.engine, "before_cursor_execute", listener)
+    try:
+        user = UserService.authenticate_user("alice", "secret")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", listener)
+
+    assert user.username == "alice"
+    assert len(statements) == 1
+    assert UserService.authenticate_user("alice", "wrong") is None
+    assert UserService.authenticate_user("nobody", "secret") is None
+    assert password_hasher.stats()["completed"] >= 3
+
+
+def test_outdated_hash_upgraded_on_login(app, fast_hashing):
+    """Test a hash made with old parameters is replaced after a good login"""
+    db.session.add(
+        User(
+            username="bob",
+            email="bob@example.com",
+            pass_hash=generate_password_hash("secret", "pbkdf2:sha256:500"),
+        )
+    )
+    db.session.commit()
+
+    assert UserService.authenticate_user("bob", "wrong") is None
+    assert db.session.scalar(db.select(User.pass_hash)).startswith("pbkdf2:sha256:500$")
+
+    assert UserService.authenticate_user("bob", "secret").username == "bob"
+    db.session.expire_all()
+    pass_hash = db.session.scalar(db.select(User.pass_hash))
+    assert pass_hash.startswith(FAST_METHOD + "$")
+    assert password_hasher.stats()["rehashed"] == 1
+    assert UserService.authenticate_user("bob", "secret") is not None
+    assert password_hasher.stats()["rehashed"] == 1
+
+
+def test_hashing_queue_is_bounded(client, fast_hashing):
+    """Test logins past the queue limit fail fast with a 503"""
+    UserService.create_user("alice", "alice@example.com", "secret")
+    # every worker and queue slot taken
+    fast_hashing.slots = threading.BoundedSemaphore(1)
+    fast_hashing.slots.acquire()
+
+    with pytest.raises(PasswordHashingBusyError):
+        password_hasher.hash("secret")
+    response = client.post(
+        "/api/v1/users/login", json={"username": "alice", "password": "secret"}
+    )
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert password_hasher.stats()["rejected"] == 2
+
+
+def test_hashing_runs_on_the_pool(app, fast_hashing):
+    """Test hashes are computed on pool threads, not the caller's"""
+    threads = []
+    original = fast_hashing.executor.submit
+
+    def submit(func, *args):
+        return original(
+            lambda: threads.append(threading.current_thread().name) or func(*args)
+        )
+
+    fast_hashing.executor.submit = submit
+    password_hasher.hash("secret")
+    assert threads[0].startswith("password-hash")
@@ -0,0 +1,25 @@
+from app.utils.bloom import BloomFilter
+
+
+def test_no_false_negatives():
+    bloom = BloomFilter(1000)
+    keys = [f"jti:{i}" for i in range(1000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    assert bloom.count == 1000
+
+
+def test_false_positive_rate_near_target():
+    bloom = BloomFilter(5000, error_rate=0.01)
+    for i in range(5000):
+        bloom.add(f"present:{i}")
+    false_positives = sum(f"absent:{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02
+
+
+def test_sized_from_capacity_and_error_rate():
+    # about 14.4 bits and 10 hashes per key at 0.1%
+    bloom = BloomFilter(100000, error_rate=0.001)
+    assert 170000 < len(bloom.bits) < 190000
+    assert bloom.hashes == 10
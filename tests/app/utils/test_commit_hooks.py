@@ -0,0 +1,26 @@
+from app.extensions import db
+from app.utils.commit_hooks import defer, on_commit
+
+handled = []
+
+
+@on_commit("test_commit_hooks", extension="sqlalchemy")
+def _handle(items):
+    handled.append(items)
+
+
+def test_deferred_work_runs_once_on_commit(app):
+    """Test deferred items reach their handler on commit, and never on rollback"""
+    handled.clear()
+    defer(db.session, "test_commit_hooks", [1])
+    defer(db.session, "test_commit_hooks", [2])
+    assert handled == []
+    db.session.commit()
+    db.session.commit()
+    assert handled == [[1, 2]]
+
+    db.session.connection()
+    defer(db.session, "test_commit_hooks", [3])
+    db.session.rollback()
+    db.session.commit()
+    assert handled == [[1, 2]]
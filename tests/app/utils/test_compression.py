@@ -0,0 +1,116 @@
+import gzip
+import json
+import pytest
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.models.plan_model import Plan
+from app.models.subscription_model import Subscription
+from app.services.plan_service import PlanService
+from app.utils.compression import available_encodings, response_compression
+
+
+@pytest.fixture
+def auth_headers():
+    return {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+
+
+@pytest.fixture
+def history(app, users):
+    """Enough subscriptions for a full 100-item history page"""
+    db.session.add(
+        Plan(id=1, name="Pro", description="Pro plan", price=10, duration_in_days=30)
+    )
+    now = datetime(2025, 6, 1, 10, 0, 0)
+    db.session.add_all(
+        Subscription(
+            user_id=1,
+            plan_id=1,
+            start_date=now,
+            end_date=now + timedelta(days=30),
+            created_at=now + timedelta(minutes=i),
+        )
+        for i in range(100)
+    )
+    db.session.commit()
+
+
+def test_gzip_negotiated_for_large_responses(client, auth_headers, history):
+    """Test a history page is gzipped when the client accepts it"""
+    path = "/api/v1/subscriptions/history?limit=100"
+    plain = client.get(path, headers=auth_headers)
+    assert "Content-Encoding" not in plain.headers
+    assert plain.headers["Vary"] == "Accept-Encoding"
+
+    response = client.get(path, headers={**auth_headers, "Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.content_length < plain.content_length / 5
+    assert gzip.decompress(response.get_data()) == plain.get_data()
+
+    stats = response_compression.stats()["gzip"]
+    assert stats["responses"] == 1
+    assert stats["bytes_in"] == plain.content_length
+    assert stats["bytes_out"] == response.content_length
+    metrics = client.get("/metrics").get_data(as_text=True)
+    assert 'http_compression_responses_total{encoding="gzip"} 1' in metrics
+
+
+def test_negotiation_honours_quality_and_threshold(client, auth_headers, history):
+    """Test refused encodings and small bodies are sent uncompressed"""
+    path = "/api/v1/subscriptions/history?limit=100"
+    response = client.get(
+        path, headers={**auth_headers, "Accept-Encoding": "gzip;q=0, identity"}
+    )
+    assert "Content-Encoding" not in response.headers
+
+    response = client.get("/api/v1/plans/", headers={"Accept-Encoding": "gzip"})
+    assert response.content_length < 1024
+    assert "Content-Encoding" not in response.headers
+
+
+def test_streamed_export_compressed(client, auth_headers, history):
+    """Test streamed bodies are compressed chunk by chunk, and never twice"""
+    response = client.get(
+        "/api/v1/subscriptions/export",
+        headers={**auth_headers, "Accept-Encoding": "gzip"},
+    )
+    assert response.headers["Content-Encoding"] == "gzip"
+    lines = gzip.decompress(response.get_data()).splitlines()
+    assert len(lines) == 100
+    assert json.loads(lines[0])["plan"]["name"] == "Pro"
+
+    response = client.get(
+        "/api/v1/subscriptions/export?gzip=true",
+        headers={**auth_headers, "Accept-Encoding": "gzip"},
+    )
+    assert len(gzip.decompress(response.get_data()).splitlines()) == 100
+
+
+def test_compressed_responses_carry_weak_etags(client):
+    """Test the encoded representation's ETag still revalidates"""
+    for index in range(20):
+        PlanService.create_plan(f"Plan {index}", "A plan " * 10, 4.99, 30)
+    headers = {"Accept-Encoding": "gzip"}
+
+    response = client.get("/api/v1/plans/", headers=headers)
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"].startswith('W/"')
+
+    response = client.get(
+        "/api/v1/plans/",
+        headers={**headers, "If-None-Match": response.headers["ETag"]},
+    )
+    assert response.status_code == 304
+
+
+def test_available_encodings_skip_missing_libraries():
+    """Test encodings whose library is not installed are never offered"""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(
+            "app.utils.compression.ENCODINGS",
+            {"br": (None, False), "zstd": (None, True), "gzip": (None, True)},
+        )
+        assert available_encodings(("br", "zstd", "gzip", "bogus")) == [
+            "zstd",
+            "gzip",
+        ]
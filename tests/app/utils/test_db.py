@@ -0,0 +1,45 @@
+import pytest
+from sqlalchemy import text
+from app import create_app
+from app.config import ProductionConfig, TestingConfig, get_config
+from app.extensions import db
+
+
+def test_get_config_profiles(monkeypatch):
+    assert get_config("testing") is TestingConfig
+    assert get_config("production") is ProductionConfig
+    monkeypatch.delenv("APP_CONFIG", raising=False)
+    assert get_config() is ProductionConfig
+    assert not ProductionConfig.DEBUG
+    with pytest.raises(ValueError):
+        get_config("staging")
+
+
+def test_production_profile_applies_pragmas(tmp_path):
+    """Test every pooled SQLite connection gets the production PRAGMAs"""
+    config = type(
+        "ProductionTestConfig",
+        (ProductionConfig,),
+        {
+            "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'app.db'}",
+            "EXPIRY_SCHEDULER_ENABLED": False,
+        },
+    )
+    app = create_app(config)
+
+    with app.app_context():
+        assert (
+            db.engine.pool.size()
+            == ProductionConfig.SQLALCHEMY_ENGINE_OPTIONS["pool_size"]
+        )
+        with db.engine.connect() as connection:
+
+            def pragma(name):
+                return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+            assert pragma("journal_mode") == "wal"
+            assert pragma("synchronous") == 1
+            assert pragma("temp_store") == 2
+            for name in ("busy_timeout", "cache_size"):
+                assert pragma(name) == ProductionConfig.SQLITE_PRAGMAS[name]
+        db.engine.dispose()
@@ -0,0 +1,80 @@
+import threading
+from flask_jwt_extended import create_access_token
+from sqlalchemy import text
+from app.extensions import db
+
+
+def scrape(client):
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    return response.get_data(as_text=True).splitlines()
+
+
+def sample(lines, prefix):
+    values = [line.rsplit(" ", 1)[1] for line in lines if line.startswith(prefix + " ")]
+    assert values, f"{prefix} not exported"
+    return float(values[0])
+
+
+def test_records_requests_and_sql(client, users):
+    for _ in range(3):
+        client.get("/api/v1/users/1")
+    client.get("/api/v1/users/99")
+    client.get("/no-such-route")
+
+    lines = scrape(client)
+    endpoint = 'endpoint="user.get_user"'
+    assert (
+        sample(lines, f'http_requests_total{{{endpoint},method="GET",status="200"}}')
+        == 3
+    )
+    assert (
+        sample(lines, f'http_requests_total{{{endpoint},method="GET",status="404"}}')
+        == 1
+    )
+    assert sample(
+        lines, 'http_requests_total{endpoint="unmatched",method="GET",status="404"}'
+    )
+    assert sample(lines, f"http_request_duration_seconds_count{{{endpoint}}}") == 4
+    assert (
+        sample(lines, f'http_request_duration_seconds_bucket{{{endpoint},le="+Inf"}}')
+        == 4
+    )
+    # user 1 is loaded once and then served from the user cache
+    assert sample(lines, f"db_statements_total{{{endpoint}}}") == 2
+    assert sample(lines, f"db_statement_seconds_total{{{endpoint}}}") > 0
+    assert sample(lines, f"http_response_size_bytes_sum{{{endpoint}}}") > 0
+
+
+def test_counts_streamed_response_bytes(client, users):
+    headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+    body = client.get("/api/v1/subscriptions/export", headers=headers).get_data()
+
+    lines = scrape(client)
+    endpoint = 'endpoint="subscription.export_subscriptions"'
+    assert sample(lines, f"http_response_size_bytes_sum{{{endpoint}}}") == len(body)
+
+
+def test_merges_threads_and_background_sql(app, client):
+    def request_plans():
+        with app.test_client() as thread_client:
+            thread_client.get("/api/v1/plans/")
+
+    threads = [threading.Thread(target=request_plans) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    db.session.execute(text("SELECT 1"))
+
+    lines = scrape(client)
+    assert (
+        sample(
+            lines,
+            'http_requests_total{endpoint="plan.get_all_active_plans",'
+            'method="GET",status="200"}',
+        )
+        == 4
+    )
+    assert sample(lines, 'db_statements_total{endpoint="none"}') >= 1
+    assert sample(lines, 'plan_catalog_requests_total{result="miss"}') >= 1
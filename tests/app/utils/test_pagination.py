@@ -0,0 +1,70 @@
+import pytest
+from datetime import datetime, timedelta
+from flask_jwt_extended import create_access_token
+from app.extensions import db
+from app.models.plan_model import Plan
+from app.models.subscription_model import Subscription
+from app.services.subscription_service import SubscriptionService
+from app.utils.pagination import BACKWARD, decode_cursor, encode_cursor
+
+
+@pytest.fixture
+def same_second_subscriptions(app, users):
+    """20 subscriptions that all share one created_at timestamp"""
+    created_at = datetime(2025, 6, 1, 10, 0, 0)
+    db.session.add(
+        Plan(id=1, name="Basic", description="Basic", price=5, duration_in_days=30)
+    )
+    db.session.add_all(
+        Subscription(
+            user_id=1,
+            plan_id=1,
+            start_date=created_at,
+            end_date=created_at + timedelta(days=30),
+            created_at=created_at,
+        )
+        for _ in range(20)
+    )
+    db.session.commit()
+
+
+def test_cursor_round_trip():
+    token = encode_cursor("2025-06-01 10:00:00", 42, direction=BACKWARD)
+    assert decode_cursor(token) == (BACKWARD, "2025-06-01 10:00:00", 42)
+
+
+@pytest.mark.parametrize("token", ["2025-01-01T00:00:00", "bm90LWpzb24", "W10"])
+def test_decode_cursor_rejects_invalid_tokens(token):
+    with pytest.raises(ValueError, match="Invalid cursor format."):
+        decode_cursor(token)
+
+
+def test_history_pages_through_timestamp_ties(app, same_second_subscriptions):
+    """Test rows sharing a timestamp are neither skipped nor repeated"""
+    first = SubscriptionService.get_subscription_history(1, limit=10)
+    assert first["pagination"]["has_more"] is True
+    assert first["pagination"]["prev_cursor"] is None
+
+    second = SubscriptionService.get_subscription_history(
+        1, cursor=first["pagination"]["next_cursor"], limit=10
+    )
+    # exact multiple of the page size: the last page knows it is the last one
+    assert second["pagination"]["has_more"] is False
+    assert second["pagination"]["next_cursor"] is None
+
+    ids = [row["id"] for row in first["data"] + second["data"]]
+    assert ids == list(range(20, 0, -1))
+
+    previous = SubscriptionService.get_subscription_history(
+        1, cursor=second["pagination"]["prev_cursor"], limit=10
+    )
+    assert [row["id"] for row in previous["data"]] == list(range(20, 10, -1))
+    assert previous["pagination"]["prev_cursor"] is None
+
+
+def test_invalid_cursor_returns_bad_request(client, users):
+    headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+    response = client.get(
+        "/api/v1/subscriptions/history?cursor=not-a-cursor", headers=headers
+    )
+    assert response.status_code == 400
@@ -0,0 +1,114 @@
+import shutil
+from datetime import datetime
+import pytest
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models.plan_model import Plan
+from app.models.subscription_model import Subscription
+from app.models.user_model import User
+from app.services.plan_service import PlanService
+from app.services.subscription_service import SubscriptionService
+from app.utils.replicas import replica_router
+
+
+@pytest.fixture
+def replicated_app(tmp_path):
+    """A file primary and a copy of it as a (frozen) replica"""
+    primary, replica = tmp_path / "primary.db", tmp_path / "replica.db"
+    seed_app = create_app(
+        type(
+            "SeedConfig",
+            (TestingConfig,),
+            {"SQLALCHEMY_DATABASE_URI": f"sqlite:///{primary}"},
+        )
+    )
+    with seed_app.app_context():
+        db.create_all()
+        db.session.add(
+            Plan(id=1, name="Basic", description="Basic", price=5, duration_in_days=30)
+        )
+        db.session.add_all(
+            User(id=i, username=f"user{i}", email=f"u{i}@x.io", pass_hash="x")
+            for i in (1, 2)
+        )
+        db.session.commit()
+        db.engine.dispose()
+    shutil.copy(primary, replica)
+
+    app = create_app(
+        type(
+            "ReplicatedConfig",
+            (TestingConfig,),
+            {
+                "SQLALCHEMY_DATABASE_URI": f"sqlite:///{primary}",
+                "SQLALCHEMY_REPLICA_URIS": [f"sqlite:///{replica}"],
+                "REPLICA_STICKY_SECONDS": 60,
+            },
+        )
+    )
+    with app.app_context():
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+        replica_router.dispose()
+
+
+def history_ids(user_id):
+    db.session.remove()
+    result = SubscriptionService.get_subscription_history(user_id)
+    return [row["id"] for row in result["data"]]
+
+
+def test_read_only_methods_use_replica(replicated_app):
+    """Test reads outside the sticky window see the replica's data"""
+    with replicated_app.app_context():
+        db.session.execute(
+            Plan.__table__.insert(),
+            {"name": "Pro", "description": "Pro", "price": 9, "duration_in_days": 30},
+        )
+        db.session.commit()
+        db.session.remove()
+
+        # the new plan only exists on the primary
+        assert PlanService.get_plan_by_id(2) is None
+        assert replica_router.stats()["replica_reads"] == {"replica_0": 1}
+
+
+def test_writer_is_sticky_to_primary(replicated_app):
+    """Test a user reads their own writes while others read the replica"""
+    with replicated_app.app_context():
+        subscription_id = SubscriptionService.create_subscription(1, 1).id
+        # written behind the service's back, so user 2 is not made sticky
+        db.session.add(
+            Subscription(
+                user_id=2,
+                plan_id=1,
+                start_date=datetime(2025, 6, 1),
+                end_date=datetime(2025, 7, 1),
+            )
+        )
+        db.session.commit()
+
+        assert history_ids(1) == [subscription_id]
+        assert history_ids(2) == []
+
+        stats = replica_router.stats()
+        assert stats["sticky_reads"] == 1
+        assert stats["replica_reads"] == {"replica_0": 1}
+        assert stats["sticky_users"] == 1
+
+
+def test_writes_and_unscoped_reads_use_primary(replicated_app):
+    """Test reads outside @read_only methods and all writes go to the primary"""
+    with replicated_app.app_context():
+        SubscriptionService.create_subscription(1, 1)
+        assert [plan.id for plan in PlanService.get_all_active_plans()] == [1]
+
+        stats = replica_router.stats()
+        assert stats["replica_reads"] == {"replica_0": 0}
+        assert stats["primary_reads"] > 0
+
+
+def test_routing_disabled_without_replicas(app):
+    assert replica_router.stats() == {"replicas": 0}
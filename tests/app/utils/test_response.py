@@ -0,0 +1,76 @@
+from datetime import timedelta
+from unittest.mock import patch
+from app.extensions import db
+from app.models.user_model import User
+from app.services.plan_service import PlanService
+
+
+def test_plan_list_conditional_get(client):
+    """Test the plan listing revalidates without touching the database"""
+    PlanService.create_plan("Basic", "Basic plan", 4.99, 30)
+
+    response = client.get("/api/v1/plans/")
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+    assert response.headers["Last-Modified"]
+    assert response.headers["Cache-Control"] == "no-cache"
+
+    with patch.object(PlanService, "get_all_active_plans") as mock_get_plans:
+        response = client.get("/api/v1/plans/", headers={"If-None-Match": etag})
+        mock_get_plans.assert_not_called()
+    assert response.status_code == 304
+    assert response.get_data() == b""
+    assert response.headers["ETag"] == etag
+
+    # a plan write changes the representation and its validator
+    PlanService.create_plan("Pro", "Pro plan", 9.99, 30)
+    response = client.get("/api/v1/plans/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert len(response.get_json()["data"]["plans"]) == 2
+
+
+def test_plan_if_modified_since(client):
+    """Test If-Modified-Since against the plan's updated_at"""
+    plan = PlanService.create_plan("Basic", "Basic plan", 4.99, 30)
+
+    response = client.get(f"/api/v1/plans/{plan.id}")
+    last_modified = response.headers["Last-Modified"]
+    earlier = response.last_modified - timedelta(seconds=1)
+    assert response.status_code == 200
+
+    response = client.get(
+        f"/api/v1/plans/{plan.id}", headers={"If-Modified-Since": last_modified}
+    )
+    assert response.status_code == 304
+
+    response = client.get(
+        f"/api/v1/plans/{plan.id}",
+        headers={"If-Modified-Since": earlier.strftime("%a, %d %b %Y %H:%M:%S GMT")},
+    )
+    assert response.status_code == 200
+
+
+def test_user_conditional_get(client, users):
+    """Test user resources revalidate on updated_at"""
+    response = client.get("/api/v1/users/1")
+    etag = response.headers["ETag"]
+    assert response.status_code == 200
+
+    with patch("app.api.routes.user_routes.user_schema") as mock_schema:
+        response = client.get("/api/v1/users/1", headers={"If-None-Match": etag})
+        mock_schema.dump.assert_not_called()
+    assert response.status_code == 304
+
+    user = db.session.get(User, 1)
+    user.updated_at = user.updated_at + timedelta(seconds=5)
+    db.session.commit()
+    response = client.get("/api/v1/users/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_conditional_headers_ignored_on_errors(client):
+    """Test validators only apply to successful reads"""
+    response = client.get("/api/v1/users/99", headers={"If-None-Match": "*"})
+    assert response.status_code == 404
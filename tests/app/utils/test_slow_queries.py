@@ -0,0 +1,84 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from app.config import TestingConfig
+from app.extensions import db
+from app.models.user_model import User
+from app.utils.slow_queries import normalize_sql, parameter_shape, slow_query_log
+
+
+@pytest.fixture
+def logged_app(database_url):
+    """App logging every statement as slow"""
+    config = type(
+        "SlowQueryConfig",
+        (TestingConfig,),
+        {
+            "SQLALCHEMY_DATABASE_URI": database_url,
+            "SLOW_QUERY_LOG_ENABLED": True,
+            "SLOW_QUERY_THRESHOLD_MS": 0,
+            "SLOW_QUERY_REPEAT_SECONDS": 300,
+            # schema setup alone would use up the default rate limit
+            "SLOW_QUERY_MAX_PER_MINUTE": 1000,
+        },
+    )
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, username="user1", email="u1@x.io", pass_hash="x"))
+        db.session.commit()
+        yield app
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+def test_normalize_sql():
+    statement = """
+        SELECT * FROM subscriptions
+        WHERE user_id = ? AND id IN (?, ?, ?) AND name = 'x' LIMIT 10
+    """
+    assert normalize_sql(statement) == (
+        "SELECT * FROM subscriptions WHERE user_id = ? AND id IN (?...) "
+        "AND name = ? LIMIT ?"
+    )
+    assert normalize_sql("SELECT %(id)s::INTEGER") == "SELECT ?::INTEGER"
+
+
+def test_parameter_shape():
+    assert parameter_shape((1, "a", None)) == ["int", "str", "NoneType"]
+    assert parameter_shape({"id": 1}) == {"id": "int"}
+    assert parameter_shape([(1,), (2,)], executemany=True) == {
+        "rows": 2,
+        "each": ["int"],
+    }
+
+
+def test_logs_history_query_with_plan(logged_app):
+    headers = {"Authorization": f"Bearer {create_access_token(identity='1')}"}
+    client = logged_app.test_client()
+    for _ in range(3):
+        assert (
+            client.get("/api/v1/subscriptions/history", headers=headers).status_code
+            == 200
+        )
+
+    entries = [
+        entry
+        for entry in slow_query_log.recent(logged_app)
+        if entry["endpoint"] == "subscription.get_subscription_history"
+        # the first request also loads the revocation filter and the user
+        and "FROM subscriptions" in entry["sql"]
+    ]
+    # deduplicated by fingerprint: logged once, repeats suppressed
+    assert len(entries) == 1
+    entry = entries[0]
+    assert "FROM subscriptions JOIN plans" in entry["sql"]
+    assert entry["plan"]
+    if db.engine.dialect.name == "sqlite":
+        assert any("idx_subscription_user_created" in line for line in entry["plan"])
+
+
+def test_disabled_by_default(app):
+    assert "slow_query_log" not in app.extensions
+    assert slow_query_log.recent(app) == []
@@ -0,0 +1,61 @@
+import pytest
+from datetime import datetime
+from sqlalchemy import column
+from sqlalchemy.dialects import postgresql, sqlite
+from app.services import subscription_queries as queries
+from app.utils.sql import add_days, days_between, truncate_int
+
+
+def compile_sql(statement, dialect):
+    return str(statement.compile(dialect=dialect))
+
+
+@pytest.mark.parametrize(
+    "dialect, expected",
+    [
+        (sqlite.dialect(), "datetime(end_date, '+' || (days) || ' days')"),
+        (
+            postgresql.dialect(),
+            "(end_date + make_interval(days => CAST(days AS INTEGER)))",
+        ),
+    ],
+)
+def test_add_days(dialect, expected):
+    expression = add_days(column("end_date"), column("days"))
+    assert compile_sql(expression, dialect) == expected
+
+
+@pytest.mark.parametrize(
+    "dialect, expected",
+    [
+        (sqlite.dialect(), "(julianday(b) - julianday(a))"),
+        (postgresql.dialect(), "(EXTRACT(EPOCH FROM (b - a)) / 86400)"),
+    ],
+)
+def test_days_between(dialect, expected):
+    expression = days_between(column("a"), column("b"))
+    assert compile_sql(expression, dialect) == expected
+
+
+@pytest.mark.parametrize(
+    "dialect, expected",
+    [
+        (sqlite.dialect(), "CAST(x AS INTEGER)"),
+        (postgresql.dialect(), "CAST(TRUNC(x) AS INTEGER)"),
+    ],
+)
+def test_truncate_int(dialect, expected):
+    assert compile_sql(truncate_int(column("x")), dialect) == expected
+
+
+@pytest.mark.parametrize("dialect", [sqlite.dialect(), postgresql.dialect()])
+def test_queries_have_no_dialect_hints(dialect):
+    """Statements compile on every dialect without index hints"""
+    statements = [
+        queries.renewable_select(datetime(2025, 6, 1), position=("2025-05-01", 1)),
+        queries.renew_statement([1, 2], datetime(2025, 6, 1)),
+        queries.upgrade_statement(1, 2, 1),
+        queries.deactivate_statement([1], datetime(2025, 6, 1)),
+    ]
+    for statement in statements:
+        assert "INDEXED BY" not in compile_sql(statement, dialect)
@@ -1,27 +1,107 @@
+import os
+import shutil
+import socket
+import subprocess
 import pytest
 from app.extensions import db
+from app.models.user_model import User
 from app import create_app
+from app.config import TestingConfig
 
 
-class TestingConfig:
-    """Test config class"""
+def _postgres_available():
+    """Postgres runs when TEST_POSTGRES_URL is set or a local server can be started"""
+    try:
+        import psycopg2  # noqa: F401
+    except ImportError:
+        return False
+    if os.getenv("TEST_POSTGRES_URL"):
+        return True
+    return bool(shutil.which("initdb") and shutil.which("pg_ctl")) and os.geteuid()
 
-    SECRET_KEY = "your_secret_key"
-    SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
-    SQLALCHEMY_TRACK_MODIFICATIONS = False
-    TESTING = True
+
+DATABASE_BACKENDS = ["sqlite"] + (["postgresql"] if _postgres_available() else [])
+
+
+@pytest.fixture(scope="session")
+def postgres_url(tmp_path_factory):
+    """URL of a Postgres server, starting a throwaway local one if needed"""
+    url = os.getenv("TEST_POSTGRES_URL")
+    if url:
+        yield url
+        return
+
+    data_dir = tmp_path_factory.mktemp("pgdata")
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    subprocess.run(
+        ["initdb", "-D", str(data_dir), "-U", "postgres", "-A", "trust"],
+        check=True,
+        capture_output=True,
+    )
+    subprocess.run(
+        [
+            "pg_ctl",
+            "-D",
+            str(data_dir),
+            "-l",
+            str(data_dir / "server.log"),
+            "-o",
+            f"-p {port} -k {data_dir} -c listen_addresses=''",
+            "-w",
+            "start",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    try:
+        yield f"postgresql+psycopg2://postgres@/postgres?host={data_dir}&port={port}"
+    finally:
+        subprocess.run(
+            ["pg_ctl", "-D", str(data_dir), "-m", "fast", "stop"], capture_output=True
+        )
+
+
+@pytest.fixture(params=DATABASE_BACKENDS)
+def database_url(request):
+    if request.param == "postgresql":
+        return request.getfixturevalue("postgres_url")
+    return TestingConfig.SQLALCHEMY_DATABASE_URI
 
 
 @pytest.fixture
-def app():
+def app(database_url):
     """Create test Flask app with DB and create tables"""
-    app = create_app(TestingConfig)
+    config = type(
+        "TestingConfig", (TestingConfig,), {"SQLALCHEMY_DATABASE_URI": database_url}
+    )
+    app = create_app(config)
 
     with app.app_context():
         db.create_all()
 
         yield app
 
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def users(app):
+    """Users 1 and 2, for fixtures that insert subscriptions directly"""
+    db.session.add_all(
+        User(
+            id=user_id,
+            username=f"user{user_id}",
+            email=f"u{user_id}@x.io",
+            pass_hash="x",
+        )
+        for user_id in (1, 2)
+    )
+    db.session.commit()
+
 
 @pytest.fixture
 def client(app):
@@ -0,0 +1,50 @@
+from datetime import datetime
+from sqlalchemy import func, inspect, select
+from app.extensions import db
+from app.models.subscription_model import Subscription
+from app.models.user_model import User
+from scripts.seed_db import PLANS, generate_data, seed_fresh_sqlite
+
+NOW = datetime(2025, 6, 1, 12, 0, 0)
+
+
+def dataset(engine):
+    with engine.connect() as connection:
+        return connection.execute(
+            select(
+                Subscription.user_id,
+                Subscription.plan_id,
+                Subscription.end_date,
+                Subscription.is_active,
+            ).order_by(Subscription.id)
+        ).all()
+
+
+def test_generate_data(app):
+    """Test the generator fills every table with consistent rows"""
+    result = generate_data(
+        db.engine, users=50, subscriptions_per_user=4, now=NOW, report=lambda _: None
+    )
+
+    assert result["subscriptions"] == 200
+    assert db.session.scalar(select(func.count()).select_from(User)) == 51
+    rows = dataset(db.engine)
+    assert {row.plan_id for row in rows} <= set(range(1, len(PLANS) + 1))
+    assert all(row.end_date > NOW for row in rows if row.is_active)
+    # indexes are rebuilt after the load
+    built = {index["name"] for index in inspect(db.engine).get_indexes("subscriptions")}
+    assert {index.name for index in Subscription.__table__.indexes} <= built
+
+
+def test_fresh_sqlite_is_deterministic(tmp_path):
+    """Test the same seed builds the same dataset"""
+    options = {"users": 30, "subscriptions_per_user": 5, "now": NOW}
+    runs = []
+    for name in ("a.db", "b.db"):
+        seed_fresh_sqlite(str(tmp_path / name), report=lambda _: None, **options)
+        engine = db.create_engine(f"sqlite:///{tmp_path / name}")
+        runs.append(dataset(engine))
+        engine.dispose()
+
+    assert len(runs[0]) == 150
+    assert runs[0] == runs[1]